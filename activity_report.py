@@ -0,0 +1,167 @@
+import asyncio
+import csv
+import io
+import json
+
+import discord
+
+import persistence
+
+# === Отчёт /activity ===
+PAGE_LINES = 15
+LINE_LIMIT = 120
+YIELD_EVERY = 1000  # строк между уступками циклу событий при обходе всех пользователей
+
+
+async def activity_order(stats_store, game_summary, sort: str = "messages", game: str | None = None) -> list[int]:
+    """Порядок uid для отчёта.
+
+    Сортировка по играм и фильтр по игре требуют обхода всех пользователей:
+    он идёт с уступкой циклу событий каждые YIELD_EVERY записей.
+    """
+    if sort == "games":
+        totals = []
+        for i, (uid, info) in enumerate(list(stats_store.items()), 1):
+            games = game_summary(info)
+            total = games.get(game, 0) if game else sum(games.values())
+            if total:
+                totals.append((-total, int(uid)))
+            if i % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+        totals.sort()
+        return [uid for _, uid in totals]
+    index = stats_store.voice_index if sort == "voice" else stats_store.messages_index
+    uids = [uid for uid, _ in index.top(len(index))]
+    if not game:
+        return uids
+    playing = []
+    for i, uid in enumerate(uids, 1):
+        info = stats_store.get(str(uid))
+        if info and game_summary(info).get(game):
+            playing.append(uid)
+        if i % YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+    return playing
+
+
+def iter_activity_rows(stats_store, game_summary, uids: list[int], game: str | None = None):
+    """Лениво отдаёт (uid, info, games) в порядке ``uids`` из activity_order.
+
+    Строки считаются по мере запроса страниц, поэтому команда не ждёт обхода
+    всех пользователей.
+    """
+    for uid in uids:
+        info = stats_store.get(str(uid))
+        if not info:
+            continue
+        games = game_summary(info)
+        if game and not games.get(game):
+            continue
+        yield uid, info, games
+
+
+def format_games(games: dict) -> str:
+    return ", ".join(f"{g}: {round(sec / 3600, 2)} ч." for g, sec in games.items()) if games else "-"
+
+
+def format_row(name: str, info: dict, games: dict) -> str:
+    hours = round(info.get("voice_seconds", 0) / 3600, 2)
+    line = f"{name}: сообщений: {info.get('messages', 0)}, часов в войсе: {hours}, игры: {format_games(games)}"
+    return line if len(line) <= LINE_LIMIT else line[:LINE_LIMIT - 1] + "…"
+
+
+class ActivityPaginator(discord.ui.View):
+    def __init__(self, rows, guild: discord.Guild, name_cache, title: str, owner_id: int):
+        super().__init__(timeout=600)
+        self._rows = rows
+        self._guild = guild
+        self._name_cache = name_cache
+        self._title = title
+        self._owner_id = owner_id
+        self._pages: list[str] = []
+        # Строка, прочитанная наперёд: по ней видно, есть ли следующая страница
+        self._next = next(self._rows, None)
+        self.index = 0
+
+    @property
+    def _exhausted(self) -> bool:
+        return self._next is None
+
+    def _take(self) -> list:
+        rows = []
+        while self._next is not None and len(rows) < PAGE_LINES:
+            rows.append(self._next)
+            self._next = next(self._rows, None)
+        return rows
+
+    async def load_page(self, index: int) -> bool:
+        while len(self._pages) <= index and not self._exhausted:
+            rows = self._take()
+            names = await self._name_cache.resolve(self._guild, [uid for uid, _, _ in rows])
+            self._pages.append("\n".join(format_row(names[uid], info, games) for uid, info, games in rows))
+        return index < len(self._pages)
+
+    def render(self) -> str:
+        if not self._pages:
+            return f"{self._title}:\nНет данных за неделю."
+        suffix = "" if self._exhausted else "+"
+        return f"{self._title} (страница {self.index + 1}/{len(self._pages)}{suffix}):\n{self._pages[self.index]}"
+
+    def _refresh_buttons(self):
+        self.prev_page.disabled = self.index == 0
+        self.next_page.disabled = self._exhausted and self.index >= len(self._pages) - 1
+
+    async def start(self, interaction: discord.Interaction):
+        await self.load_page(0)
+        self._refresh_buttons()
+        await interaction.followup.send(self.render(), view=self, ephemeral=True)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self._owner_id
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(self.index - 1, 0)
+        self._refresh_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer()
+        if await self.load_page(self.index + 1):
+            self.index += 1
+        self._refresh_buttons()
+        await interaction.edit_original_response(content=self.render(), view=self)
+
+
+# === Экспорт ===
+def _serialize_rows(rows: list[dict], fmt: str) -> bytes:
+    if fmt == "json":
+        return json.dumps(rows, ensure_ascii=False).encode("utf-8")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["user_id", "name", "messages", "voice_hours", "game_hours"])
+    for row in rows:
+        writer.writerow([
+            row["user_id"], row["name"], row["messages"], row["voice_hours"],
+            "; ".join(f"{g}: {h}" for g, h in row["game_hours"].items()),
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_activity(rows, guild: discord.Guild, fmt: str) -> discord.File:
+    collected = []
+    for i, (uid, info, games) in enumerate(rows, 1):
+        # Для выгрузки берём имена только из кэша шлюза, без запросов к API
+        member = guild.get_member(uid)
+        collected.append({
+            "user_id": uid,
+            "name": member.display_name if member else "",
+            "messages": info.get("messages", 0),
+            "voice_hours": round(info.get("voice_seconds", 0) / 3600, 2),
+            "game_hours": {g: round(sec / 3600, 2) for g, sec in games.items()},
+        })
+        if i % YIELD_EVERY == 0:
+            await asyncio.sleep(0)
+    payload = await persistence.run_io(_serialize_rows, collected, fmt)
+    return discord.File(io.BytesIO(payload), filename=f"activity.{fmt}")
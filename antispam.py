@@ -0,0 +1,107 @@
+import os
+import time
+from collections import OrderedDict, deque
+
+# === Настройки антиспама ===
+ANTISPAM_ENABLED = os.environ.get("ANTISPAM_ENABLED", "1") == "1"
+# Ведро токенов: ANTISPAM_BURST сообщений подряд, дальше не чаще ANTISPAM_RATE в секунду
+ANTISPAM_RATE = float(os.environ.get("ANTISPAM_RATE", 0.5))
+ANTISPAM_BURST = float(os.environ.get("ANTISPAM_BURST", 6))
+# Одинаковый текст чаще ANTISPAM_DUPLICATES раз за ANTISPAM_DUPLICATE_WINDOW секунд — спам
+ANTISPAM_DUPLICATES = int(os.environ.get("ANTISPAM_DUPLICATES", 3))
+ANTISPAM_DUPLICATE_WINDOW = float(os.environ.get("ANTISPAM_DUPLICATE_WINDOW", 60))
+ANTISPAM_HISTORY = int(os.environ.get("ANTISPAM_HISTORY", 8))
+# Не чаще одного автоматического предупреждения за столько секунд
+ANTISPAM_WARN_COOLDOWN = float(os.environ.get("ANTISPAM_WARN_COOLDOWN", 300))
+ANTISPAM_MAX_USERS = int(os.environ.get("ANTISPAM_MAX_USERS", 50000))
+
+REASON_TEXT = {"flood": "флуд", "duplicate": "повтор одинаковых сообщений"}
+
+
+def content_hash(content: str) -> int:
+    """Хеш текста без учёта регистра и пробелов, чтобы «спам», «СПАМ » и «с п а м» не различались."""
+    return hash("".join(content.casefold().split()))
+
+
+class _UserState:
+    __slots__ = ("tokens", "updated", "recent", "counts")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.recent: deque[tuple[int, float]] = deque()
+        self.counts: dict[int, int] = {}
+
+
+class SpamDetector:
+    """Поиск флуда и повторов на горячем пути сообщений.
+
+    У каждого пользователя ведро токенов и скользящее окно из последних
+    ``history`` хешей текста со счётчиками, поэтому проверка сообщения
+    стоит O(1). Пользователи хранятся в порядке последней активности:
+    простаивающие дольше окна и сверх ``max_users`` вытесняются с начала,
+    так что память ограничена.
+    """
+
+    def __init__(self, rate: float = ANTISPAM_RATE, burst: float = ANTISPAM_BURST,
+                 duplicates: int = ANTISPAM_DUPLICATES, window: float = ANTISPAM_DUPLICATE_WINDOW,
+                 history: int = ANTISPAM_HISTORY, max_users: int = ANTISPAM_MAX_USERS):
+        self.rate = rate
+        self.burst = burst
+        self.duplicates = duplicates
+        self.window = window
+        self.history = history
+        self.max_users = max_users
+        # Через столько секунд простоя ведро полное, а окно повторов пустое
+        self.idle = max(window, burst / rate if rate > 0 else 0)
+        self._users: OrderedDict[int, _UserState] = OrderedDict()
+
+    def __len__(self):
+        return len(self._users)
+
+    def check(self, user_id: int, content: str, now: float | None = None) -> str | None:
+        """Учитывает сообщение; возвращает причину ("flood", "duplicate") или None."""
+        now = time.monotonic() if now is None else now
+        users = self._users
+        state = users.get(user_id)
+        if state is None:
+            state = users[user_id] = _UserState(self.burst, now)
+        else:
+            users.move_to_end(user_id)
+
+        reason = None
+        state.tokens = min(self.burst, state.tokens + (now - state.updated) * self.rate)
+        state.updated = now
+        if state.tokens >= 1:
+            state.tokens -= 1
+        else:
+            reason = "flood"
+
+        recent, counts = state.recent, state.counts
+        while recent and (len(recent) >= self.history or recent[0][1] <= now - self.window):
+            old, _ = recent.popleft()
+            if counts[old] == 1:
+                del counts[old]
+            else:
+                counts[old] -= 1
+        if content:
+            digest = content_hash(content)
+            recent.append((digest, now))
+            counts[digest] = counts.get(digest, 0) + 1
+            if counts[digest] > self.duplicates:
+                reason = reason or "duplicate"
+        self._evict(now)
+        return reason
+
+    def _evict(self, now: float):
+        users = self._users
+        while len(users) > self.max_users:
+            users.popitem(last=False)
+        # Пользователи упорядочены по активности: за раз снимаем не больше двух
+        for _ in range(2):
+            if not users:
+                break
+            user_id, state = next(iter(users.items()))
+            if now - state.updated <= self.idle:
+                break
+            del users[user_id]
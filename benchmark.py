@@ -0,0 +1,401 @@
+"""Офлайн-бенчмарк обработчиков событий без подключения к Discord.
+
+Гоняет настоящие ``on_message``, ``on_voice_state_update``,
+``on_presence_update`` и команды топов из bot.py на синтетических событиях
+с заданной частотой и числом пользователей. Данные пишутся во временный
+каталог, поэтому рабочие файлы бота не затрагиваются.
+
+    python benchmark.py --users 100000 --events 200000
+    python benchmark.py --users 1000000 --rate 5000 --json result.json
+    python benchmark.py --baseline result.json   # код 1 при регрессии
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import discord
+
+# === Синтетические объекты Discord ===
+GUILD_ID = 1
+ALLOWED_GAME = "Dota 2"
+
+
+class FakeActivity:
+    __slots__ = ("type", "name")
+
+    def __init__(self, name: str, activity_type=discord.ActivityType.playing):
+        self.type = activity_type
+        self.name = name
+
+
+class FakeChannel:
+    __slots__ = ("id", "guild")
+
+    def __init__(self, channel_id: int, guild):
+        self.id = channel_id
+        self.guild = guild
+
+
+class FakeVoiceState:
+    __slots__ = ("channel", "afk", "self_deaf", "self_mute", "deaf", "mute")
+
+    def __init__(self, channel=None, self_deaf=False):
+        self.channel = channel
+        self.afk = False
+        self.self_deaf = self_deaf
+        self.self_mute = False
+        self.deaf = False
+        self.mute = False
+
+
+class FakeMember:
+    __slots__ = ("id", "guild", "bot", "roles", "activities", "display_name", "voice")
+
+    def __init__(self, user_id: int, guild, activities=()):
+        self.id = user_id
+        self.guild = guild
+        self.bot = False
+        self.roles = []
+        self.activities = activities
+        self.display_name = f"user{user_id}"
+        self.voice = None
+
+    def __str__(self):
+        return self.display_name
+
+
+class FakeGuild:
+    """Сервер, участники которого создаются по требованию (до 1M без лишней памяти)."""
+
+    def __init__(self, user_count: int):
+        self.id = GUILD_ID
+        self.user_count = user_count
+        self.shard_id = 0
+        self._members: dict[int, FakeMember] = {}
+        self.voice_channels = [FakeChannel(100 + i, self) for i in range(8)]
+        self.afk_channel = None
+
+    def get_member(self, user_id: int):
+        member = self._members.get(user_id)
+        if member is None and 1 <= user_id <= self.user_count:
+            member = self._members[user_id] = FakeMember(user_id, self)
+        return member
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    async def query_members(self, user_ids=None, cache=True):
+        return [m for m in map(self.get_member, user_ids or []) if m is not None]
+
+
+class FakeMessage:
+    __slots__ = ("author", "guild", "content", "channel", "id", "_state")
+
+    def __init__(self, author, guild, message_id: int, state):
+        self._state = state
+        self.author = author
+        self.guild = guild
+        self.content = "обычное сообщение"
+        self.channel = None
+        self.id = message_id
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, content=None, **kwargs):
+        self.sent += 1
+
+    async def defer(self, **kwargs):
+        pass
+
+
+class FakeInteraction:
+    def __init__(self, user, guild):
+        self.user = user
+        self.guild = guild
+        self.channel_id = 0
+        self.extras = {}
+        self.response = FakeResponse()
+
+
+# === Замеры ===
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def written_bytes() -> int | None:
+    """Байты, записанные процессом (wchar из /proc/self/io), если доступно."""
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def dir_size(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight)
+    unknown = set(mix) - {"message", "voice", "presence", "top", "voice_top", "myrank"}
+    if unknown:
+        raise SystemExit(f"Неизвестные типы событий: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class Simulation:
+    """Генерирует события и вызывает обработчики бота, собирая задержки по типам."""
+
+    def __init__(self, bot_module, guild: FakeGuild, seed: int):
+        import services
+
+        self.bot = bot_module
+        self.guild = guild
+        # Команды бота зарегистрированы для его сервера, а не для тестового
+        self.command_guild = discord.Object(id=services.GUILD_ID)
+        self.rng = random.Random(seed)
+        self.voice: dict[int, FakeVoiceState] = {}
+        self.playing: dict[int, tuple] = {}
+        self.message_id = 0
+        self.latencies: dict[str, list[float]] = {}
+
+    def _member(self) -> FakeMember:
+        return self.guild.get_member(self.rng.randint(1, self.guild.user_count))
+
+    async def message(self):
+        self.message_id += 1
+        message = FakeMessage(self._member(), self.guild, self.message_id, self.bot.bot._connection)
+        await self.bot.on_message(message)
+
+    async def voice_event(self):
+        member = self._member()
+        before = self.voice.get(member.id) or FakeVoiceState()
+        roll = self.rng.random()
+        if before.channel is None:
+            after = FakeVoiceState(self.rng.choice(self.guild.voice_channels))
+        elif roll < 0.4:
+            after = FakeVoiceState()
+        elif roll < 0.7:
+            after = FakeVoiceState(self.rng.choice(self.guild.voice_channels))
+        else:
+            after = FakeVoiceState(before.channel, self_deaf=not before.self_deaf)
+        self.voice[member.id] = after
+        member.voice = after if after.channel is not None else None
+        await self.bot.on_voice_state_update(member, before, after)
+
+    async def presence(self):
+        member = self._member()
+        before_activities = self.playing.get(member.id, ())
+        roll = self.rng.random()
+        if roll < 0.2:
+            after_activities = () if before_activities else (FakeActivity(ALLOWED_GAME),)
+        else:
+            # Смена статуса, музыка и прочее, не меняющее игру
+            after_activities = before_activities + (FakeActivity("Spotify", discord.ActivityType.listening),)
+        before = FakeMember(member.id, self.guild, before_activities)
+        member.activities = after_activities
+        self.playing[member.id] = tuple(a for a in after_activities if a.type is discord.ActivityType.playing)
+        await self.bot.on_presence_update(before, member)
+
+    async def command(self, name: str):
+        command = self.bot.bot.tree.get_command(name, guild=self.command_guild)
+        await command.callback(command.binding, FakeInteraction(self._member(), self.guild))
+
+    async def dispatch(self, kind: str):
+        if kind == "message":
+            await self.message()
+        elif kind == "voice":
+            await self.voice_event()
+        elif kind == "presence":
+            await self.presence()
+        else:
+            await self.command(kind)
+
+    async def run(self, events: int, rate: float, mix: dict[str, float]):
+        kinds = list(mix)
+        weights = [mix[k] for k in kinds]
+        schedule = self.rng.choices(kinds, weights=weights, k=events)
+        started = time.perf_counter()
+        for i, kind in enumerate(schedule):
+            if rate:
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % 1000 == 0:
+                # Даём поработать фоновым сбросам, как в живом event loop
+                await asyncio.sleep(0)
+            t0 = time.perf_counter()
+            await self.dispatch(kind)
+            self.latencies.setdefault(kind, []).append(time.perf_counter() - t0)
+        return time.perf_counter() - started
+
+
+async def seed_backend(backend, users: int, rng: random.Random):
+    """Заполняет хранилище до загрузки бота, как данные, оставшиеся с прошлого запуска."""
+    import persistence
+    from storage import MemoryBackend
+
+    data = {
+        str(uid): {"messages": rng.randint(0, 5000), "voice_seconds": rng.randint(0, 360000)}
+        for uid in range(1, users + 1)
+    }
+    if isinstance(backend, MemoryBackend):
+        backend.users = data
+    else:
+        await persistence.write_json(backend.users_path, data)
+        await persistence.drain()
+
+
+async def run_benchmark(args) -> dict:
+    import bot as bot_module
+
+    guild = FakeGuild(args.users)
+    # process_commands сравнивает автора с bot.user, которого без входа в Discord нет
+    bot_user = FakeMember(0, guild)
+    bot_user.bot = True
+    bot_module.bot._connection.user = bot_user
+    services = bot_module.services
+    seed_started = time.perf_counter()
+    await seed_backend(services.storage_backend, args.users, random.Random(args.seed))
+    await services.load()
+    seed_seconds = time.perf_counter() - seed_started
+    await bot_module.load_extensions()
+    services.stats_store.start()
+    services.presence_pipeline.start()
+
+    sim = Simulation(bot_module, guild, args.seed)
+    if args.tracemalloc:
+        tracemalloc.start()
+    bytes_before = written_bytes()
+    elapsed = await sim.run(args.events, args.rate, parse_mix(args.mix))
+    await services.close()
+    bytes_after = written_bytes()
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+
+    kinds = {}
+    for kind, values in sorted(sim.latencies.items()):
+        values.sort()
+        kinds[kind] = {
+            "count": len(values),
+            "p50_us": percentile(values, 0.50) * 1e6,
+            "p99_us": percentile(values, 0.99) * 1e6,
+            "max_us": values[-1] * 1e6,
+        }
+    return {
+        "users": args.users,
+        "events": args.events,
+        "rate": args.rate,
+        "backend": args.backend,
+        "seed_seconds": seed_seconds,
+        "elapsed_seconds": elapsed,
+        "events_per_second": args.events / elapsed if elapsed else 0.0,
+        "kinds": kinds,
+        "peak_rss_mb": peak_rss_mb(),
+        "tracemalloc_peak_mb": traced_peak / (1024 * 1024) if traced_peak is not None else None,
+        "bytes_written": bytes_after - bytes_before if bytes_before is not None and bytes_after is not None else None,
+        "data_dir_bytes": dir_size(Path.cwd()),
+    }
+
+
+def print_report(result: dict):
+    print(f"Пользователей: {result['users']}, событий: {result['events']}, бэкенд: {result['backend']}")
+    print(f"Подготовка данных: {result['seed_seconds']:.2f} с")
+    print(f"Прогон: {result['elapsed_seconds']:.2f} с, {result['events_per_second']:.0f} событий/с")
+    print(f"{'событие':<12}{'кол-во':>10}{'p50, мкс':>12}{'p99, мкс':>12}{'макс, мкс':>12}")
+    for kind, stats in result["kinds"].items():
+        print(f"{kind:<12}{stats['count']:>10}{stats['p50_us']:>12.1f}{stats['p99_us']:>12.1f}{stats['max_us']:>12.1f}")
+    print(f"Пиковый RSS: {result['peak_rss_mb']:.1f} МБ")
+    if result["tracemalloc_peak_mb"] is not None:
+        print(f"Пик tracemalloc: {result['tracemalloc_peak_mb']:.1f} МБ")
+    if result["bytes_written"] is not None:
+        print(f"Записано за прогон: {result['bytes_written'] / 1024:.1f} КБ")
+    print(f"Размер данных на диске: {result['data_dir_bytes'] / 1024:.1f} КБ")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Список регрессий относительно сохранённого прогона."""
+    problems = []
+    if result["events_per_second"] < baseline["events_per_second"] * (1 - tolerance):
+        problems.append(f"событий/с: {result['events_per_second']:.0f} против {baseline['events_per_second']:.0f}")
+    for kind, stats in result["kinds"].items():
+        base = baseline.get("kinds", {}).get(kind)
+        if base and stats["p99_us"] > base["p99_us"] * (1 + tolerance):
+            problems.append(f"{kind} p99: {stats['p99_us']:.1f} мкс против {base['p99_us']:.1f} мкс")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк обработчиков событий бота")
+    parser.add_argument("--users", type=int, default=10_000, help="число пользователей (1k–1M)")
+    parser.add_argument("--events", type=int, default=100_000, help="число синтетических событий")
+    parser.add_argument("--rate", type=float, default=0, help="событий в секунду, 0 — без ограничения")
+    parser.add_argument("--mix", default="message=80,voice=8,presence=10,top=1,voice_top=0.5,myrank=0.5",
+                        help="доли типов событий: message, voice, presence, top, voice_top, myrank")
+    parser.add_argument("--backend", choices=("json", "memory"), default="json")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tracemalloc", action="store_true", help="считать пик памяти Python (замедляет прогон)")
+    parser.add_argument("--json", dest="json_path", help="сохранить результат в JSON")
+    parser.add_argument("--baseline", help="сравнить с сохранённым результатом и вернуть код 1 при регрессии")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение для --baseline (доля)")
+    args = parser.parse_args()
+
+    repo = Path(__file__).resolve().parent
+    sys.path.insert(0, str(repo))
+    # Пути --json и --baseline относительны каталогу, из которого запустили бенчмарк
+    orig_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bot-bench-") as workdir:
+        # Бэкенд создаётся при импорте bot.py, поэтому окружение задаём заранее
+        os.environ["STORAGE_BACKEND"] = args.backend
+        os.environ.setdefault("METRICS_PORT", "0")
+        # Синтетические сообщения одинаковы и идут без пауз: антиспам принял бы их за флуд
+        # и замерялись бы предупреждения и муты вместо обычного пути on_message
+        os.environ.setdefault("ANTISPAM_ENABLED", "0")
+        os.chdir(workdir)
+        try:
+            result = asyncio.run(run_benchmark(args))
+        finally:
+            os.chdir(orig_cwd)
+
+    print_report(result)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        problems = compare(result, baseline, args.tolerance)
+        if problems:
+            print("Регрессия производительности:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("Регрессий относительно базового прогона нет.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+# === Расширения бота ===
+# Команды разложены по расширениям, которые можно перезагрузить через /reload
+# без переподключения к шлюзу; данные и фоновые задачи живут в services.Services.
+EXTENSIONS = ("stats", "moderation", "admin", "games")
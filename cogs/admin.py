@@ -0,0 +1,187 @@
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import metrics
+import persistence
+from cogs import EXTENSIONS
+from launcher import RESTART_EXIT_CODE
+from migration import MigrationJob
+from services import ALLOWED_ROLES_FOR_RESTART, BOT_SUPERVISED, GUILD_ID, RESTART_FILE, Services, user_has_allowed_role
+
+HELP_LINES = [
+    "/clear - Очистить сообщения в чате",
+    "/restart - Перезапустить бота",
+    "/reload - Перезагрузить расширение без перезапуска",
+    "/ping - Пинг бота",
+    "/userinfo - Информация о пользователе",
+    "/say - Отправить сообщение от имени бота",
+    "/top - Топ по сообщениям",
+    "/voice_top - Топ по времени в голосе",
+    "/myrank - Ваше место в топе",
+    "/warn - Выдать предупреждение",
+    "/mywarns - Посмотреть свои предупреждения",
+    "/clearwarns - Очистить предупреждения пользователя",
+    "/warns_list - Список предупреждений на сервере",
+    "/warns_stats - Статистика предупреждений",
+    "/migrate - Миграция статистики",
+    "/activity - Активность пользователей",
+    "/sync - Синхронизация команд",
+    "/metrics - Метрики производительности",
+    "/jobs - Фоновые задачи модерации",
+    "/help - Показать это сообщение"
+]
+
+
+class AdminCog(commands.Cog):
+    """Управление ботом: синхронизация, перезагрузка расширений, перезапуск и служебные команды."""
+
+    def __init__(self, services: Services):
+        self.services = services
+        self.bot = services.bot
+
+    # === Глобальные команды ===
+    # Должны идти раньше серверных: при выгрузке расширения discord.py снимает все
+    # команды после первой серверной с её сервера, и глобальные остались бы в дереве
+    @app_commands.command(name="sync", description="Принудительная синхронизация команд (только для админов)")
+    async def sync_command(self, interaction: discord.Interaction):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для этой команды!", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True)
+        try:
+            await self.services.sync_commands(force=True)
+            await interaction.followup.send("Команды успешно синхронизированы!", ephemeral=True)
+        except Exception as e:
+            await interaction.followup.send(f"Ошибка синхронизации: {e}", ephemeral=True)
+
+    @app_commands.command(name="migrate", description="Миграция старых файлов статистики в users_data.json (только для админов)")
+    async def migrate_command(self, interaction: discord.Interaction):
+        allowed = False
+        if hasattr(interaction.user, 'roles'):
+            allowed = any(role.id in ALLOWED_ROLES_FOR_RESTART for role in interaction.user.roles)
+        if not allowed:
+            await interaction.response.send_message("У вас нет прав для этой команды!", ephemeral=True)
+            return
+        # Задача хранится в services, чтобы пережить перезагрузку расширения
+        job = self.services.migration_job
+        if job is not None and job.running:
+            await interaction.response.send_message(job.progress_text(), ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        async def report(text: str):
+            await interaction.edit_original_response(content=text)
+
+        job = self.services.migration_job = MigrationJob(self.services.stats_store)
+        job.start(report)
+
+    @app_commands.command(name="stop", description="Выключить бота (только для определённых ролей)")
+    async def stop(self, interaction: discord.Interaction):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для выключения бота!", ephemeral=True)
+            return
+        await interaction.response.send_message("Бот выключается...", ephemeral=True)
+        # Сначала отключаемся от шлюза, чтобы события не шли в закрытые сервисы;
+        # данные сохранит run_bot после выхода из bot.start
+        await self.bot.close()
+
+    # === Перезагрузка и перезапуск ===
+    @app_commands.command(name="reload", description="Перезагрузить расширение без перезапуска бота (только для админов)")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(extension="Какое расширение перезагрузить")
+    @app_commands.choices(extension=[app_commands.Choice(name=name, value=name) for name in EXTENSIONS])
+    async def reload(self, interaction: discord.Interaction, extension: str):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для этой команды!", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        started = time.perf_counter()
+        try:
+            # При ошибке discord.py оставляет загруженной прежнюю версию расширения
+            await self.bot.reload_extension(f"cogs.{extension}")
+        except commands.ExtensionError as e:
+            await interaction.followup.send(f"Не удалось перезагрузить {extension}: {e}", ephemeral=True)
+            return
+        elapsed_ms = round((time.perf_counter() - started) * 1000)
+        text = f"Расширение {extension} перезагружено за {elapsed_ms} мс."
+        # Запрос к Discord нужен, только если изменились сами команды
+        try:
+            if await self.services.sync_commands():
+                text += " Команды синхронизированы."
+        except Exception as e:
+            text += f" Ошибка синхронизации: {e}"
+        await interaction.followup.send(text, ephemeral=True)
+
+    @app_commands.command(name="restart", description="Перезапустить бота (только для определённых ролей)")
+    @app_commands.guilds(GUILD_ID)
+    async def restart(self, interaction: discord.Interaction):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для перезапуска бота!", ephemeral=True)
+            return
+        await interaction.response.send_message("Бот перезапускается...", ephemeral=True)
+        try:
+            restart_info = {'channel_id': interaction.channel_id, 'text': f'Бот был перезапущен пользователем {interaction.user}.'}
+            await persistence.write_json(RESTART_FILE, restart_info)
+        except Exception:
+            pass
+        if BOT_SUPERVISED:
+            # launcher.py перезапустит все воркеры по коду выхода
+            self.services.exit_code = RESTART_EXIT_CODE
+        else:
+            self.services.respawn = True
+        await self.bot.close()
+
+    # === Служебные команды ===
+    @app_commands.command(name="ping", description="Пинг бота")
+    @app_commands.guilds(GUILD_ID)
+    async def ping(self, interaction: discord.Interaction):
+        latency = self.bot.latency
+        if isinstance(self.bot, commands.AutoShardedBot) and interaction.guild is not None:
+            shard = self.bot.get_shard(interaction.guild.shard_id)
+            if shard is not None:
+                latency = shard.latency
+        started = time.perf_counter()
+        await interaction.response.send_message("Pong!", ephemeral=False)
+        rest_ms = round((time.perf_counter() - started) * 1000)
+        await interaction.edit_original_response(content=f"Pong! Шлюз: {round(latency * 1000)} мс, REST: {rest_ms} мс")
+
+    @app_commands.command(name="metrics", description="Метрики производительности бота (только для админов)")
+    @app_commands.guilds(GUILD_ID)
+    async def metrics_command(self, interaction: discord.Interaction):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав на использование этой команды!", ephemeral=True)
+            return
+        text = metrics.summary_text()
+        if len(text) > 1900:
+            text = text[:1900] + "\n..."
+        await interaction.response.send_message(f"```\n{text}\n```", ephemeral=True)
+
+    @app_commands.command(name="say", description="Бот отправит сообщение от своего имени")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(text="Текст для отправки")
+    async def say(self, interaction: discord.Interaction, text: str):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для использования этой команды.", ephemeral=True)
+            return
+        await interaction.response.send_message("Сообщение отправлено.", ephemeral=True)
+        await interaction.channel.send(f"```\n{text}\n```")
+
+    @app_commands.command(name="help", description="Показать список команд")
+    @app_commands.guilds(GUILD_ID)
+    async def help_command(self, interaction: discord.Interaction):
+        await interaction.response.send_message("Доступные команды:\n" + "\n".join(HELP_LINES), ephemeral=True)
+
+    @commands.command(name="say", help="Отправить сообщение от имени бота (только для определённых ролей)")
+    async def owner_say(self, ctx, *, message: str):
+        if not await user_has_allowed_role(ctx.author, ctx.guild):
+            await ctx.send("У вас нет прав для использования этой команды.", delete_after=5)
+            return
+        await ctx.message.delete()
+        await ctx.send(message)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(AdminCog(bot.services))
@@ -0,0 +1,55 @@
+from datetime import datetime, UTC
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from activity_report import ActivityPaginator, activity_order, export_activity, iter_activity_rows
+from services import ALLOWED_ROLES_FOR_RESTART, GAME_ROLE_MAP, Services
+
+
+def game_summary(info: dict) -> dict[str, int]:
+    return info["games"].totals(datetime.now(UTC).timestamp())
+
+
+class GamesCog(commands.Cog):
+    """Игровая активность участников и отчёты по ней."""
+
+    def __init__(self, services: Services):
+        self.services = services
+
+    @app_commands.command(name="activity", description="Активность пользователей за неделю (только для админов)")
+    @app_commands.describe(sort="Порядок сортировки", game="Показать только игроков этой игры", export="Выгрузить отчёт файлом")
+    @app_commands.choices(
+        sort=[
+            app_commands.Choice(name="По сообщениям", value="messages"),
+            app_commands.Choice(name="По времени в голосе", value="voice"),
+            app_commands.Choice(name="По играм", value="games"),
+        ],
+        game=[app_commands.Choice(name=name, value=name) for name in GAME_ROLE_MAP],
+        export=[
+            app_commands.Choice(name="CSV", value="csv"),
+            app_commands.Choice(name="JSON", value="json"),
+        ],
+    )
+    async def activity(self, interaction: discord.Interaction, sort: str = "messages", game: str | None = None, export: str | None = None):
+        allowed = False
+        if hasattr(interaction.user, 'roles'):
+            allowed = any(role.id in ALLOWED_ROLES_FOR_RESTART for role in interaction.user.roles)
+        if not allowed:
+            await interaction.response.send_message("У вас нет прав для этой команды!", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        stats_store = self.services.stats_store
+        uids = await activity_order(stats_store, game_summary, sort=sort, game=game)
+        rows = iter_activity_rows(stats_store, game_summary, uids, game=game)
+        title = f"Активность за неделю ({game})" if game else "Активность за неделю"
+        if export:
+            file = await export_activity(rows, interaction.guild, export)
+            await interaction.followup.send(f"{title}: выгрузка в {export.upper()}", file=file, ephemeral=True)
+            return
+        await ActivityPaginator(rows, interaction.guild, self.services.name_cache, title, interaction.user.id).start(interaction)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(GamesCog(bot.services))
@@ -0,0 +1,174 @@
+from datetime import datetime, UTC
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from moderation import CLEAR_MAX_MESSAGES, MUTE_ROLE_NAME, InteractionProgress
+from services import GUILD_ID, Services, user_has_allowed_role
+from warnings_store import WARN_EXPIRY_DAYS, WARN_MUTE_THRESHOLD
+
+
+def format_warn(index: int, warn: dict) -> str:
+    issued = datetime.fromtimestamp(warn["ts"], UTC).strftime('%Y-%m-%d')
+    return f"{index}. {issued} — Причина: {warn['reason']}"
+
+
+class ModerationCog(commands.Cog):
+    """Очистка чата, предупреждения и муты."""
+
+    def __init__(self, services: Services):
+        self.services = services
+
+    # === Очистка и фоновые задачи ===
+    @app_commands.command(name="clear", description="Очистить сообщения в чате")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(amount=f"Сколько сообщений удалить (по умолчанию 5, не больше {CLEAR_MAX_MESSAGES})")
+    async def clear(self, interaction: discord.Interaction, amount: app_commands.Range[int, 1, CLEAR_MAX_MESSAGES] = 5):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав на использование этой команды!", ephemeral=True)
+            return
+        if not hasattr(interaction.channel, "delete_messages"):
+            await interaction.response.send_message("В этом канале нельзя удалять сообщения.", ephemeral=True)
+            return
+        await interaction.response.send_message(f"Удаляю {amount} сообщений...", ephemeral=True)
+        self.services.moderation.clear(interaction.channel, amount, interaction.user.id, InteractionProgress(interaction, original=True))
+
+    @app_commands.command(name="jobs", description="Фоновые задачи модерации (только для админов)")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(cancel="Номер задачи для отмены")
+    async def jobs(self, interaction: discord.Interaction, cancel: int | None = None):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав на использование этой команды!", ephemeral=True)
+            return
+        moderation = self.services.moderation
+        if cancel is not None:
+            if moderation.cancel(cancel, interaction.guild.id):
+                await interaction.response.send_message(f"Задача #{cancel} отменяется.", ephemeral=True)
+            else:
+                await interaction.response.send_message(f"Задача #{cancel} не найдена или уже завершена.", ephemeral=True)
+            return
+        active = moderation.active(interaction.guild.id)
+        if not active:
+            await interaction.response.send_message("Активных задач нет.", ephemeral=True)
+            return
+        await interaction.response.send_message("\n".join(job.progress_text() for job in active), ephemeral=True)
+
+    # === Предупреждения ===
+    @app_commands.command(name="warn", description="Выдать предупреждение пользователю")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(member="Пользователь для предупреждения", reason="Причина предупреждения")
+    async def warn(self, interaction: discord.Interaction, member: discord.Member, reason: str = "Не указана"):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для выдачи предупреждений!", ephemeral=True)
+            return
+        warn_count = await self.services.warnings_store.add(member.id, interaction.user.id, reason)
+        await interaction.response.send_message(f"Пользователь {member.mention} получил предупреждение. Причина: {reason}", ephemeral=False)
+        if await self.services.mute_for_warns(interaction.guild, member, warn_count, interaction.user.id, InteractionProgress(interaction)):
+            await interaction.followup.send(f"{member.mention} получил мут на 1 час и может писать только в <#1463825318249889889>", ephemeral=False)
+
+    @app_commands.command(name="mywarns", description="Посмотреть свои предупреждения")
+    @app_commands.guilds(GUILD_ID)
+    async def mywarns(self, interaction: discord.Interaction):
+        warns = self.services.warnings_store.active(interaction.user.id)
+        if not warns:
+            await interaction.response.send_message("У вас нет предупреждений!", ephemeral=True)
+            return
+        lines = [format_warn(i, w) for i, w in enumerate(warns, 1)]
+        await interaction.response.send_message("Ваши предупреждения:\n" + "\n".join(lines), ephemeral=True)
+
+    @app_commands.command(name="clearwarns", description="Очистить все предупреждения пользователя")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(member="Пользователь для очистки предупреждений")
+    async def clearwarns(self, interaction: discord.Interaction, member: discord.Member):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для этой команды!", ephemeral=True)
+            return
+        try:
+            deleted = await self.services.warnings_store.clear(member.id)
+        except Exception as e:
+            await interaction.response.send_message(f"Ошибка при удалении предупреждений: {e}", ephemeral=True)
+            return
+        if deleted:
+            await interaction.response.send_message(f"Все предупреждения для {member.mention} были удалены.", ephemeral=False)
+        else:
+            await interaction.response.send_message(f"У пользователя {member.mention} нет предупреждений.", ephemeral=True)
+
+    @app_commands.command(name="warns_list", description="Список предупреждений на сервере (только для админов)")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(member="Показать предупреждения только этого пользователя")
+    async def warns_list(self, interaction: discord.Interaction, member: discord.Member | None = None):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для этой команды!", ephemeral=True)
+            return
+        warnings_store = self.services.warnings_store
+        if member is not None:
+            warns = warnings_store.active(member.id)
+            if not warns:
+                await interaction.response.send_message(f"У пользователя {member.mention} нет предупреждений.", ephemeral=True)
+                return
+            lines = [format_warn(i, w) for i, w in enumerate(warns, 1)]
+            await interaction.response.send_message(f"Предупреждения {member.mention}:\n" + "\n".join(lines), ephemeral=True)
+            return
+        counts = warnings_store.counts()
+        if not counts:
+            await interaction.response.send_message("Действующих предупреждений нет.", ephemeral=True)
+            return
+        shown = counts[:20]
+        names = await self.services.name_cache.resolve(interaction.guild, [user_id for user_id, _ in shown])
+        lines = [f"{i}. {names[user_id]}: {count}" for i, (user_id, count) in enumerate(shown, 1)]
+        if len(counts) > len(shown):
+            lines.append(f"...и ещё {len(counts) - len(shown)} пользователей")
+        await interaction.response.send_message("Пользователи с предупреждениями:\n" + "\n".join(lines), ephemeral=True)
+
+    @app_commands.command(name="warns_stats", description="Статистика предупреждений (только для админов)")
+    @app_commands.guilds(GUILD_ID)
+    async def warns_stats(self, interaction: discord.Interaction):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для этой команды!", ephemeral=True)
+            return
+        stats = self.services.warnings_store.stats()
+        expiry = f"{WARN_EXPIRY_DAYS:g} дн." if WARN_EXPIRY_DAYS else "бессрочно"
+        await interaction.response.send_message(
+            f"Действующих предупреждений: {stats['total']}\n"
+            f"Пользователей с предупреждениями: {stats['users']}\n"
+            f"Достигли порога мута ({WARN_MUTE_THRESHOLD}): {stats['at_threshold']}\n"
+            f"За сутки: {stats['last_day']}, за неделю: {stats['last_week']}\n"
+            f"Срок действия: {expiry}",
+            ephemeral=True
+        )
+
+    # === Муты ===
+    @app_commands.command(name="mute", description="Выдать мут пользователю на X минут")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(member="Пользователь для мута", minutes="На сколько минут (по умолчанию 60)", reason="Причина мута")
+    async def mute(self, interaction: discord.Interaction, member: discord.Member, minutes: int = 60, reason: str = "Не указана"):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для выдачи мута!", ephemeral=True)
+            return
+        moderation = self.services.moderation
+        mute_role = await moderation.ensure_mute_role(interaction.guild, "Мут пользователя через команду")
+        await member.add_roles(mute_role, reason=f"Мут на {minutes} минут. Причина: {reason}")
+        await self.services.mute_scheduler.schedule(interaction.guild.id, member.id, mute_role.id, minutes * 60, reason)
+        await interaction.response.send_message(f"Пользователь {member.mention} получил мут на {minutes} минут. Причина: {reason}", ephemeral=False)
+        # Права роли в каналах настраиваются в фоне, прогресс — эфемерным сообщением модератору
+        moderation.setup_mute_role(interaction.guild, mute_role, interaction.user.id, InteractionProgress(interaction))
+
+    @app_commands.command(name="unmute", description="Снять мут с пользователя")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(member="Пользователь для снятия мута")
+    async def unmute(self, interaction: discord.Interaction, member: discord.Member):
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            await interaction.response.send_message("У вас нет прав для снятия мута!", ephemeral=True)
+            return
+        mute_role = discord.utils.get(interaction.guild.roles, name=MUTE_ROLE_NAME)
+        await self.services.mute_scheduler.cancel(interaction.guild.id, member.id)
+        if mute_role and mute_role in member.roles:
+            await member.remove_roles(mute_role, reason="Снятие мута через команду")
+            await interaction.response.send_message(f"Мут с пользователя {member.mention} снят.", ephemeral=False)
+        else:
+            await interaction.response.send_message(f"У пользователя {member.mention} нет мута.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ModerationCog(bot.services))
@@ -0,0 +1,106 @@
+import os
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from rollups import PERIOD_TITLES
+from services import GUILD_ID, Services, user_has_allowed_role
+
+# === Настройки статистики ===
+TOP_COOLDOWN_SECONDS = int(os.environ.get("TOP_COOLDOWN_SECONDS", 30))
+PERIOD_CHOICES = [
+    app_commands.Choice(name="За всё время", value="all"),
+    app_commands.Choice(name="За сегодня", value="day"),
+    app_commands.Choice(name="За неделю", value="week"),
+    app_commands.Choice(name="За месяц", value="month"),
+]
+
+
+def period_suffix(period: str) -> str:
+    return "" if period == "all" else f" {PERIOD_TITLES[period]}"
+
+
+class StatsCog(commands.Cog):
+    """Статистика сообщений и голоса: топы, места и профиль пользователя."""
+
+    def __init__(self, services: Services):
+        self.services = services
+
+    @app_commands.command(name="userinfo", description="Информация о пользователе")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(member="Пользователь (по умолчанию вы)", period="Период статистики (по умолчанию за всё время)")
+    @app_commands.choices(period=PERIOD_CHOICES)
+    async def userinfo(self, interaction: discord.Interaction, member: discord.Member | None = None, period: str = "all"):
+        if member is None:
+            member = interaction.user if isinstance(interaction.user, discord.Member) else None
+            if member is None and interaction.guild:
+                member = await interaction.guild.fetch_member(interaction.user.id)
+        if member is None:
+            await interaction.response.send_message("Не удалось получить информацию о пользователе.", ephemeral=True)
+            return
+        joined = member.joined_at.strftime('%Y-%m-%d %H:%M:%S') if member.joined_at else 'N/A'
+        self.services.voice_tracker.accrue()
+        msg_count, voice_seconds = await self.services.shared_state.counters(member.id, period)
+        hours = round(voice_seconds / 3600, 2)
+        suffix = period_suffix(period)
+        await interaction.response.send_message(
+            f"Пользователь: {member}\nПрисоединился: {joined}\nСообщений{suffix}: {msg_count}\nЧасов в голосе{suffix}: {hours}",
+            ephemeral=False
+        )
+
+    @app_commands.command(name="top", description="Топ пользователей по количеству сообщений")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(period="Период (по умолчанию за всё время)")
+    @app_commands.choices(period=PERIOD_CHOICES)
+    async def top(self, interaction: discord.Interaction, period: str = "all"):
+        shared_state = self.services.shared_state
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            if not await shared_state.try_cooldown("top", interaction.user.id, TOP_COOLDOWN_SECONDS):
+                await interaction.response.send_message(f"Эту команду можно использовать раз в {TOP_COOLDOWN_SECONDS} секунд.", ephemeral=True)
+                return
+        top_stats = await shared_state.top("messages", 10, period)
+        names = await self.services.name_cache.resolve(interaction.guild, [uid for uid, _ in top_stats])
+        lines = []
+        for i, (user_id_stat, count) in enumerate(top_stats, 1):
+            lines.append(f"{i}. {names[user_id_stat]}: {count} сообщений")
+        if not lines:
+            lines = ["Нет данных."]
+        await interaction.response.send_message(f"Топ по сообщениям{period_suffix(period)}:\n" + "\n".join(lines), ephemeral=False)
+
+    @app_commands.command(name="voice_top", description="Топ пользователей по времени в голосовых каналах")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(period="Период (по умолчанию за всё время)")
+    @app_commands.choices(period=PERIOD_CHOICES)
+    async def voice_top(self, interaction: discord.Interaction, period: str = "all"):
+        shared_state = self.services.shared_state
+        if not await user_has_allowed_role(interaction.user, interaction.guild):
+            if not await shared_state.try_cooldown("voice_top", interaction.user.id, TOP_COOLDOWN_SECONDS):
+                await interaction.response.send_message(f"Эту команду можно использовать раз в {TOP_COOLDOWN_SECONDS} секунд.", ephemeral=True)
+                return
+        self.services.voice_tracker.accrue()
+        top_stats = await shared_state.top("voice", 10, period)
+        names = await self.services.name_cache.resolve(interaction.guild, [uid for uid, _ in top_stats])
+        lines = []
+        for i, (user_id_stat, seconds) in enumerate(top_stats, 1):
+            hours = round(seconds / 3600, 2)
+            lines.append(f"{i}. {names[user_id_stat]}: {hours} ч.")
+        if not lines:
+            lines = ["Нет данных."]
+        await interaction.response.send_message(f"Топ по времени в голосе{period_suffix(period)}:\n" + "\n".join(lines), ephemeral=False)
+
+    @app_commands.command(name="myrank", description="Ваше место в топе по сообщениям")
+    @app_commands.guilds(GUILD_ID)
+    @app_commands.describe(period="Период (по умолчанию за всё время)")
+    @app_commands.choices(period=PERIOD_CHOICES)
+    async def myrank(self, interaction: discord.Interaction, period: str = "all"):
+        user_id = interaction.user.id
+        rank, msg_count = await self.services.shared_state.rank("messages", user_id, period)
+        if rank:
+            await interaction.response.send_message(f"Ваше место в топе{period_suffix(period)}: {rank}\nСообщений: {msg_count}", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"Вы пока не в топе по сообщениям{period_suffix(period)}.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(StatsCog(bot.services))
@@ -0,0 +1,49 @@
+import hashlib
+import json
+from pathlib import Path
+
+import discord
+
+import persistence
+
+# === Условная синхронизация слэш-команд ===
+COMMAND_HASH_FILE = Path(__file__).parent / "command_tree_hash.json"
+
+
+def tree_hash(tree: discord.app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    """Хеш того, что уйдёт в Discord при синхронизации области (глобальной или сервера)."""
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda data: (data.get("type", 1), data["name"]),
+    )
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _scope_key(application_id: int, guild: discord.abc.Snowflake | None) -> str:
+    return f"{application_id}:{guild.id if guild is not None else 'global'}"
+
+
+async def sync_tree(tree: discord.app_commands.CommandTree, application_id: int,
+                    guilds: list[discord.abc.Snowflake | None], force: bool = False,
+                    path: Path = COMMAND_HASH_FILE) -> list[str]:
+    """Синхронизирует только области, чьё дерево команд изменилось с прошлой синхронизации.
+
+    Хеши последних синхронизаций хранятся в ``path``; ``force`` синхронизирует
+    все области. Возвращает ключи синхронизированных областей.
+    """
+    saved = await persistence.read_json(path, {}) or {}
+    synced = []
+    try:
+        for guild in guilds:
+            key = _scope_key(application_id, guild)
+            digest = tree_hash(tree, guild)
+            if not force and saved.get(key) == digest:
+                continue
+            await tree.sync(guild=guild)
+            saved[key] = digest
+            synced.append(key)
+    finally:
+        if synced:
+            await persistence.write_json(path, dict(saved))
+    return synced
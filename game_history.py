@@ -0,0 +1,98 @@
+import os
+import sys
+from array import array
+
+# === История игр по дням ===
+HISTORY_DAYS = int(os.environ.get("HISTORY_DAYS", 7))
+DAY_SECONDS = 86400
+
+
+def day_of(ts: float) -> int:
+    return int(ts // DAY_SECONDS)
+
+
+class GameBuckets:
+    """Кольцевой буфер на ``HISTORY_DAYS`` суточных корзин: секунды игры по каждой игре.
+
+    Слот дня ``d`` — ``d % HISTORY_DAYS``; при переходе на новый день обнуляются
+    только устаревшие слоты, поэтому очистка истории стоит O(1) и размер
+    записи не растёт со временем.
+    """
+
+    __slots__ = ("day", "games")
+
+    def __init__(self, day: int | None = None, games: dict[str, array] | None = None):
+        self.day = day
+        self.games = games if games is not None else {}
+
+    def __bool__(self):
+        return bool(self.games)
+
+    def _advance(self, day: int):
+        if self.day is None or day >= self.day + HISTORY_DAYS:
+            self.games.clear()
+            self.day = day
+            return
+        if day <= self.day:
+            return
+        for slots in self.games.values():
+            for d in range(self.day + 1, day + 1):
+                slots[d % HISTORY_DAYS] = 0
+        self.day = day
+        for game in [g for g, slots in self.games.items() if not any(slots)]:
+            del self.games[game]
+
+    def add(self, game: str, start_ts: float, end_ts: float):
+        if end_ts <= start_ts:
+            return
+        end_day = day_of(end_ts)
+        if self.day is None or end_day > self.day:
+            self._advance(end_day)
+        first_day = max(day_of(start_ts), self.day - HISTORY_DAYS + 1)
+        last_day = min(end_day, self.day)
+        if first_day > last_day:
+            return
+        slots = self.games.get(game)
+        if slots is None:
+            slots = self.games[sys.intern(game)] = array("I", bytes(4 * HISTORY_DAYS))
+        for day in range(first_day, last_day + 1):
+            lo = max(start_ts, day * DAY_SECONDS)
+            hi = min(end_ts, (day + 1) * DAY_SECONDS)
+            if hi > lo:
+                slots[day % HISTORY_DAYS] += int(hi - lo)
+
+    def totals(self, now_ts: float) -> dict[str, int]:
+        """Секунды игры по играм за последние ``HISTORY_DAYS`` дней, без изменения буфера."""
+        if self.day is None:
+            return {}
+        today = day_of(now_ts)
+        first = max(self.day - HISTORY_DAYS + 1, today - HISTORY_DAYS + 1)
+        if first > self.day:
+            return {}
+        result = {}
+        for game, slots in self.games.items():
+            seconds = sum(slots[d % HISTORY_DAYS] for d in range(first, self.day + 1))
+            if seconds:
+                result[game] = seconds
+        return result
+
+    # === Сериализация ===
+    def to_json(self) -> dict:
+        return {"day": self.day, "games": {game: slots.tolist() for game, slots in self.games.items()}}
+
+    @classmethod
+    def from_json(cls, raw) -> "GameBuckets":
+        # Старый формат — список событий [игра, время] без длительности: перенести его нельзя
+        if not isinstance(raw, dict) or raw.get("day") is None:
+            return cls()
+        games = {}
+        for game, slots in raw.get("games", {}).items():
+            if len(slots) == HISTORY_DAYS:
+                games[sys.intern(game)] = array("I", slots)
+        return cls(raw["day"], games)
+
+
+def games_to_json(games) -> dict:
+    if isinstance(games, GameBuckets):
+        return games.to_json()
+    return GameBuckets.from_json(games).to_json()
@@ -0,0 +1,168 @@
+import asyncio
+import os
+from datetime import datetime, UTC
+
+import discord
+
+# === Настройки игровых ролей ===
+GAME_ROLE_MIN_HOURS = float(os.environ.get("GAME_ROLE_MIN_HOURS", 5))
+GAME_ROLE_INTERVAL = float(os.environ.get("GAME_ROLE_INTERVAL", 900))
+GAME_ROLE_REQUEST_DELAY = float(os.environ.get("GAME_ROLE_REQUEST_DELAY", 1.0))
+
+
+class GameRoleEngine:
+    """Выдаёт и снимает роли из GAME_ROLE_MAP по наигранному за HISTORY_DAYS времени.
+
+    Раз в ``interval`` секунд желаемый набор ролей считается сразу для всех
+    пользователей (с учётом ещё идущих игровых сессий) и сравнивается с
+    текущим. Снимаются только роли, которые выдал сам бот: их список хранится
+    в бэкенде, поэтому роли, выданные вручную, не трогаются. Расхождения
+    ставятся в очередь по участнику (новый план заменяет невыполненный старый)
+    и разбираются одним воркером: не больше одного add_roles и одного
+    remove_roles на участника, с паузой между запросами и ожиданием при 429.
+    """
+
+    def __init__(self, bot, stats_store, presence, backend, role_map: dict[str, int], guild_id: int,
+                 min_hours: float = GAME_ROLE_MIN_HOURS, interval: float = GAME_ROLE_INTERVAL,
+                 request_delay: float = GAME_ROLE_REQUEST_DELAY):
+        self.bot = bot
+        self.stats_store = stats_store
+        self.presence = presence
+        self.backend = backend
+        self.role_map = role_map
+        self.guild_id = guild_id
+        self.min_seconds = min_hours * 3600
+        self.interval = interval
+        self.request_delay = request_delay
+        self._queue: dict[int, tuple[set[int], set[int]]] = {}
+        self._queue_event = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        # Роли, выданные ботом: user_id -> id ролей
+        self._granted: dict[int, set[int]] = {}
+
+    async def load(self):
+        for guild_id, user_id, role_id in await self.backend.load_game_roles():
+            if guild_id == self.guild_id:
+                self._granted.setdefault(user_id, set()).add(role_id)
+
+    def _roles_for(self, totals: dict[str, float]) -> set[int]:
+        return {
+            self.role_map[game]
+            for game, seconds in totals.items()
+            if game in self.role_map and seconds >= self.min_seconds
+        }
+
+    def desired_roles(self, now_ts: float) -> dict[int, set[int]]:
+        playing: dict[int, dict[str, float]] = {}
+        for (user_id, game), seconds in self.presence.open_seconds(now_ts).items():
+            playing.setdefault(user_id, {})[game] = seconds
+        desired = {}
+        for uid, info in self.stats_store.items():
+            totals = info["games"].totals(now_ts)
+            open_games = playing.pop(int(uid), None)
+            if open_games:
+                for game, seconds in open_games.items():
+                    totals[game] = totals.get(game, 0) + seconds
+            roles = self._roles_for(totals)
+            if roles:
+                desired[int(uid)] = roles
+        # Первая сессия ещё не попала в статистику
+        for user_id, open_games in playing.items():
+            roles = self._roles_for(open_games)
+            if roles:
+                desired[user_id] = roles
+        return desired
+
+    def plan(self, guild: discord.Guild) -> dict[int, tuple[set[int], set[int]]]:
+        managed = set(self.role_map.values())
+        desired = self.desired_roles(datetime.now(UTC).timestamp())
+        changes = {}
+        for user_id in desired.keys() | self._granted.keys():
+            member = guild.get_member(user_id)
+            if member is None or member.bot:
+                continue
+            current = {role.id for role in member.roles} & managed
+            want = desired.get(user_id, set())
+            to_add = want - current
+            # Снятую вручную роль тоже вычёркиваем из выданных: запрос к Discord не уйдёт
+            to_remove = self._granted.get(user_id, set()) - want
+            if to_add or to_remove:
+                changes[user_id] = (to_add, to_remove)
+        return changes
+
+    async def reconcile(self):
+        guild = self.bot.get_guild(self.guild_id)
+        if guild is None:
+            return
+        changes = self.plan(guild)
+        self._queue.update(changes)
+        if self._queue:
+            self._queue_event.set()
+        if changes:
+            print(f"[game_roles] Изменений ролей в очереди: {len(self._queue)}")
+
+    async def _apply(self, guild: discord.Guild, user_id: int, to_add: set[int], to_remove: set[int]):
+        member = guild.get_member(user_id)
+        if member is None:
+            return
+        reason = "Автоматические игровые роли"
+        add = [role for role in map(guild.get_role, to_add) if role is not None and role not in member.roles]
+        remove = [role for role in map(guild.get_role, to_remove) if role is not None and role in member.roles]
+        granted = [(guild.id, user_id, role.id) for role in add]
+        revoked = [(guild.id, user_id, role_id) for role_id in to_remove]
+        for call, roles, changed in ((member.add_roles, add, granted), (member.remove_roles, remove, revoked)):
+            if not roles:
+                continue
+            while True:
+                try:
+                    await call(*roles, reason=reason)
+                    break
+                except discord.HTTPException as e:
+                    if e.status != 429:
+                        print(f"[game_roles] Ошибка изменения ролей {user_id}: {e}")
+                        changed.clear()
+                        break
+                    await asyncio.sleep(getattr(e, "retry_after", None) or 5)
+            await asyncio.sleep(self.request_delay)
+        await self._record(user_id, granted, revoked)
+
+    async def _record(self, user_id: int, granted: list[tuple[int, int, int]], revoked: list[tuple[int, int, int]]):
+        if not granted and not revoked:
+            return
+        roles = self._granted.setdefault(user_id, set())
+        roles.difference_update(role_id for _, _, role_id in revoked)
+        roles.update(role_id for _, _, role_id in granted)
+        if not roles:
+            del self._granted[user_id]
+        try:
+            await self.backend.update_game_roles(granted, revoked)
+        except Exception as e:
+            print(f"[game_roles] Ошибка сохранения выданных ролей {user_id}: {e}")
+
+    async def _worker(self):
+        while True:
+            await self._queue_event.wait()
+            self._queue_event.clear()
+            guild = self.bot.get_guild(self.guild_id)
+            while self._queue and guild is not None:
+                user_id = next(iter(self._queue))
+                to_add, to_remove = self._queue.pop(user_id)
+                await self._apply(guild, user_id, to_add, to_remove)
+
+    async def _reconcile_loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                print(f"[game_roles] Ошибка сверки ролей: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._reconcile_loop()), asyncio.create_task(self._worker())]
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
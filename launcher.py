@@ -0,0 +1,112 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+# === Запуск нескольких процессов бота ===
+# Каждый воркер — отдельный процесс bot.py со своей группой шардов.
+# Код выхода RESTART_EXIT_CODE (/restart) перезапускает все воркеры,
+# код 0 (/stop) останавливает всех, остальные — перезапуск упавшего воркера.
+RESTART_EXIT_CODE = 75
+WORKERS = int(os.environ.get("WORKERS", 2))
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", WORKERS))
+MAX_BACKOFF = 60
+BOT_SCRIPT = Path(__file__).with_name("bot.py")
+
+
+def shard_groups(shard_count: int, workers: int) -> list[list[int]]:
+    workers = min(workers, shard_count)
+    groups = [[] for _ in range(workers)]
+    for shard_id in range(shard_count):
+        groups[shard_id * workers // shard_count].append(shard_id)
+    return groups
+
+
+class Worker:
+    def __init__(self, index: int, shard_ids: list[int]):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process: asyncio.subprocess.Process | None = None
+        self.started_at = 0.0
+        self.backoff = 1
+        self.restart_requested = False
+
+    async def spawn(self):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(SHARD_COUNT),
+            SHARD_IDS=",".join(map(str, self.shard_ids)),
+            WORKER_ID=str(self.index),
+            BOT_SUPERVISED="1",
+        )
+        self.process = await asyncio.create_subprocess_exec(sys.executable, str(BOT_SCRIPT), env=env)
+        self.started_at = time.monotonic()
+        print(f"[launcher] Воркер {self.index} (шарды {self.shard_ids}) запущен, pid {self.process.pid}")
+
+    async def wait(self) -> int:
+        return await self.process.wait()
+
+    async def stop(self, timeout: float = 30):
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+
+class Launcher:
+    def __init__(self, workers: int = WORKERS, shard_count: int = SHARD_COUNT):
+        self.workers = [Worker(i, ids) for i, ids in enumerate(shard_groups(shard_count, workers))]
+        self._stopping = False
+
+    async def stop_all(self):
+        self._stopping = True
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+
+    async def _supervise(self, worker: Worker):
+        while not self._stopping:
+            await worker.spawn()
+            code = await worker.wait()
+            if self._stopping:
+                return
+            if worker.restart_requested:
+                worker.restart_requested = False
+                continue
+            if code == 0:
+                print(f"[launcher] Воркер {worker.index} остановлен командой, выключаем все воркеры")
+                asyncio.create_task(self.stop_all())
+                return
+            if code == RESTART_EXIT_CODE:
+                print(f"[launcher] Воркер {worker.index} запросил перезапуск всех воркеров")
+                others = [w for w in self.workers if w is not worker]
+                for other in others:
+                    other.restart_requested = True
+                await asyncio.gather(*(other.stop() for other in others))
+                worker.backoff = 1
+                continue
+            if time.monotonic() - worker.started_at > MAX_BACKOFF:
+                worker.backoff = 1
+            print(f"[launcher] Воркер {worker.index} завершился с кодом {code}, перезапуск через {worker.backoff} с")
+            await asyncio.sleep(worker.backoff)
+            worker.backoff = min(worker.backoff * 2, MAX_BACKOFF)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, lambda: asyncio.create_task(self.stop_all()))
+        await asyncio.gather(*(self._supervise(worker) for worker in self.workers))
+
+
+def main():
+    if WORKERS > 1 and os.environ.get("STORAGE_BACKEND") != "postgres":
+        raise SystemExit("Несколько воркеров требуют общего хранилища: установите STORAGE_BACKEND=postgres и DATABASE_URL.")
+    asyncio.run(Launcher().run())
+
+
+if __name__ == "__main__":
+    main()
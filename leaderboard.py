@@ -0,0 +1,100 @@
+from bisect import bisect_left, insort
+from itertools import accumulate
+
+
+class RankIndex:
+    """Упорядоченный индекс пользователей по убыванию счётчика.
+
+    Ключи ``(-count, uid)`` хранятся в отсортированных блоках ограниченного
+    размера (как в sortedcontainers): обновление стоит O(log n + load),
+    топ-k — O(k), место пользователя — O(log n) плюс ленивый пересчёт
+    префиксных сумм размеров блоков после изменений.
+    """
+
+    def __init__(self, load: int = 512):
+        self._load = load
+        self._lists: list[list[tuple[int, int]]] = []
+        self._maxes: list[tuple[int, int]] = []
+        self._offsets: list[int] | None = None
+        self._values: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, uid: int):
+        return uid in self._values
+
+    def get(self, uid: int, default: int = 0) -> int:
+        return self._values.get(uid, default)
+
+    # === Изменение ===
+    def rebuild(self, items):
+        self._values = dict(items)
+        keys = sorted((-count, uid) for uid, count in self._values.items())
+        self._lists = [keys[i:i + self._load] for i in range(0, len(keys), self._load)]
+        self._maxes = [lst[-1] for lst in self._lists]
+        self._offsets = None
+
+    def update(self, uid: int, count: int):
+        old = self._values.get(uid)
+        if old == count:
+            return
+        if old is not None:
+            self._remove((-old, uid))
+        self._values[uid] = count
+        self._insert((-count, uid))
+
+    def discard(self, uid: int):
+        old = self._values.pop(uid, None)
+        if old is not None:
+            self._remove((-old, uid))
+
+    def _insert(self, key):
+        self._offsets = None
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            return
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            pos -= 1
+        lst = self._lists[pos]
+        insort(lst, key)
+        self._maxes[pos] = lst[-1]
+        if len(lst) > 2 * self._load:
+            half = lst[self._load:]
+            del lst[self._load:]
+            self._maxes[pos] = lst[-1]
+            self._lists.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+
+    def _remove(self, key):
+        self._offsets = None
+        pos = bisect_left(self._maxes, key)
+        lst = self._lists[pos]
+        del lst[bisect_left(lst, key)]
+        if lst:
+            self._maxes[pos] = lst[-1]
+        else:
+            del self._lists[pos]
+            del self._maxes[pos]
+
+    # === Запросы ===
+    def top(self, k: int) -> list[tuple[int, int]]:
+        result = []
+        for lst in self._lists:
+            for neg_count, uid in lst:
+                if len(result) >= k:
+                    return result
+                result.append((uid, -neg_count))
+        return result
+
+    def rank(self, uid: int) -> int | None:
+        count = self._values.get(uid)
+        if count is None:
+            return None
+        key = (-count, uid)
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(lst) for lst in self._lists)]
+        pos = bisect_left(self._maxes, key)
+        return self._offsets[pos] + bisect_left(self._lists[pos], key) + 1
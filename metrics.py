@@ -0,0 +1,347 @@
+import bisect
+import logging
+import os
+import time
+from functools import wraps
+
+import discord
+from discord import app_commands
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+# === Настройки метрик ===
+# METRICS_ENABLED=0 отключает сбор: декораторы возвращают функцию без обёртки,
+# таймеры становятся пустыми, а HTTP-клиент и дерево команд не подменяются.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STARTED_AT = time.monotonic()
+
+_histograms: dict[str, dict[str, "Histogram"]] = {}
+_counters: dict[str, dict[str, float]] = {}
+_gauges: dict[str, object] = {}
+_startup: dict[str, float] = {}
+_runner = None
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами (секунды)."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля q сверху: граница корзины, но не больше максимума."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+def histogram(family: str, name: str) -> Histogram:
+    series = _histograms.setdefault(family, {})
+    hist = series.get(name)
+    if hist is None:
+        hist = series[name] = Histogram()
+    return hist
+
+
+def observe(family: str, name: str, seconds: float):
+    if METRICS_ENABLED:
+        histogram(family, name).observe(seconds)
+
+
+def inc(family: str, name: str, value: float = 1):
+    if METRICS_ENABLED:
+        series = _counters.setdefault(family, {})
+        series[name] = series.get(name, 0) + value
+
+
+def register_gauge(name: str, func):
+    _gauges[name] = func
+
+
+def mark_startup(stage: str, seconds: float):
+    """Длительность этапа запуска (вход, загрузка данных, подключение к шлюзу...)."""
+    _startup[stage] = seconds
+
+
+def startup_text() -> str:
+    return ", ".join(f"{stage} {seconds:.2f} с" for stage, seconds in _startup.items())
+
+
+class _Timer:
+    __slots__ = ("hist", "started")
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timer(family: str, name: str):
+    """Контекстный менеджер, замеряющий блок кода: ``with metrics.timer("storage", "flush"):``."""
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _Timer(histogram(family, name))
+
+
+def timed(family: str, name: str | None = None):
+    """Декоратор корутины: длительность каждого вызова попадает в гистограмму ``family``."""
+
+    def decorator(func):
+        if not METRICS_ENABLED:
+            return func
+        hist = histogram(family, name or func.__name__)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+# === Интеграция с discord.py ===
+class MetricsCommandTree(app_commands.CommandTree):
+    """Дерево команд, замеряющее время выполнения каждой слэш-команды."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras["metrics_started"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        command = interaction.command
+        if command is not None:
+            _finish_command(interaction, command)
+            inc("command_errors", command.qualified_name)
+        await super().on_error(interaction, error)
+
+
+def command_tree_cls():
+    return MetricsCommandTree if METRICS_ENABLED else app_commands.CommandTree
+
+
+def _finish_command(interaction: discord.Interaction, command):
+    started = interaction.extras.get("metrics_started")
+    if started is not None:
+        observe("command", command.qualified_name, time.perf_counter() - started)
+
+
+async def _on_app_command_completion(interaction: discord.Interaction, command):
+    _finish_command(interaction, command)
+
+
+def _instrument_http(http):
+    original = http.request
+
+    async def request(route, *args, **kwargs):
+        key = f"{route.method} {route.path}"
+        started = time.perf_counter()
+        try:
+            return await original(route, *args, **kwargs)
+        except discord.HTTPException as e:
+            inc("rest_errors", f"{key} {e.status}")
+            raise
+        finally:
+            observe("rest", key, time.perf_counter() - started)
+
+    http.request = request
+
+
+class RateLimitLogHandler(logging.Handler):
+    """Достаёт время ожидания лимитов из предупреждений discord.http и discord.gateway."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+
+    def emit(self, record: logging.LogRecord):
+        msg = record.msg
+        if not isinstance(msg, str):
+            return
+        try:
+            if msg.startswith("We are being rate limited") and "Retrying in" in msg:
+                observe("ratelimit_wait", "rest", float(record.args[2]))
+            elif "is ratelimited, waiting" in msg:
+                observe("ratelimit_wait", "gateway", float(record.args[1]))
+            elif msg.startswith("Global rate limit has been hit"):
+                inc("ratelimit_global", "rest")
+        except (IndexError, TypeError, ValueError):
+            pass
+
+
+def install(bot):
+    """Подключает учёт REST-запросов, лимитов и времени команд к боту."""
+    if not METRICS_ENABLED:
+        return
+    bot.add_listener(_on_app_command_completion, "on_app_command_completion")
+    _instrument_http(bot.http)
+    handler = RateLimitLogHandler()
+    logging.getLogger("discord.http").addHandler(handler)
+    logging.getLogger("discord.gateway").addHandler(handler)
+    register_gauge("gateway_latency_seconds", lambda: bot.latency)
+
+
+# === Отчёты ===
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """Все метрики в текстовом формате Prometheus."""
+    lines = [
+        "# TYPE bot_uptime_seconds gauge",
+        f"bot_uptime_seconds {_format_value(time.monotonic() - STARTED_AT)}",
+    ]
+    for name, func in sorted(_gauges.items()):
+        try:
+            value = float(func())
+        except Exception:
+            continue
+        lines.append(f"# TYPE bot_{name} gauge")
+        lines.append(f"bot_{name} {_format_value(value)}")
+    if _startup:
+        lines.append("# TYPE bot_startup_seconds gauge")
+        for stage, seconds in _startup.items():
+            lines.append(f'bot_startup_seconds{{stage="{_escape(stage)}"}} {_format_value(seconds)}')
+    for family, series in sorted(_counters.items()):
+        lines.append(f"# TYPE bot_{family}_total counter")
+        for name, value in sorted(series.items()):
+            lines.append(f'bot_{family}_total{{name="{_escape(name)}"}} {_format_value(value)}')
+    for family, series in sorted(_histograms.items()):
+        metric = f"bot_{family}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for name, hist in sorted(series.items()):
+            label = _escape(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, hist.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{name="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{name="{label}",le="+Inf"}} {hist.count}')
+            lines.append(f'{metric}_sum{{name="{label}"}} {_format_value(hist.sum)}')
+            lines.append(f'{metric}_count{{name="{label}"}} {hist.count}')
+    return "\n".join(lines) + "\n"
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+def _hist_lines(title: str, family: str, limit: int, uptime: float) -> list[str]:
+    series = _histograms.get(family)
+    if not series:
+        return []
+    lines = [title]
+    ranked = sorted(series.items(), key=lambda item: item[1].count, reverse=True)
+    for name, hist in ranked[:limit]:
+        lines.append(
+            f"  {name}: {hist.count} ({hist.count / uptime:.2f}/с), "
+            f"p50 {_ms(hist.quantile(0.5))} мс, p95 {_ms(hist.quantile(0.95))} мс, макс {_ms(hist.max)} мс"
+        )
+    if len(ranked) > limit:
+        lines.append(f"  ... и ещё {len(ranked) - limit}")
+    return lines
+
+
+def summary_text(limit: int = 8) -> str:
+    """Краткая сводка для команды /metrics."""
+    if not METRICS_ENABLED:
+        return "Метрики отключены (METRICS_ENABLED=0)."
+    uptime = max(time.monotonic() - STARTED_AT, 1e-9)
+    lines = [f"Аптайм: {int(uptime // 3600)} ч {int(uptime % 3600 // 60)} мин"]
+    if _startup:
+        lines.append(f"Запуск: {startup_text()}")
+    lines += _hist_lines("События:", "event", limit, uptime)
+    lines += _hist_lines("Команды:", "command", limit, uptime)
+    lines += _hist_lines("Хранилище:", "storage", limit, uptime)
+    lines += _hist_lines("REST:", "rest", limit, uptime)
+    lines += _hist_lines("Ожидание лимитов:", "ratelimit_wait", limit, uptime)
+    for family, title in (("command_errors", "Ошибки команд"), ("rest_errors", "Ошибки REST"),
+                          ("ratelimit_global", "Глобальные лимиты"), ("antispam", "Антиспам")):
+        series = _counters.get(family)
+        if series:
+            total = int(sum(series.values()))
+            worst = max(series.items(), key=lambda item: item[1])
+            lines.append(f"{title}: {total} (чаще всего {worst[0]}: {int(worst[1])})")
+    return "\n".join(lines)
+
+
+async def _handle_metrics(request):
+    return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+
+async def start_http_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Поднимает эндпоинт /metrics для Prometheus; без aiohttp или при METRICS_ENABLED=0 ничего не делает."""
+    global _runner
+    if not METRICS_ENABLED or not port or _runner is not None:
+        return
+    if web is None:
+        print("[metrics] aiohttp не установлен, HTTP-эндпоинт метрик отключён")
+        return
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _runner = runner
+    print(f"[metrics] Эндпоинт Prometheus: http://{host}:{port}/metrics")
+
+
+async def stop_http_server():
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
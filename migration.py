@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import persistence
+
+# === Настройки миграции ===
+MIGRATE_WORKERS = int(os.environ.get("MIGRATE_WORKERS", 8))
+MIGRATE_BATCH = int(os.environ.get("MIGRATE_BATCH", 256))
+MIGRATE_PROGRESS_INTERVAL = float(os.environ.get("MIGRATE_PROGRESS_INTERVAL", 5))
+MIGRATE_STATE_PATH = Path("migrate_state.json")
+
+
+def _discover(root: Path) -> list[tuple[str, float]]:
+    files = []
+    for pattern in ("userstats_*.json", "gamehistory_*.json"):
+        for path in root.glob(pattern):
+            try:
+                files.append((path.name, path.stat().st_mtime))
+            except OSError:
+                pass
+    files.sort()
+    return files
+
+
+def _read_file(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class MigrationJob:
+    """Фоновый импорт старых userstats_<id>.json / gamehistory_<id>.json в хранилище статистики.
+
+    Файлы читаются параллельно в отдельном пуле потоков и вливаются в
+    статистику пачками. Счётчики объединяются по максимуму, поэтому повторный
+    запуск ничего не удваивает, а обработанные файлы (имя и mtime) запоминаются
+    в ``migrate_state.json``, и прерванная миграция продолжается с места остановки.
+    """
+
+    def __init__(self, stats_store, root: Path = Path("."), state_path: Path = MIGRATE_STATE_PATH):
+        self.stats_store = stats_store
+        self.root = Path(root)
+        self.state_path = Path(state_path)
+        self.total = 0
+        self.done = 0
+        self.skipped = 0
+        self.merged_users: set[str] = set()
+        self.legacy_games = 0
+        self.errors: list[str] = []
+        self.task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def progress_text(self) -> str:
+        return f"Миграция: обработано {self.done + self.skipped}/{self.total} файлов, пользователей: {len(self.merged_users)}"
+
+    def summary_text(self) -> str:
+        lines = [
+            "Миграция завершена!",
+            f"Файлов всего: {self.total}, импортировано: {self.done}, уже были импортированы: {self.skipped}",
+            f"Обновлено пользователей: {len(self.merged_users)}",
+        ]
+        if self.legacy_games:
+            lines.append(f"Файлов истории игр без длительности (пропущены): {self.legacy_games}")
+        if self.errors:
+            lines.append(f"Ошибок: {len(self.errors)} (первая: {self.errors[0]})")
+        return "\n".join(lines)
+
+    def _merge(self, name: str, payload):
+        uid = Path(name).stem.split("_", 1)[1]
+        if not uid.isdigit():
+            raise ValueError(f"некорректный id в имени {name}")
+        if name.startswith("userstats_"):
+            self.stats_store.raise_counters(uid, int(payload.get("messages", 0)), int(payload.get("voice_seconds", 0)))
+            self.merged_users.add(uid)
+        else:
+            # Старая история игр — список событий без длительности, в суточные корзины её не перенести
+            self.legacy_games += 1
+
+    async def run(self, report):
+        try:
+            await self._run(report)
+        except Exception as e:
+            print(f"[migrate] Миграция прервана: {e}")
+            await self._report(report, f"Миграция прервана: {e}\n{self.progress_text()}")
+
+    async def _run(self, report):
+        state = await persistence.read_json(self.state_path, {})
+        processed: dict[str, float] = state.get("processed", {})
+        files = await persistence.run_io(_discover, self.root)
+        self.total = len(files)
+        pending = []
+        for name, mtime in files:
+            if processed.get(name) == mtime:
+                self.skipped += 1
+            else:
+                pending.append((name, mtime))
+        loop = asyncio.get_running_loop()
+        last_report = time.monotonic()
+        with ThreadPoolExecutor(max_workers=MIGRATE_WORKERS, thread_name_prefix="bot-migrate") as executor:
+            for i in range(0, len(pending), MIGRATE_BATCH):
+                batch = pending[i:i + MIGRATE_BATCH]
+                results = await asyncio.gather(
+                    *(loop.run_in_executor(executor, _read_file, self.root / name) for name, _ in batch),
+                    return_exceptions=True,
+                )
+                for (name, mtime), payload in zip(batch, results):
+                    try:
+                        if isinstance(payload, Exception):
+                            raise payload
+                        self._merge(name, payload)
+                        processed[name] = mtime
+                        self.done += 1
+                    except Exception as e:
+                        self.errors.append(f"{name}: {e}")
+                        print(f"Ошибка миграции {name}: {e}")
+                # Сначала сохраняем статистику, потом отмечаем файлы обработанными
+                await self.stats_store.flush()
+                await persistence.write_json(self.state_path, {"processed": dict(processed)})
+                if time.monotonic() - last_report >= MIGRATE_PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    await self._report(report, self.progress_text())
+        await self.stats_store.flush()
+        await self._report(report, self.summary_text())
+
+    async def _report(self, report, text: str):
+        try:
+            await report(text)
+        except Exception as e:
+            print(f"[migrate] Не удалось отправить прогресс: {e}")
+
+    def start(self, report) -> asyncio.Task:
+        self.task = asyncio.create_task(self.run(report))
+        return self.task
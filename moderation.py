@@ -0,0 +1,277 @@
+import asyncio
+import itertools
+import os
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+import discord
+
+# === Настройки массовой модерации ===
+CLEAR_MAX_MESSAGES = int(os.environ.get("CLEAR_MAX_MESSAGES", 1000))
+MODERATION_CONCURRENCY = int(os.environ.get("MODERATION_CONCURRENCY", 4))
+MODERATION_PROGRESS_INTERVAL = float(os.environ.get("MODERATION_PROGRESS_INTERVAL", 3))
+MUTE_ROLE_NAME = "Muted"
+# Каналы, где замученным можно писать (например, канал для обжалования)
+MUTE_ALLOWED_CHANNELS = {
+    int(x) for x in os.environ.get("MUTE_ALLOWED_CHANNELS", "1463825318249889889").split(",") if x.strip()
+}
+# Discord удаляет пачкой только сообщения моложе 14 дней; запас на расхождение часов
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+BULK_DELETE_BATCH = 100
+
+STATUS_TEXT = {"running": "выполняется", "done": "завершено", "cancelled": "отменено", "failed": "ошибка"}
+
+
+class ModerationJob:
+    """Фоновая массовая операция модерации с прогрессом и отменой."""
+
+    def __init__(self, job_id: int, kind: str, guild_id: int, title: str, requested_by: int):
+        self.id = job_id
+        self.kind = kind
+        self.guild_id = guild_id
+        self.title = title
+        self.requested_by = requested_by
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.status = "running"
+        self.error: str | None = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    def progress_text(self) -> str:
+        text = f"#{self.id} {self.title}: {self.done}/{self.total}"
+        if self.failed:
+            text += f", ошибок: {self.failed}"
+        text += f" — {STATUS_TEXT[self.status]}"
+        if self.error:
+            text += f" ({self.error})"
+        return text
+
+    def cancel(self) -> bool:
+        if self.task is None or self.task.done():
+            return False
+        self.task.cancel()
+        return True
+
+
+class ModerationExecutor:
+    """Исполнитель массовых операций модерации в фоне.
+
+    Запросы к одному каналу идут по очереди (у Discord это один бакет
+    лимитов), а общее число одновременных запросов ограничено
+    ``concurrency``, чтобы не упираться в глобальный лимит. Прогресс
+    периодически отправляется через ``report``, задачи можно отменить.
+    """
+
+    def __init__(self, concurrency: int = MODERATION_CONCURRENCY,
+                 progress_interval: float = MODERATION_PROGRESS_INTERVAL):
+        self.progress_interval = progress_interval
+        self.jobs: dict[int, ModerationJob] = {}
+        self._ids = itertools.count(1)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._buckets: dict[str, asyncio.Lock] = {}
+        self._mute_ready: dict[int, int] = {}
+
+    @asynccontextmanager
+    async def _bucket(self, key: str):
+        lock = self._buckets.get(key)
+        if lock is None:
+            lock = self._buckets[key] = asyncio.Lock()
+        async with lock:
+            async with self._slots:
+                yield
+
+    # === Задачи ===
+    def active(self, guild_id: int | None = None) -> list[ModerationJob]:
+        return [job for job in self.jobs.values() if guild_id is None or job.guild_id == guild_id]
+
+    def cancel(self, job_id: int, guild_id: int | None = None) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or (guild_id is not None and job.guild_id != guild_id):
+            return False
+        return job.cancel()
+
+    def start(self, kind: str, guild_id: int, title: str, requested_by: int, work, report=None) -> ModerationJob:
+        job = ModerationJob(next(self._ids), kind, guild_id, title, requested_by)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, work, report))
+        return job
+
+    async def _run(self, job: ModerationJob, work, report):
+        reporter = asyncio.create_task(self._report_loop(job, report)) if report else None
+        try:
+            await work(job)
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"[moderation] Задача #{job.id} ({job.kind}) завершилась ошибкой: {e}")
+        finally:
+            self.jobs.pop(job.id, None)
+            if reporter is not None:
+                reporter.cancel()
+                await self._report(report, job)
+
+    async def _report_loop(self, job: ModerationJob, report):
+        while True:
+            await self._report(report, job)
+            await asyncio.sleep(self.progress_interval)
+
+    async def _report(self, report, job: ModerationJob):
+        try:
+            await report(job)
+        except Exception as e:
+            print(f"[moderation] Не удалось обновить прогресс задачи #{job.id}: {e}")
+
+    async def close(self):
+        tasks = [job.task for job in self.jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # === Очистка сообщений ===
+    def clear(self, channel, amount: int, requested_by: int, report=None) -> ModerationJob:
+        amount = max(1, min(amount, CLEAR_MAX_MESSAGES))
+
+        async def work(job: ModerationJob):
+            job.total = amount
+            cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+            batch = []
+            async for message in channel.history(limit=amount):
+                if message.created_at > cutoff:
+                    batch.append(message)
+                    if len(batch) == BULK_DELETE_BATCH:
+                        await self._delete_batch(job, channel, batch)
+                        batch = []
+                else:
+                    # История идёт от новых к старым: дальше только старые сообщения
+                    if batch:
+                        await self._delete_batch(job, channel, batch)
+                        batch = []
+                    await self._delete_one(job, channel, message)
+            if batch:
+                await self._delete_batch(job, channel, batch)
+            job.total = job.done + job.failed
+
+        return self.start("clear", channel.guild.id, f"Очистка #{channel.name}", requested_by, work, report)
+
+    async def _delete_batch(self, job: ModerationJob, channel, messages: list):
+        if len(messages) == 1:
+            await self._delete_one(job, channel, messages[0])
+            return
+        try:
+            async with self._bucket(f"channel:{channel.id}"):
+                await channel.delete_messages(messages)
+            job.done += len(messages)
+        except discord.HTTPException as e:
+            print(f"[moderation] Ошибка пакетного удаления в {channel.id}: {e}")
+            job.failed += len(messages)
+
+    async def _delete_one(self, job: ModerationJob, channel, message):
+        try:
+            async with self._bucket(f"channel:{channel.id}"):
+                await message.delete()
+            job.done += 1
+        except discord.NotFound:
+            job.done += 1
+        except discord.HTTPException as e:
+            print(f"[moderation] Не удалось удалить сообщение {message.id}: {e}")
+            job.failed += 1
+
+    # === Роль мута ===
+    async def ensure_mute_role(self, guild: discord.Guild, reason: str) -> discord.Role:
+        role = discord.utils.get(guild.roles, name=MUTE_ROLE_NAME)
+        if role is None:
+            role = await guild.create_role(name=MUTE_ROLE_NAME, reason=reason)
+        return role
+
+    @staticmethod
+    def _needs_overwrite(channel, role: discord.Role) -> bool:
+        # overwrites_for читает кэш шлюза и не делает запросов
+        return channel.overwrites_for(role).send_messages != (channel.id in MUTE_ALLOWED_CHANNELS)
+
+    def setup_mute_role(self, guild: discord.Guild, role: discord.Role, requested_by: int,
+                        report=None) -> ModerationJob | None:
+        """Запускает настройку прав роли мута в текстовых каналах; None, если всё уже настроено."""
+        if self._mute_ready.get(guild.id) == role.id:
+            return None
+        for job in self.jobs.values():
+            if job.kind == "mute_setup" and job.guild_id == guild.id:
+                return job
+        pending = [channel for channel in guild.text_channels if self._needs_overwrite(channel, role)]
+        if not pending:
+            self._mute_ready[guild.id] = role.id
+            return None
+
+        async def work(job: ModerationJob):
+            job.total = len(pending)
+            await asyncio.gather(*(self._apply_overwrite(job, channel, role) for channel in pending))
+            if not job.failed:
+                self._mute_ready[guild.id] = role.id
+
+        return self.start("mute_setup", guild.id, f"Настройка роли {MUTE_ROLE_NAME}", requested_by, work, report)
+
+    async def _apply_overwrite(self, job: ModerationJob | None, channel, role: discord.Role):
+        overwrite = channel.overwrites_for(role)
+        overwrite.send_messages = channel.id in MUTE_ALLOWED_CHANNELS
+        try:
+            async with self._bucket(f"channel:{channel.id}"):
+                await channel.set_permissions(role, overwrite=overwrite, reason="Настройка роли мута")
+            if job is not None:
+                job.done += 1
+        except discord.HTTPException as e:
+            print(f"[moderation] Не удалось настроить права мута в {channel.id}: {e}")
+            if job is not None:
+                job.failed += 1
+
+    async def apply_mute_overwrite(self, channel):
+        """Настраивает роль мута в новом канале, если роль уже существует."""
+        role = discord.utils.get(channel.guild.roles, name=MUTE_ROLE_NAME)
+        if role is not None and self._needs_overwrite(channel, role):
+            await self._apply_overwrite(None, channel, role)
+
+
+# === Прогресс в Discord ===
+class JobCancelView(discord.ui.View):
+    def __init__(self, job: ModerationJob):
+        super().__init__(timeout=None)
+        self.job = job
+
+    @discord.ui.button(label="Отменить", style=discord.ButtonStyle.danger)
+    async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if interaction.user.id != self.job.requested_by:
+            await interaction.response.send_message("Отменить задачу может только тот, кто её запустил.", ephemeral=True)
+            return
+        self.job.cancel()
+        button.disabled = True
+        await interaction.response.edit_message(view=self)
+
+
+class InteractionProgress:
+    """Показывает прогресс задачи в ответе на команду: в исходном ответе
+    (``original=True``) или в отдельном эфемерном сообщении."""
+
+    def __init__(self, interaction: discord.Interaction, original: bool = False):
+        self.interaction = interaction
+        self.original = original
+        self.message: discord.WebhookMessage | None = None
+        self.view: JobCancelView | None = None
+
+    async def __call__(self, job: ModerationJob):
+        if self.view is None:
+            self.view = JobCancelView(job)
+        text = job.progress_text()
+        view = None if job.finished else self.view
+        if self.original:
+            await self.interaction.edit_original_response(content=text, view=view)
+        elif self.message is None:
+            kwargs = {"view": view} if view is not None else {}
+            self.message = await self.interaction.followup.send(text, ephemeral=True, wait=True, **kwargs)
+        else:
+            await self.message.edit(content=text, view=view)
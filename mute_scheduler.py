@@ -0,0 +1,121 @@
+import asyncio
+import heapq
+import os
+from datetime import datetime, UTC
+
+# === Настройки повторов ===
+MUTE_RETRY_BASE_SECONDS = float(os.environ.get("MUTE_RETRY_BASE_SECONDS", 30))
+MUTE_RETRY_MAX_SECONDS = float(os.environ.get("MUTE_RETRY_MAX_SECONDS", 3600))
+
+
+class MuteScheduler:
+    """Единый планировщик снятия мутов на куче сроков.
+
+    Все ожидающие снятия хранятся в бэкенде, одна фоновая задача спит до
+    ближайшего срока. После перезапуска мьюты восстанавливаются, а
+    просроченные снимаются одной пачкой. Если снять мут не удалось, запись
+    остаётся и возвращается в кучу с растущей задержкой.
+    """
+
+    def __init__(self, backend, on_expire):
+        self.backend = backend
+        self.on_expire = on_expire
+        self._mutes: dict[tuple[int, int], dict] = {}
+        self._heap: list[tuple[float, int, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._attempts: dict[tuple[int, int], int] = {}
+
+    def __len__(self):
+        return len(self._mutes)
+
+    async def load(self):
+        for mute in await self.backend.load_mutes():
+            self._push(mute)
+
+    def _push(self, mute: dict):
+        key = (mute["guild_id"], mute["user_id"])
+        self._mutes[key] = mute
+        heapq.heappush(self._heap, (mute["until"], *key))
+
+    def get(self, guild_id: int, user_id: int) -> dict | None:
+        return self._mutes.get((guild_id, user_id))
+
+    async def schedule(self, guild_id: int, user_id: int, role_id: int, seconds: float, reason: str = ""):
+        mute = {
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "role_id": role_id,
+            "until": datetime.now(UTC).timestamp() + seconds,
+            "reason": reason,
+        }
+        self._attempts.pop((guild_id, user_id), None)
+        self._push(mute)
+        self._wakeup.set()
+        await self.backend.save_mute(mute)
+        return mute
+
+    async def cancel(self, guild_id: int, user_id: int) -> bool:
+        # Запись в куче остаётся и отбрасывается при извлечении
+        self._attempts.pop((guild_id, user_id), None)
+        if self._mutes.pop((guild_id, user_id), None) is None:
+            return False
+        await self.backend.delete_mute(guild_id, user_id)
+        return True
+
+    def _pop_due(self, now_ts: float) -> list[dict]:
+        due = []
+        while self._heap and self._heap[0][0] <= now_ts:
+            until, guild_id, user_id = heapq.heappop(self._heap)
+            mute = self._mutes.get((guild_id, user_id))
+            if mute is not None and mute["until"] == until:
+                del self._mutes[(guild_id, user_id)]
+                due.append(mute)
+        return due
+
+    async def _run_due(self):
+        for mute in self._pop_due(datetime.now(UTC).timestamp()):
+            key = (mute["guild_id"], mute["user_id"])
+            try:
+                result = await self.on_expire(mute)
+            except Exception as e:
+                if key not in self._mutes:
+                    self._retry(mute, e)
+                continue
+            # Пока снимали, выдан новый мут: его запись и срок не трогаем
+            if key in self._mutes:
+                continue
+            # False — сервер обслуживает другой процесс бота, запись остаётся ему
+            if result is False:
+                continue
+            self._attempts.pop(key, None)
+            await self.backend.delete_mute(*key)
+
+    def _retry(self, mute: dict, error: Exception):
+        key = (mute["guild_id"], mute["user_id"])
+        attempts = self._attempts[key] = self._attempts.get(key, 0) + 1
+        delay = min(MUTE_RETRY_BASE_SECONDS * 2 ** (attempts - 1), MUTE_RETRY_MAX_SECONDS)
+        print(f"[mutes] Ошибка снятия мута {mute['user_id']}: {error}; повтор через {delay:g} с (попытка {attempts})")
+        # Срок повтора держим только в памяти: после перезапуска просроченный мут снимется сразу
+        self._push(dict(mute, until=datetime.now(UTC).timestamp() + delay))
+
+    async def _loop(self):
+        while True:
+            await self._run_due()
+            timeout = None
+            if self._heap:
+                timeout = max(self._heap[0][0] - datetime.now(UTC).timestamp(), 0)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,79 @@
+import os
+import time
+from collections import OrderedDict
+
+import discord
+
+# === Настройки кэша имён ===
+NAME_CACHE_SIZE = int(os.environ.get("NAME_CACHE_SIZE", 50000))
+NAME_CACHE_TTL = float(os.environ.get("NAME_CACHE_TTL", 6 * 3600))
+MISSING_NAME_TTL = float(os.environ.get("MISSING_NAME_TTL", 600))
+QUERY_CHUNK = 100  # максимум user_ids в одном запросе чанка участников
+
+
+class NameCache:
+    """LRU-кэш uid → display name с TTL.
+
+    Заполняется из событий участников; промахи добираются пачками через
+    запрос чанка участников по шлюзу вместо отдельного REST-запроса на каждого.
+    """
+
+    def __init__(self, maxsize: int = NAME_CACHE_SIZE, ttl: float = NAME_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[str | None, float]] = OrderedDict()
+
+    def put(self, user_id: int, name: str | None, ttl: float | None = None):
+        self._entries[user_id] = (name, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def put_member(self, member: discord.abc.User):
+        self.put(member.id, member.display_name)
+
+    def forget(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+    def lookup(self, user_id: int):
+        """Возвращает (найдено, имя); имя None — пользователь известен как отсутствующий."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False, None
+        name, expires = entry
+        if expires < time.monotonic():
+            del self._entries[user_id]
+            return False, None
+        self._entries.move_to_end(user_id)
+        return True, name
+
+    async def resolve(self, guild: discord.Guild, user_ids) -> dict[int, str]:
+        names: dict[int, str] = {}
+        misses = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member is not None:
+                names[user_id] = member.display_name
+                continue
+            found, name = self.lookup(user_id)
+            if found:
+                names[user_id] = name or f"ID {user_id}"
+            else:
+                misses.append(user_id)
+        for i in range(0, len(misses), QUERY_CHUNK):
+            chunk = misses[i:i + QUERY_CHUNK]
+            try:
+                members = await guild.query_members(user_ids=chunk, cache=True)
+            except Exception as e:
+                print(f"[names] Ошибка запроса участников: {e}")
+                members = []
+            fetched = {member.id: member for member in members}
+            for user_id in chunk:
+                member = fetched.get(user_id)
+                if member is not None:
+                    self.put_member(member)
+                    names[user_id] = member.display_name
+                else:
+                    self.put(user_id, None, MISSING_NAME_TTL)
+                    names[user_id] = f"ID {user_id}"
+        return names
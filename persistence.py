@@ -0,0 +1,205 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import metrics
+
+# === Неблокирующий ввод-вывод ===
+# Сериализация и запись файлов выполняются в отдельном пуле потоков, чтобы
+# не останавливать event loop (heartbeat шлюза и ответы на interactions).
+IO_WORKERS = int(os.environ.get("IO_WORKERS", 2))
+
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="bot-io")
+_writers: dict[Path, "_FileWriter"] = {}
+_line_locks: dict[Path, asyncio.Lock] = {}
+
+
+def _read_json_sync(path: Path, default):
+    if not path.exists():
+        return default
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        print(f"[io] Ошибка чтения {path}: {e}")
+        return default
+
+
+def _read_jsonl_sync(path: Path) -> list:
+    if not path.exists():
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print(f"[io] Пропущена повреждённая строка в {path}")
+    return records
+
+
+def _write_text_sync(path: Path, text: str):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _write_json_sync(path: Path, data, dumps_kwargs: dict):
+    _write_text_sync(path, json.dumps(data, **dumps_kwargs))
+
+
+def _write_object_sync(path: Path, fragments: list[str]):
+    _write_text_sync(path, "{" + ",".join(fragments) + "}")
+
+
+def _append_lines_sync(path: Path, lines: list[str]):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def _write_lines_sync(path: Path, lines: list[str]):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(tmp_path, path)
+
+
+def _unlink_sync(path: Path) -> bool:
+    try:
+        path.unlink()
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def run_io(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+async def read_json(path: Path, default=None):
+    with metrics.timer("storage", "read_json"):
+        return await run_io(_read_json_sync, Path(path), default)
+
+
+async def delete_file(path: Path) -> bool:
+    path = Path(path)
+    writer = _writers.get(path)
+    if writer is not None:
+        await writer.idle()
+    return await run_io(_unlink_sync, path)
+
+
+def _line_lock(path: Path) -> asyncio.Lock:
+    lock = _line_locks.get(path)
+    if lock is None:
+        lock = _line_locks[path] = asyncio.Lock()
+    return lock
+
+
+def _to_lines(records) -> list[str]:
+    return [json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records]
+
+
+async def read_jsonl(path: Path) -> list:
+    return await run_io(_read_jsonl_sync, Path(path))
+
+
+async def append_jsonl(path: Path, records):
+    """Дописывает записи в конец журнала JSON Lines; дозаписи одного файла идут по очереди."""
+    path = Path(path)
+    lines = _to_lines(records)
+    async with _line_lock(path):
+        with metrics.timer("storage", "append_jsonl"):
+            await run_io(_append_lines_sync, path, lines)
+
+
+async def rewrite_jsonl(path: Path, records):
+    path = Path(path)
+    lines = _to_lines(records)
+    async with _line_lock(path):
+        with metrics.timer("storage", "rewrite_jsonl"):
+            await run_io(_write_lines_sync, path, lines)
+
+
+class _FileWriter:
+    """Последовательная запись одного файла: не больше одной записи в полёте,
+    а все запросы, накопившиеся за ней, сливаются в одну запись последних данных."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._pending = None
+        self._waiters: list[asyncio.Future] = []
+        self._task: asyncio.Task | None = None
+
+    def submit(self, func, *args) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending = (func, args)
+        self._waiters.append(future)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def idle(self):
+        while self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+
+    async def _run(self):
+        while self._pending is not None:
+            func, args = self._pending
+            waiters = self._waiters
+            self._pending = None
+            self._waiters = []
+            try:
+                with metrics.timer("storage", "write_json"):
+                    await run_io(func, self.path, *args)
+            except Exception as e:
+                print(f"[io] Ошибка записи {self.path}: {e}")
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in waiters:
+                    if not future.done():
+                        future.set_result(None)
+
+
+def _writer(path: Path) -> _FileWriter:
+    writer = _writers.get(path)
+    if writer is None:
+        writer = _writers[path] = _FileWriter(path)
+    return writer
+
+
+async def write_json(path: Path, data, *, compact: bool = True):
+    """Записывает ``data`` в ``path`` атомарно и вне event loop.
+
+    ``data`` не должен изменяться до завершения записи — передавайте снимок.
+    """
+    dumps_kwargs = {"ensure_ascii": False}
+    if compact:
+        dumps_kwargs["separators"] = (",", ":")
+    await _writer(Path(path)).submit(_write_json_sync, data, dumps_kwargs)
+
+
+def encode_member(key: str, value) -> str:
+    """Фрагмент ``"ключ":значение`` JSON-объекта для write_json_object."""
+    return json.dumps(key, ensure_ascii=False) + ":" + json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+async def write_json_object(path: Path, fragments: list[str]):
+    """Записывает JSON-объект из готовых фрагментов ``encode_member``.
+
+    Фрагменты склеиваются в потоке ввода-вывода, поэтому вызывающий может
+    держать кэш закодированных записей и перекодировать только изменённые.
+    """
+    await _writer(Path(path)).submit(_write_object_sync, fragments)
+
+
+async def drain():
+    for writer in list(_writers.values()):
+        await writer.idle()
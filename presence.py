@@ -0,0 +1,119 @@
+import asyncio
+import os
+import time
+from datetime import datetime, UTC
+
+import discord
+
+# === Настройки обработки presence ===
+PRESENCE_DEBOUNCE = float(os.environ.get("PRESENCE_DEBOUNCE", 60))
+PRESENCE_FLUSH_INTERVAL = float(os.environ.get("PRESENCE_FLUSH_INTERVAL", 15))
+PRESENCE_ACCRUE_INTERVAL = float(os.environ.get("PRESENCE_ACCRUE_INTERVAL", 60))
+
+
+def tracked_games(member: discord.Member, allowed_games: set[str]) -> frozenset[str]:
+    return frozenset(
+        activity.name for activity in member.activities
+        if activity.type is discord.ActivityType.playing and activity.name in allowed_games
+    )
+
+
+class PresencePipeline:
+    """Превращает поток presence-событий в игровые сессии.
+
+    Горячий путь только сравнивает отслеживаемые игры до и после события и
+    выходит, если они не изменились (смена статуса, музыка и т.п.). Остановка
+    игры откладывается на ``debounce`` секунд, чтобы перезапуск клиента не
+    рвал сессию, а завершённые сессии пачкой записываются в статистику
+    фоновой задачей. Идущие сессии раз в ``accrue_interval`` секунд
+    зачисляются частично, поэтому падение процесса теряет не больше этого
+    интервала игры.
+    """
+
+    def __init__(self, stats_store, allowed_games: set[str], debounce: float = PRESENCE_DEBOUNCE,
+                 flush_interval: float = PRESENCE_FLUSH_INTERVAL, accrue_interval: float = PRESENCE_ACCRUE_INTERVAL):
+        self.stats_store = stats_store
+        self.allowed_games = allowed_games
+        self.debounce = debounce
+        self.flush_interval = flush_interval
+        self.accrue_interval = accrue_interval
+        # Время, с которого игра ещё не зачислена в статистику
+        self._sessions: dict[tuple[int, str], float] = {}
+        self._pending_stops: dict[tuple[int, str], float] = {}
+        self._task: asyncio.Task | None = None
+
+    # === Горячий путь ===
+    def handle(self, before: discord.Member, after: discord.Member):
+        if after.bot or after.guild is None:
+            return
+        games_after = tracked_games(after, self.allowed_games)
+        if games_after == tracked_games(before, self.allowed_games):
+            return
+        self._apply(after.id, games_after, datetime.now(UTC).timestamp())
+
+    def seed(self, members):
+        now_ts = datetime.now(UTC).timestamp()
+        for member in members:
+            if member.bot:
+                continue
+            # Пустой набор тоже применяется: после переподключения он закрывает
+            # сессии тех, кто перестал играть, пока бот был офлайн
+            self._apply(member.id, tracked_games(member, self.allowed_games), now_ts)
+
+    def _apply(self, user_id: int, games: frozenset[str], now_ts: float):
+        for game in games:
+            key = (user_id, game)
+            if self._pending_stops.pop(key, None) is None:
+                self._sessions.setdefault(key, now_ts)
+        for game in self.allowed_games - games:
+            key = (user_id, game)
+            if key in self._sessions and key not in self._pending_stops:
+                self._pending_stops[key] = now_ts
+
+    # === Запись сессий ===
+    def _end_session(self, key: tuple[int, str], end_ts: float):
+        started = self._sessions.pop(key, None)
+        if started is not None:
+            user_id, game = key
+            self.stats_store.add_game_time(str(user_id), game, started, end_ts)
+
+    def accrue(self):
+        """Зачисляет время идущих сессий; ожидающие остановки дождутся её."""
+        now_ts = datetime.now(UTC).timestamp()
+        for key, started in self._sessions.items():
+            if key not in self._pending_stops and now_ts > started:
+                user_id, game = key
+                self.stats_store.add_game_time(str(user_id), game, started, now_ts)
+                self._sessions[key] = now_ts
+
+    def open_seconds(self, now_ts: float) -> dict[tuple[int, str], float]:
+        """Ещё не зачисленное время идущих сессий по (user_id, игра)."""
+        return {key: max(self._pending_stops.get(key, now_ts) - started, 0) for key, started in self._sessions.items()}
+
+    def flush(self):
+        deadline = datetime.now(UTC).timestamp() - self.debounce
+        expired = [(key, stop_ts) for key, stop_ts in self._pending_stops.items() if stop_ts <= deadline]
+        for key, stop_ts in expired:
+            del self._pending_stops[key]
+            self._end_session(key, stop_ts)
+
+    async def _flush_loop(self):
+        last_accrue = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+            if time.monotonic() - last_accrue >= self.accrue_interval:
+                last_accrue = time.monotonic()
+                self.accrue()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        now_ts = datetime.now(UTC).timestamp()
+        for key in list(self._sessions):
+            self._end_session(key, self._pending_stops.pop(key, now_ts))
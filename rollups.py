@@ -0,0 +1,140 @@
+from game_history import day_of
+from leaderboard import RankIndex
+
+# === Окна статистики ===
+# Окна скользящие: «день» — текущие сутки UTC, «неделя» и «месяц» — последние 7 и 30 суток.
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30}
+PERIOD_TITLES = {"all": "за всё время", "day": "за сегодня", "week": "за неделю", "month": "за месяц"}
+ROLLUP_DAYS = max(PERIOD_DAYS.values())
+METRICS = ("messages", "voice")
+
+
+class Rollups:
+    """Суточные счётчики сообщений и голоса с готовыми суммами за день, неделю и месяц.
+
+    Событие добавляется в корзину текущих суток и сразу в суммы всех окон с
+    их индексами. При смене суток из окон вычитаются только корзины, которые
+    из них выпали, и только у пользователей, активных в тот день, поэтому
+    топ и место за любое окно читаются из готового индекса без пересчёта истории.
+    """
+
+    def __init__(self):
+        self.day: int | None = None
+        self.days: dict[str, dict[int, list[int]]] = {}
+        self._active: dict[int, set[str]] = {}
+        self._sums: dict[str, dict[str, list[int]]] = {period: {} for period in PERIOD_DAYS}
+        self.indexes = {(metric, period): RankIndex() for metric in METRICS for period in PERIOD_DAYS}
+        self._deltas: dict[tuple[str, int], list[int]] = {}
+
+    # === Загрузка ===
+    def load(self, rows, now_ts: float):
+        """``rows`` — кортежи (uid, day, messages, voice_seconds) из хранилища."""
+        today = day_of(now_ts)
+        self._reset(today)
+        for uid, day, messages, voice_seconds in rows:
+            if day <= today - ROLLUP_DAYS or day > today:
+                continue
+            slot = self.days.setdefault(uid, {}).setdefault(day, [0, 0])
+            slot[0] += messages
+            slot[1] += voice_seconds
+            self._active.setdefault(day, set()).add(uid)
+        for period, length in PERIOD_DAYS.items():
+            sums = self._sums[period]
+            for uid, days in self.days.items():
+                totals = [0, 0]
+                for day, (messages, voice_seconds) in days.items():
+                    if day > today - length:
+                        totals[0] += messages
+                        totals[1] += voice_seconds
+                if totals[0] or totals[1]:
+                    sums[uid] = totals
+            for i, metric in enumerate(METRICS):
+                self.indexes[(metric, period)].rebuild((int(uid), s[i]) for uid, s in sums.items() if s[i])
+
+    def _reset(self, today: int):
+        self.day = today
+        self.days = {}
+        self._active = {}
+        for period in PERIOD_DAYS:
+            self._sums[period] = {}
+        for index in self.indexes.values():
+            index.rebuild(())
+
+    # === Смена суток ===
+    def refresh(self, now_ts: float):
+        today = day_of(now_ts)
+        if self.day is None or today > self.day:
+            self._roll(today)
+
+    def _roll(self, today: int):
+        if self.day is None or today - self.day >= ROLLUP_DAYS:
+            self._reset(today)
+            return
+        while self.day < today:
+            self.day += 1
+            for period, length in PERIOD_DAYS.items():
+                expired = self.day - length
+                for uid in self._active.get(expired, ()):
+                    messages, voice_seconds = self.days[uid][expired]
+                    self._change(period, uid, -messages, -voice_seconds)
+            expired = self.day - ROLLUP_DAYS
+            for uid in self._active.pop(expired, ()):
+                days = self.days[uid]
+                del days[expired]
+                if not days:
+                    del self.days[uid]
+
+    def _change(self, period: str, uid: str, messages: int, voice_seconds: int):
+        sums = self._sums[period]
+        totals = sums.get(uid)
+        if totals is None:
+            totals = sums[uid] = [0, 0]
+        totals[0] += messages
+        totals[1] += voice_seconds
+        if messages:
+            self._set_index("messages", period, uid, totals[0])
+        if voice_seconds:
+            self._set_index("voice", period, uid, totals[1])
+        if not totals[0] and not totals[1]:
+            del sums[uid]
+
+    def _set_index(self, metric: str, period: str, uid: str, value: int):
+        index = self.indexes[(metric, period)]
+        if value > 0:
+            index.update(int(uid), value)
+        else:
+            index.discard(int(uid))
+
+    # === Горячий путь ===
+    def add(self, uid: str, messages: int, voice_seconds: int, now_ts: float):
+        self.refresh(now_ts)
+        # Если часы ушли назад, событие засчитывается в текущие сутки
+        day = self.day
+        slot = self.days.setdefault(uid, {}).setdefault(day, [0, 0])
+        slot[0] += messages
+        slot[1] += voice_seconds
+        self._active.setdefault(day, set()).add(uid)
+        for period in PERIOD_DAYS:
+            self._change(period, uid, messages, voice_seconds)
+        delta = self._deltas.get((uid, day))
+        if delta is None:
+            self._deltas[(uid, day)] = [messages, voice_seconds]
+        else:
+            delta[0] += messages
+            delta[1] += voice_seconds
+
+    # === Чтение ===
+    def index(self, metric: str, period: str, now_ts: float) -> RankIndex:
+        self.refresh(now_ts)
+        return self.indexes[(metric, period)]
+
+    # === Приращения для хранилища ===
+    def take_deltas(self) -> dict[tuple[str, int], list[int]]:
+        deltas, self._deltas = self._deltas, {}
+        return deltas
+
+    def restore_deltas(self, deltas: dict[tuple[str, int], list[int]]):
+        for key, (messages, voice_seconds) in deltas.items():
+            delta = self._deltas.setdefault(key, [0, 0])
+            delta[0] += messages
+            delta[1] += voice_seconds
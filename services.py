@@ -0,0 +1,213 @@
+import asyncio
+import gc
+import os
+import time
+from pathlib import Path
+
+import discord
+
+import metrics
+from antispam import ANTISPAM_WARN_COOLDOWN, REASON_TEXT, SpamDetector
+from command_sync import sync_tree
+from game_roles import GameRoleEngine
+from moderation import ModerationExecutor, MUTE_ROLE_NAME
+from mute_scheduler import MuteScheduler
+from names import NameCache
+from presence import PresencePipeline
+from shared_state import create_shared_state
+from stats_store import StatsStore
+from storage import create_backend
+from voice_tracker import VoiceTracker
+from warnings_store import WarningsStore, WARN_MUTE_THRESHOLD
+
+# === Настройки ===
+ALLOWED_ROLES_FOR_RESTART = {1463540497535602833, 1463502977355743381}
+GUILD_ID = 1463456630833287304
+
+# === Настройки для отслеживания активности ===
+GAME_ROLE_MAP = {
+    "Dota 2": 1463643348345819381,
+    "Counter-Strike 2": 1463646558493868042,
+}
+ALLOWED_GAMES = set(GAME_ROLE_MAP.keys())
+WORKER_ID = int(os.environ.get("WORKER_ID", 0))
+BOT_SUPERVISED = os.environ.get("BOT_SUPERVISED") == "1"
+RESTART_FILE = Path(__file__).parent / 'restart_info.json'
+
+
+async def user_has_allowed_role(user: discord.abc.Snowflake, guild: discord.Guild | None = None) -> bool:
+    member = user
+    if not hasattr(member, 'roles'):
+        if guild is None:
+            return False
+        try:
+            member = await guild.fetch_member(user.id)
+        except Exception:
+            return False
+    user_role_ids = {role.id for role in member.roles}
+    return bool(user_role_ids & ALLOWED_ROLES_FOR_RESTART)
+
+
+async def timed_stage(stage: str, coro):
+    started = time.monotonic()
+    result = await coro
+    metrics.mark_startup(stage, time.monotonic() - started)
+    return result
+
+
+class Services:
+    """Данные и фоновые задачи бота, общие для всех расширений.
+
+    Живут всё время работы процесса: перезагрузка расширения меняет только
+    код команд, а статистика, голосовые сессии и планировщики остаются в памяти.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.exit_code = 0
+        # Без launcher.py новый процесс запускается после сохранения данных (см. bot.main)
+        self.respawn = False
+        self.storage_backend = create_backend()
+        self.stats_store = StatsStore(self.storage_backend)
+        self.shared_state = create_shared_state(self.storage_backend, self.stats_store)
+        self.name_cache = NameCache()
+        self.presence_pipeline = PresencePipeline(self.stats_store, ALLOWED_GAMES)
+        self.voice_tracker = VoiceTracker(self.stats_store, self.storage_backend)
+        self.game_role_engine = GameRoleEngine(bot, self.stats_store, self.presence_pipeline, self.storage_backend, GAME_ROLE_MAP, GUILD_ID)
+        self.mute_scheduler = MuteScheduler(self.storage_backend, self.expire_mute)
+        self.warnings_store = WarningsStore(self.storage_backend)
+        self.moderation = ModerationExecutor()
+        self.spam_detector = SpamDetector()
+        self.migration_job = None
+        self._antispam_tasks: set[asyncio.Task] = set()
+        self._sync_task: asyncio.Task | None = None
+        self._closed = False
+
+    # === Запуск и остановка ===
+    async def load(self):
+        await timed_stage("storage", self.storage_backend.connect())
+        # Данные независимы друг от друга: загружаем параллельно
+        await asyncio.gather(
+            timed_stage("load_stats", self.stats_store.load()),
+            timed_stage("load_voice", self.voice_tracker.load()),
+            timed_stage("load_mutes", self.mute_scheduler.load()),
+            timed_stage("load_warns", self.warnings_store.load()),
+            timed_stage("load_game_roles", self.game_role_engine.load()),
+        )
+        # Загруженные записи живут до выхода: убираем их из обхода сборщика мусора,
+        # иначе полная сборка на сотнях тысяч пользователей останавливает цикл событий
+        gc.collect()
+        gc.freeze()
+
+    def start(self):
+        self.stats_store.start()
+        self.presence_pipeline.start()
+        self.voice_tracker.start()
+        self.game_role_engine.start()
+        self.mute_scheduler.start()
+        # Команды синхронизирует только первый воркер, параллельно с подключением к шлюзу
+        if WORKER_ID == 0:
+            self._sync_task = asyncio.create_task(self._startup_sync())
+
+    async def close(self):
+        """Останавливает фоновые задачи и сохраняет данные; повторные вызовы ничего не делают."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+        for task in list(self._antispam_tasks):
+            task.cancel()
+        await self.moderation.close()
+        self.presence_pipeline.close()
+        self.game_role_engine.close()
+        self.mute_scheduler.close()
+        await self.voice_tracker.close()
+        await self.stats_store.close()
+        await self.storage_backend.close()
+        await metrics.stop_http_server()
+
+    # === Синхронизация команд ===
+    async def sync_commands(self, force: bool = False) -> list[str]:
+        """Синхронизирует глобальные и серверные команды, если дерево изменилось."""
+        return await sync_tree(self.bot.tree, self.bot.application_id, [None, discord.Object(id=GUILD_ID)], force=force)
+
+    async def _startup_sync(self):
+        try:
+            synced = await timed_stage("sync", self.sync_commands())
+            if synced:
+                print(f'Слэш-команды синхронизированы: {", ".join(synced)}')
+            else:
+                print('Слэш-команды не изменились, синхронизация пропущена')
+        except Exception as e:
+            print(f'Ошибка синхронизации команд: {e}')
+
+    # === Муты ===
+    async def expire_mute(self, mute: dict):
+        """Снимает роль мута. Ошибки, кроме NotFound, пробрасываются — планировщик повторит."""
+        await self.bot.wait_until_ready()
+        guild = self.bot.get_guild(mute["guild_id"])
+        if guild is None:
+            # Сервер на шардах другого процесса — мут снимет он
+            return False
+        member = guild.get_member(mute["user_id"])
+        if member is None:
+            try:
+                member = await guild.fetch_member(mute["user_id"])
+            except discord.NotFound:
+                return
+        if self.mute_scheduler.get(guild.id, member.id) is not None:
+            # Пока ждали участника, выдан новый мут — роль снимет он
+            return
+        mute_role = guild.get_role(mute.get("role_id") or 0) or discord.utils.get(guild.roles, name=MUTE_ROLE_NAME)
+        if mute_role and mute_role in member.roles:
+            try:
+                await member.remove_roles(mute_role, reason="Автоматическое снятие мута")
+            except discord.NotFound:
+                # Участник ушёл или роль удалена — снимать нечего
+                return
+        try:
+            await member.send("Ваш мут снят. Пожалуйста, соблюдайте правила.")
+        except Exception:
+            pass
+
+    async def mute_for_warns(self, guild: discord.Guild, member: discord.Member, warn_count: int, requested_by: int, report=None) -> bool:
+        """Мут на 1 час, если действующих предупреждений не меньше WARN_MUTE_THRESHOLD.
+
+        Единое правило для /warn и антиспама; уже замученного не трогает.
+        Возвращает True, если мут выдан.
+        """
+        if warn_count < WARN_MUTE_THRESHOLD or self.mute_scheduler.get(guild.id, member.id) is not None:
+            return False
+        mute_role = await self.moderation.ensure_mute_role(guild, f"Автоматический мут за {WARN_MUTE_THRESHOLD} предупреждения")
+        self.moderation.setup_mute_role(guild, mute_role, requested_by, report)
+        await member.add_roles(mute_role, reason=f"{WARN_MUTE_THRESHOLD} предупреждения — мут на 1 час")
+        await self.mute_scheduler.schedule(guild.id, member.id, mute_role.id, 3600, f"{WARN_MUTE_THRESHOLD} предупреждения")
+        return True
+
+    # === Антиспам ===
+    def report_spam(self, message: discord.Message, spam: str):
+        """Наказание за спам запускается в фоне, чтобы не задерживать события."""
+        metrics.inc("antispam", spam)
+        task = asyncio.create_task(self.punish_spam(message, spam))
+        self._antispam_tasks.add(task)
+        task.add_done_callback(self._antispam_tasks.discard)
+
+    async def punish_spam(self, message: discord.Message, spam: str):
+        """Автоматическое предупреждение за спам, не чаще раза в ANTISPAM_WARN_COOLDOWN секунд."""
+        member = message.author
+        guild = message.guild
+        try:
+            if not isinstance(member, discord.Member) or await user_has_allowed_role(member, guild):
+                return
+            if self.mute_scheduler.get(guild.id, member.id) is not None:
+                return
+            if not await self.shared_state.try_cooldown("antispam", member.id, ANTISPAM_WARN_COOLDOWN):
+                return
+            reason = f"Антиспам: {REASON_TEXT[spam]}"
+            warn_count = await self.warnings_store.add(member.id, self.bot.user.id, reason)
+            await message.channel.send(f"Пользователь {member.mention} получил предупреждение. Причина: {reason}")
+            if await self.mute_for_warns(guild, member, warn_count, self.bot.user.id):
+                await message.channel.send(f"{member.mention} получил мут на 1 час и может писать только в <#1463825318249889889>")
+        except Exception as e:
+            print(f"[antispam] Ошибка наказания {member.id}: {e}")
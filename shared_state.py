@@ -0,0 +1,118 @@
+import time
+
+from game_history import day_of
+from rollups import PERIOD_DAYS
+from storage import PostgresBackend
+
+# === Общее состояние процессов бота ===
+METRIC_COLUMNS = {"messages": "messages", "voice": "voice_seconds"}
+
+
+class LocalSharedState:
+    """Кулдауны и топы в памяти одного процесса (и замена общего бэкенда в тестах)."""
+
+    def __init__(self, stats_store):
+        self.stats_store = stats_store
+        self._cooldowns: dict[tuple[str, int], float] = {}
+
+    async def try_cooldown(self, name: str, user_id: int, seconds: float) -> bool:
+        """True, если кулдаун свободен (и теперь занят), False — если ещё действует."""
+        now = time.time()
+        key = (name, user_id)
+        if self._cooldowns.get(key, 0) > now:
+            return False
+        self._cooldowns[key] = now + seconds
+        return True
+
+    async def top(self, metric: str, k: int, period: str = "all") -> list[tuple[int, int]]:
+        return self.stats_store.window_index(metric, period).top(k)
+
+    async def rank(self, metric: str, user_id: int, period: str = "all") -> tuple[int | None, int]:
+        index = self.stats_store.window_index(metric, period)
+        return index.rank(user_id), index.get(user_id)
+
+    async def counters(self, user_id: int, period: str = "all") -> tuple[int, int]:
+        return (
+            self.stats_store.window_index("messages", period).get(user_id),
+            self.stats_store.window_index("voice", period).get(user_id),
+        )
+
+
+COOLDOWN_SQL = """
+INSERT INTO cooldowns (name, user_id, until) VALUES ($1, $2, $3)
+ON CONFLICT (name, user_id) DO UPDATE SET until = EXCLUDED.until
+WHERE cooldowns.until <= $4
+RETURNING user_id
+"""
+
+
+class PostgresSharedState:
+    """Кулдауны и топы из общей базы для нескольких процессов бота.
+
+    Счётчики каждого процесса попадают в базу приращениями при сбросе
+    статистики, поэтому топ отстаёт от живых данных не больше чем на
+    интервал сброса. Топы за окна суммируют суточные строки daily_stats.
+    """
+
+    def __init__(self, backend: PostgresBackend):
+        self.backend = backend
+
+    @staticmethod
+    def _source(metric: str, period: str) -> tuple[str, list]:
+        """Подзапрос (user_id, value) для окна и его параметры."""
+        column = METRIC_COLUMNS[metric]
+        if period == "all":
+            return f"SELECT user_id, {column} AS value FROM user_stats", []
+        first_day = day_of(time.time()) - PERIOD_DAYS[period] + 1
+        return (
+            f"SELECT user_id, sum({column}) AS value FROM daily_stats WHERE day >= $1 GROUP BY user_id",
+            [first_day],
+        )
+
+    async def try_cooldown(self, name: str, user_id: int, seconds: float) -> bool:
+        now = time.time()
+        async with self.backend.pool.acquire() as conn:
+            row = await conn.fetchrow(COOLDOWN_SQL, name, user_id, now + seconds, now)
+        return row is not None
+
+    async def top(self, metric: str, k: int, period: str = "all") -> list[tuple[int, int]]:
+        source, args = self._source(metric, period)
+        async with self.backend.pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"SELECT user_id, value FROM ({source}) s WHERE value > 0 ORDER BY value DESC, user_id LIMIT ${len(args) + 1}",
+                *args, k,
+            )
+        return [(row[0], row[1]) for row in rows]
+
+    async def rank(self, metric: str, user_id: int, period: str = "all") -> tuple[int | None, int]:
+        source, args = self._source(metric, period)
+        n = len(args)
+        async with self.backend.pool.acquire() as conn:
+            value = await conn.fetchval(f"SELECT value FROM ({source}) s WHERE user_id = ${n + 1}", *args, user_id)
+            if value is None:
+                return None, 0
+            rank = await conn.fetchval(
+                f"SELECT count(*) + 1 FROM ({source}) s WHERE value > ${n + 1} OR (value = ${n + 1} AND user_id < ${n + 2})",
+                *args, value, user_id,
+            )
+        return rank, value
+
+    async def counters(self, user_id: int, period: str = "all") -> tuple[int, int]:
+        async with self.backend.pool.acquire() as conn:
+            if period == "all":
+                row = await conn.fetchrow("SELECT messages, voice_seconds FROM user_stats WHERE user_id = $1", user_id)
+            else:
+                row = await conn.fetchrow(
+                    "SELECT sum(messages) AS messages, sum(voice_seconds) AS voice_seconds FROM daily_stats "
+                    "WHERE user_id = $1 AND day >= $2",
+                    user_id, day_of(time.time()) - PERIOD_DAYS[period] + 1,
+                )
+        if row is None or row["messages"] is None:
+            return 0, 0
+        return row["messages"], row["voice_seconds"]
+
+
+def create_shared_state(backend, stats_store):
+    if isinstance(backend, PostgresBackend):
+        return PostgresSharedState(backend)
+    return LocalSharedState(stats_store)
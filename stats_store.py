@@ -0,0 +1,196 @@
+import asyncio
+import os
+import time
+
+import metrics
+from game_history import GameBuckets, day_of
+from leaderboard import RankIndex
+from rollups import ROLLUP_DAYS, Rollups
+
+# === Настройки сброса в хранилище ===
+FLUSH_INTERVAL = float(os.environ.get("STATS_FLUSH_INTERVAL", 30))
+FLUSH_EVERY_CHANGES = int(os.environ.get("STATS_FLUSH_CHANGES", 500))
+
+
+def new_user_record():
+    return {"messages": 0, "voice_seconds": 0, "games": GameBuckets(), "_voice_join_time": None}
+
+
+class StatsStore:
+    """Резидентная статистика пользователей с отложенной записью в хранилище.
+
+    Данные читаются один раз при старте, события меняют только словарь в памяти,
+    а изменения сбрасываются в бэкенд фоновой задачей раз в ``flush_interval``
+    секунд или после ``flush_changes`` изменений. Рядом с итоговыми счётчиками
+    ведутся суточные корзины (``rollups``) для топов за день, неделю и месяц.
+    """
+
+    def __init__(self, backend, flush_interval: float = FLUSH_INTERVAL, flush_changes: int = FLUSH_EVERY_CHANGES):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.flush_changes = flush_changes
+        self.data: dict[str, dict] = {}
+        self.messages_index = RankIndex()
+        self.voice_index = RankIndex()
+        self.rollups = Rollups()
+        self._dirty = 0
+        self._deltas: dict[str, list[int]] = {}
+        self._touched: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    # === Загрузка и доступ ===
+    async def load(self):
+        self.data = await self.backend.load_users()
+        self._normalize()
+        self._reindex()
+        now_ts = time.time()
+        self.rollups.load(await self.backend.load_daily(day_of(now_ts) - ROLLUP_DAYS + 1), now_ts)
+        return self.data
+
+    def _normalize(self):
+        for record in self.data.values():
+            if not isinstance(record.get("games"), GameBuckets):
+                record["games"] = GameBuckets.from_json(record.get("games"))
+
+    def _reindex(self):
+        self.messages_index.rebuild((int(uid), r.get("messages", 0)) for uid, r in self.data.items())
+        self.voice_index.rebuild((int(uid), r.get("voice_seconds", 0)) for uid, r in self.data.items())
+
+    def get(self, uid: str) -> dict | None:
+        return self.data.get(uid)
+
+    def user(self, uid: str) -> dict:
+        record = self.data.get(uid)
+        if record is None:
+            record = self.data[uid] = new_user_record()
+            self.messages_index.update(int(uid), 0)
+            self.voice_index.update(int(uid), 0)
+        return record
+
+    def items(self):
+        return self.data.items()
+
+    def window_index(self, metric: str, period: str = "all") -> RankIndex:
+        """Индекс ``messages``/``voice`` за всё время или за окно ``day``/``week``/``month``."""
+        if period == "all":
+            return self.voice_index if metric == "voice" else self.messages_index
+        return self.rollups.index(metric, period, time.time())
+
+    # === Изменение счётчиков ===
+    def add_messages(self, uid: str, count: int = 1, *, windowed: bool = True):
+        record = self.user(uid)
+        record["messages"] = record.get("messages", 0) + count
+        self.messages_index.update(int(uid), record["messages"])
+        if windowed:
+            self.rollups.add(uid, count, 0, time.time())
+        self._add_delta(uid, count, 0)
+
+    def add_voice_seconds(self, uid: str, seconds: int, *, windowed: bool = True):
+        record = self.user(uid)
+        record["voice_seconds"] = record.get("voice_seconds", 0) + seconds
+        self.voice_index.update(int(uid), record["voice_seconds"])
+        if windowed:
+            self.rollups.add(uid, 0, seconds, time.time())
+        self._add_delta(uid, 0, seconds)
+
+    def raise_counters(self, uid: str, messages: int, voice_seconds: int):
+        """Поднимает счётчики до указанных значений, если они больше текущих (идемпотентный импорт).
+
+        Импортированное время не относится ни к какому дню и в окна не попадает.
+        """
+        record = self.user(uid)
+        if messages > record.get("messages", 0):
+            self.add_messages(uid, messages - record.get("messages", 0), windowed=False)
+        if voice_seconds > record.get("voice_seconds", 0):
+            self.add_voice_seconds(uid, voice_seconds - record.get("voice_seconds", 0), windowed=False)
+
+    def add_game_time(self, uid: str, game: str, start_ts: float, end_ts: float):
+        self.user(uid)["games"].add(game, start_ts, end_ts)
+        self.mark_dirty(uid)
+
+    def _add_delta(self, uid: str, messages: int, voice_seconds: int):
+        delta = self._deltas.get(uid)
+        if delta is None:
+            self._deltas[uid] = [messages, voice_seconds]
+        else:
+            delta[0] += messages
+            delta[1] += voice_seconds
+        self._bump()
+
+    def mark_dirty(self, uid: str):
+        self._touched.add(uid)
+        self._bump()
+
+    def _bump(self):
+        self._dirty += 1
+        if self._dirty >= self.flush_changes:
+            self._wakeup.set()
+
+    # === Сброс в хранилище ===
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, deltas, touched = self._dirty, self._deltas, self._touched
+        self._dirty, self._deltas, self._touched = 0, {}, set()
+        daily = self.rollups.take_deltas()
+        try:
+            with metrics.timer("storage", "stats_flush"):
+                await self.backend.save_users(self.data, deltas, touched)
+        except asyncio.CancelledError:
+            self._restore(dirty, deltas, touched)
+            self.rollups.restore_deltas(daily)
+            raise
+        except Exception as e:
+            print(f"[stats] Ошибка сохранения статистики: {e}")
+            self._restore(dirty, deltas, touched)
+        # Суточные корзины пишутся отдельно: сбой одной записи не повторяет приращения другой
+        if not daily:
+            return
+        try:
+            with metrics.timer("storage", "daily_flush"):
+                await self.backend.save_daily(self.rollups.days, daily)
+        except asyncio.CancelledError:
+            self.rollups.restore_deltas(daily)
+            self._dirty += 1
+            raise
+        except Exception as e:
+            print(f"[stats] Ошибка сохранения суточной статистики: {e}")
+            self.rollups.restore_deltas(daily)
+            self._dirty += 1
+
+    def _restore(self, dirty: int, deltas: dict, touched: set):
+        self._dirty += dirty
+        self._touched |= touched
+        for uid, (messages, voice_seconds) in deltas.items():
+            delta = self._deltas.setdefault(uid, [0, 0])
+            delta[0] += messages
+            delta[1] += voice_seconds
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        self._closing = False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        # wait_for может поглотить отмену, если событие сработало в тот же момент,
+        # поэтому цикл останавливается и по флагу
+        self._closing = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
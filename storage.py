@@ -0,0 +1,637 @@
+import json
+import os
+from datetime import datetime, UTC
+from pathlib import Path
+
+import persistence
+from game_history import games_to_json
+from stats_store import new_user_record
+
+# === Настройки хранилища ===
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json")
+DATABASE_URL = os.environ.get("DATABASE_URL")
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 10))
+
+
+def copy_record(record: dict) -> dict:
+    return dict(record, games=games_to_json(record.get("games")))
+
+
+class StorageBackend:
+    """Интерфейс хранилища: статистика пользователей, история игр, варны, мьюты и голосовые сессии.
+
+    Методы сохранения получают живые структуры из памяти и обязаны снять с них
+    копию до первого ``await``.
+    """
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    # --- Статистика и история игр ---
+    async def load_users(self) -> dict[str, dict]:
+        raise NotImplementedError
+
+    async def save_users(self, data: dict[str, dict], deltas: dict[str, list[int]], touched: set[str]):
+        """``deltas`` — приращения [messages, voice_seconds] с прошлого сброса,
+        ``touched`` — пользователи, у которых изменились прочие поля."""
+        raise NotImplementedError
+
+    # --- Суточная статистика ---
+    async def load_daily(self, since_day: int) -> list[tuple[str, int, int, int]]:
+        """Строки (uid, day, messages, voice_seconds) начиная с дня ``since_day``."""
+        raise NotImplementedError
+
+    async def save_daily(self, days: dict[str, dict[int, list[int]]], deltas: dict[tuple[str, int], list[int]]):
+        """``days`` — все суточные корзины в памяти, ``deltas`` — приращения по (uid, day) с прошлого сброса."""
+        raise NotImplementedError
+
+    # --- Предупреждения ---
+    async def load_warns(self, since_ts: float) -> list[dict]:
+        """Все действующие варны не старше ``since_ts`` в порядке выдачи."""
+        raise NotImplementedError
+
+    async def append_warn(self, warn: dict):
+        raise NotImplementedError
+
+    async def clear_warns(self, user_id: int):
+        raise NotImplementedError
+
+    # --- Запланированные снятия мута ---
+    async def load_mutes(self) -> list[dict]:
+        raise NotImplementedError
+
+    async def save_mute(self, mute: dict):
+        raise NotImplementedError
+
+    async def delete_mute(self, guild_id: int, user_id: int):
+        raise NotImplementedError
+
+    # --- Выданные ботом игровые роли ---
+    async def load_game_roles(self) -> list[tuple[int, int, int]]:
+        """Тройки (guild_id, user_id, role_id) ролей, которые выдал сам бот."""
+        raise NotImplementedError
+
+    async def update_game_roles(self, granted: list[tuple[int, int, int]], revoked: list[tuple[int, int, int]]):
+        raise NotImplementedError
+
+    # --- Голосовые сессии ---
+    async def load_voice_sessions(self, since_ts: float) -> list[dict]:
+        """Закрытые засчитанные отрезки, закончившиеся не раньше ``since_ts``."""
+        raise NotImplementedError
+
+    async def append_voice_sessions(self, records: list[dict]):
+        raise NotImplementedError
+
+    async def load_voice_open(self) -> list[dict]:
+        """Открытые сессии на момент последнего сохранения (для продолжения после перезапуска)."""
+        raise NotImplementedError
+
+    async def update_voice_open(self, sessions: list[dict], removed: list[tuple[int, int]]):
+        """Сохраняет изменённые открытые сессии и удаляет закрытые по ключам (guild_id, user_id)."""
+        raise NotImplementedError
+
+
+class JsonBackend(StorageBackend):
+    """Файлы рядом с ботом: users_data.json, суточная статистика daily_stats.json,
+    журнал варнов warns.jsonl, mutes.json, выданные игровые роли game_roles.json,
+    журнал голосовых сессий voice_sessions.jsonl и открытые сессии voice_open.json."""
+
+    def __init__(self, root: Path = Path(".")):
+        self.root = Path(root)
+        self.users_path = self.root / "users_data.json"
+        self.daily_path = self.root / "daily_stats.json"
+        self.warns_path = self.root / "warns.jsonl"
+        self.mutes_path = self.root / "mutes.json"
+        self.voice_sessions_path = self.root / "voice_sessions.jsonl"
+        self.voice_open_path = self.root / "voice_open.json"
+        self.game_roles_path = self.root / "game_roles.json"
+        self._mutes: dict[tuple[int, int], dict] | None = None
+        self._game_roles: set[tuple[int, int, int]] | None = None
+        self._voice_open: dict[tuple[int, int], dict] | None = None
+        # Закодированные записи файла по uid: сохранение перекодирует только изменённых
+        self._user_fragments: dict[str, str] = {}
+        self._daily_fragments: dict[str, str] = {}
+
+    async def close(self):
+        await persistence.drain()
+
+    async def load_users(self):
+        data = await persistence.read_json(self.users_path, {})
+        self._user_fragments = await persistence.run_io(_encode_users, data)
+        return data
+
+    async def save_users(self, data, deltas, touched):
+        fragments = self._user_fragments
+        for uid in deltas.keys() | touched:
+            record = data.get(uid)
+            if record is not None:
+                fragments[uid] = persistence.encode_member(uid, copy_record(record))
+        # Список ссылок на готовые строки; склейка и запись идут в потоке
+        await persistence.write_json_object(self.users_path, list(fragments.values()))
+
+    async def load_daily(self, since_day):
+        raw = await persistence.read_json(self.daily_path, {})
+        live = {
+            uid: {day: counts for day, counts in days.items() if int(day) >= since_day}
+            for uid, days in raw.items()
+        }
+        live = {uid: days for uid, days in live.items() if days}
+        # Дни старше срока хранения выпадают из файла при следующей записи
+        self._daily_fragments = await persistence.run_io(_encode_daily, live)
+        return [(uid, int(day), counts[0], counts[1]) for uid, days in live.items() for day, counts in days.items()]
+
+    async def save_daily(self, days, deltas):
+        fragments = self._daily_fragments
+        for uid in {uid for uid, _ in deltas}:
+            user_days = days.get(uid)
+            if user_days:
+                fragments[uid] = persistence.encode_member(uid, {str(day): counts for day, counts in user_days.items()})
+            else:
+                fragments.pop(uid, None)
+        await persistence.write_json_object(self.daily_path, list(fragments.values()))
+
+    async def load_warns(self, since_ts):
+        if self.warns_path.exists():
+            records = await persistence.read_jsonl(self.warns_path)
+        else:
+            records = await persistence.run_io(_read_legacy_warns, self.root)
+            if records:
+                print(f"[warns] Импортировано варнов из warns_<id>.json: {len(records)}")
+        live: dict[int, list[dict]] = {}
+        for record in records:
+            if record.get("op") == "clear":
+                live.pop(record["user_id"], None)
+            else:
+                live.setdefault(record["user_id"], []).append(record)
+        kept = sorted((warn for user_warns in live.values() for warn in user_warns), key=lambda warn: warn.get("ts", 0))
+        # Журнал только дописывается: при загрузке из него вычищаются снятые /clearwarns
+        # записи, а истёкшие остаются в истории и отбрасываются только в памяти
+        if len(kept) < len(records) or not self.warns_path.exists():
+            await persistence.rewrite_jsonl(self.warns_path, kept)
+        return [warn for warn in kept if warn.get("ts", 0) >= since_ts]
+
+    async def append_warn(self, warn):
+        await persistence.append_jsonl(self.warns_path, [warn])
+
+    async def clear_warns(self, user_id):
+        record = {"op": "clear", "user_id": user_id, "ts": datetime.now(UTC).timestamp()}
+        await persistence.append_jsonl(self.warns_path, [record])
+
+    async def load_mutes(self):
+        if self._mutes is None:
+            mutes = await persistence.read_json(self.mutes_path, [])
+            self._mutes = {(m["guild_id"], m["user_id"]): m for m in mutes}
+        return list(self._mutes.values())
+
+    async def save_mute(self, mute):
+        await self.load_mutes()
+        self._mutes[(mute["guild_id"], mute["user_id"])] = dict(mute)
+        await persistence.write_json(self.mutes_path, list(self._mutes.values()))
+
+    async def delete_mute(self, guild_id, user_id):
+        await self.load_mutes()
+        if self._mutes.pop((guild_id, user_id), None) is not None:
+            await persistence.write_json(self.mutes_path, list(self._mutes.values()))
+
+    async def load_game_roles(self):
+        if self._game_roles is None:
+            rows = await persistence.read_json(self.game_roles_path, [])
+            self._game_roles = {tuple(row) for row in rows}
+        return sorted(self._game_roles)
+
+    async def update_game_roles(self, granted, revoked):
+        await self.load_game_roles()
+        self._game_roles.difference_update(map(tuple, revoked))
+        self._game_roles.update(map(tuple, granted))
+        await persistence.write_json(self.game_roles_path, sorted(self._game_roles))
+
+    async def load_voice_sessions(self, since_ts):
+        records = await persistence.read_jsonl(self.voice_sessions_path)
+        live = [record for record in records if record.get("end", 0) >= since_ts]
+        # Отрезки старше срока хранения вычищаются из журнала при загрузке
+        if len(live) < len(records):
+            await persistence.rewrite_jsonl(self.voice_sessions_path, live)
+        return live
+
+    async def append_voice_sessions(self, records):
+        await persistence.append_jsonl(self.voice_sessions_path, records)
+
+    async def load_voice_open(self):
+        if self._voice_open is None:
+            sessions = await persistence.read_json(self.voice_open_path, [])
+            self._voice_open = {(s["guild_id"], s["user_id"]): s for s in sessions}
+        return list(self._voice_open.values())
+
+    async def update_voice_open(self, sessions, removed):
+        await self.load_voice_open()
+        for key in removed:
+            self._voice_open.pop(tuple(key), None)
+        for session in sessions:
+            self._voice_open[(session["guild_id"], session["user_id"])] = dict(session)
+        await persistence.write_json(self.voice_open_path, list(self._voice_open.values()))
+
+
+def _encode_users(data: dict) -> dict[str, str]:
+    return {uid: persistence.encode_member(uid, copy_record(record)) for uid, record in data.items()}
+
+
+def _encode_daily(days: dict) -> dict[str, str]:
+    return {uid: persistence.encode_member(uid, user_days) for uid, user_days in days.items()}
+
+
+def _read_legacy_warns(root: Path) -> list[dict]:
+    records = []
+    for path in root.glob("warns_*.json"):
+        try:
+            user_id = int(path.stem.split("_", 1)[1])
+            warns = json.loads(path.read_text(encoding="utf-8"))
+            mtime = path.stat().st_mtime
+        except Exception as e:
+            print(f"[warns] Ошибка чтения {path}: {e}")
+            continue
+        for warn in warns:
+            records.append({"user_id": user_id, "by": warn.get("by"), "reason": warn.get("reason"), "ts": warn.get("ts", mtime)})
+    return records
+
+
+class MemoryBackend(StorageBackend):
+    """Хранилище в памяти процесса — замена базы данных для тестов и прогонов без диска."""
+
+    def __init__(self):
+        self.users: dict[str, dict] = {}
+        self.daily: dict[tuple[str, int], list[int]] = {}
+        self.warns: list[dict] = []
+        self.mutes: dict[tuple[int, int], dict] = {}
+        self.voice_sessions: list[dict] = []
+        self.voice_open: dict[tuple[int, int], dict] = {}
+        self.game_roles: set[tuple[int, int, int]] = set()
+
+    async def load_users(self):
+        return {uid: copy_record(record) for uid, record in self.users.items()}
+
+    async def save_users(self, data, deltas, touched):
+        for uid, (messages, voice_seconds) in deltas.items():
+            record = self.users.setdefault(uid, copy_record(new_user_record()))
+            record["messages"] += messages
+            record["voice_seconds"] += voice_seconds
+        for uid in touched:
+            source = data.get(uid)
+            if source is None:
+                continue
+            record = self.users.setdefault(uid, copy_record(new_user_record()))
+            record["games"] = games_to_json(source.get("games"))
+            record["_voice_join_time"] = source.get("_voice_join_time")
+
+    async def load_daily(self, since_day):
+        return [(uid, day, counts[0], counts[1]) for (uid, day), counts in self.daily.items() if day >= since_day]
+
+    async def save_daily(self, days, deltas):
+        for key, (messages, voice_seconds) in deltas.items():
+            counts = self.daily.setdefault(key, [0, 0])
+            counts[0] += messages
+            counts[1] += voice_seconds
+
+    async def load_warns(self, since_ts):
+        return [dict(warn) for warn in self.warns if warn["ts"] >= since_ts]
+
+    async def append_warn(self, warn):
+        self.warns.append(dict(warn))
+
+    async def clear_warns(self, user_id):
+        self.warns = [warn for warn in self.warns if warn["user_id"] != user_id]
+
+    async def load_mutes(self):
+        return [dict(m) for m in self.mutes.values()]
+
+    async def save_mute(self, mute):
+        self.mutes[(mute["guild_id"], mute["user_id"])] = dict(mute)
+
+    async def delete_mute(self, guild_id, user_id):
+        self.mutes.pop((guild_id, user_id), None)
+
+    async def load_game_roles(self):
+        return sorted(self.game_roles)
+
+    async def update_game_roles(self, granted, revoked):
+        self.game_roles.difference_update(map(tuple, revoked))
+        self.game_roles.update(map(tuple, granted))
+
+    async def load_voice_sessions(self, since_ts):
+        self.voice_sessions = [record for record in self.voice_sessions if record["end"] >= since_ts]
+        return [dict(record) for record in self.voice_sessions]
+
+    async def append_voice_sessions(self, records):
+        self.voice_sessions.extend(dict(record) for record in records)
+
+    async def load_voice_open(self):
+        return [dict(session) for session in self.voice_open.values()]
+
+    async def update_voice_open(self, sessions, removed):
+        for key in removed:
+            self.voice_open.pop(tuple(key), None)
+        for session in sessions:
+            self.voice_open[(session["guild_id"], session["user_id"])] = dict(session)
+
+
+# === PostgreSQL ===
+POSTGRES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id BIGINT PRIMARY KEY,
+    messages BIGINT NOT NULL DEFAULT 0,
+    voice_seconds BIGINT NOT NULL DEFAULT 0,
+    voice_join_time BIGINT
+);
+CREATE INDEX IF NOT EXISTS user_stats_messages_idx ON user_stats (messages DESC, user_id);
+CREATE INDEX IF NOT EXISTS user_stats_voice_idx ON user_stats (voice_seconds DESC, user_id);
+CREATE TABLE IF NOT EXISTS daily_stats (
+    user_id BIGINT NOT NULL,
+    day INTEGER NOT NULL,
+    messages BIGINT NOT NULL DEFAULT 0,
+    voice_seconds BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS daily_stats_day_idx ON daily_stats (day);
+CREATE TABLE IF NOT EXISTS game_buckets (
+    user_id BIGINT PRIMARY KEY,
+    day INTEGER,
+    games JSONB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS warns (
+    id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL,
+    by_id BIGINT,
+    reason TEXT,
+    created_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS warns_user_idx ON warns (user_id);
+CREATE INDEX IF NOT EXISTS warns_created_idx ON warns (created_at);
+CREATE TABLE IF NOT EXISTS mutes (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    role_id BIGINT,
+    until DOUBLE PRECISION NOT NULL,
+    reason TEXT,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE TABLE IF NOT EXISTS game_role_grants (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    role_id BIGINT NOT NULL,
+    PRIMARY KEY (guild_id, user_id, role_id)
+);
+CREATE TABLE IF NOT EXISTS cooldowns (
+    name TEXT NOT NULL,
+    user_id BIGINT NOT NULL,
+    until DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (name, user_id)
+);
+CREATE TABLE IF NOT EXISTS voice_sessions (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    channel_id BIGINT,
+    started_at DOUBLE PRECISION NOT NULL,
+    ended_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS voice_sessions_user_idx ON voice_sessions (user_id, ended_at);
+CREATE INDEX IF NOT EXISTS voice_sessions_ended_idx ON voice_sessions (ended_at);
+CREATE TABLE IF NOT EXISTS voice_open (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    started_at DOUBLE PRECISION NOT NULL,
+    credited_at DOUBLE PRECISION NOT NULL,
+    counted BOOLEAN NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+"""
+
+UPSERT_COUNTERS_SQL = """
+INSERT INTO user_stats (user_id, messages, voice_seconds) VALUES ($1, $2, $3)
+ON CONFLICT (user_id) DO UPDATE SET
+    messages = user_stats.messages + EXCLUDED.messages,
+    voice_seconds = user_stats.voice_seconds + EXCLUDED.voice_seconds
+"""
+
+UPSERT_DAILY_SQL = """
+INSERT INTO daily_stats (user_id, day, messages, voice_seconds) VALUES ($1, $2, $3, $4)
+ON CONFLICT (user_id, day) DO UPDATE SET
+    messages = daily_stats.messages + EXCLUDED.messages,
+    voice_seconds = daily_stats.voice_seconds + EXCLUDED.voice_seconds
+"""
+
+UPSERT_VOICE_JOIN_SQL = """
+INSERT INTO user_stats (user_id, voice_join_time) VALUES ($1, $2)
+ON CONFLICT (user_id) DO UPDATE SET voice_join_time = EXCLUDED.voice_join_time
+"""
+
+UPSERT_GAMES_SQL = """
+INSERT INTO game_buckets (user_id, day, games) VALUES ($1, $2, $3::jsonb)
+ON CONFLICT (user_id) DO UPDATE SET day = EXCLUDED.day, games = EXCLUDED.games
+"""
+
+UPSERT_MUTE_SQL = """
+INSERT INTO mutes (guild_id, user_id, role_id, until, reason) VALUES ($1, $2, $3, $4, $5)
+ON CONFLICT (guild_id, user_id) DO UPDATE SET
+    role_id = EXCLUDED.role_id, until = EXCLUDED.until, reason = EXCLUDED.reason
+"""
+
+UPSERT_VOICE_OPEN_SQL = """
+INSERT INTO voice_open (guild_id, user_id, channel_id, started_at, credited_at, counted) VALUES ($1, $2, $3, $4, $5, $6)
+ON CONFLICT (guild_id, user_id) DO UPDATE SET
+    channel_id = EXCLUDED.channel_id, started_at = EXCLUDED.started_at,
+    credited_at = EXCLUDED.credited_at, counted = EXCLUDED.counted
+"""
+
+
+class PostgresBackend(StorageBackend):
+    """asyncpg с пулом соединений. Счётчики пишутся пачками приращений через
+    ``INSERT ... ON CONFLICT``, поэтому несколько процессов бота могут писать
+    в одну базу, не затирая чужие изменения."""
+
+    def __init__(self, dsn: str, min_size: int = DB_POOL_MIN, max_size: int = DB_POOL_MAX):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def connect(self):
+        import asyncpg
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+        async with self.pool.acquire() as conn:
+            await conn.execute(POSTGRES_SCHEMA)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def load_users(self):
+        async with self.pool.acquire() as conn:
+            stats = await conn.fetch("SELECT user_id, messages, voice_seconds, voice_join_time FROM user_stats")
+            games = await conn.fetch("SELECT user_id, day, games FROM game_buckets")
+        data = {}
+        for row in stats:
+            record = data[str(row["user_id"])] = new_user_record()
+            record["messages"] = row["messages"]
+            record["voice_seconds"] = row["voice_seconds"]
+            record["_voice_join_time"] = row["voice_join_time"]
+        for row in games:
+            record = data.setdefault(str(row["user_id"]), new_user_record())
+            record["games"] = {"day": row["day"], "games": json.loads(row["games"])}
+        return data
+
+    async def save_users(self, data, deltas, touched):
+        counter_rows = [(int(uid), messages, voice_seconds) for uid, (messages, voice_seconds) in deltas.items()]
+        join_rows = []
+        game_rows = []
+        for uid in touched:
+            record = data.get(uid)
+            if record is None:
+                continue
+            join_rows.append((int(uid), record.get("_voice_join_time")))
+            games = games_to_json(record.get("games"))
+            game_rows.append((int(uid), games["day"], json.dumps(games["games"], ensure_ascii=False)))
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if counter_rows:
+                    stmt = await conn.prepare(UPSERT_COUNTERS_SQL)
+                    await stmt.executemany(counter_rows)
+                if join_rows:
+                    stmt = await conn.prepare(UPSERT_VOICE_JOIN_SQL)
+                    await stmt.executemany(join_rows)
+                if game_rows:
+                    stmt = await conn.prepare(UPSERT_GAMES_SQL)
+                    await stmt.executemany(game_rows)
+
+    async def load_daily(self, since_day):
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM daily_stats WHERE day < $1", since_day)
+            rows = await conn.fetch("SELECT user_id, day, messages, voice_seconds FROM daily_stats")
+        return [(str(row["user_id"]), row["day"], row["messages"], row["voice_seconds"]) for row in rows]
+
+    async def save_daily(self, days, deltas):
+        rows = [(int(uid), day, messages, voice_seconds) for (uid, day), (messages, voice_seconds) in deltas.items()]
+        if not rows:
+            return
+        async with self.pool.acquire() as conn:
+            stmt = await conn.prepare(UPSERT_DAILY_SQL)
+            await stmt.executemany(rows)
+
+    async def load_warns(self, since_ts):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT user_id, by_id, reason, created_at FROM warns WHERE created_at >= $1 ORDER BY created_at, id",
+                since_ts,
+            )
+        return [
+            {"user_id": row["user_id"], "by": row["by_id"], "reason": row["reason"], "ts": row["created_at"]}
+            for row in rows
+        ]
+
+    async def append_warn(self, warn):
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO warns (user_id, by_id, reason, created_at) VALUES ($1, $2, $3, $4)",
+                warn["user_id"], warn.get("by"), warn.get("reason"), warn["ts"],
+            )
+
+    async def clear_warns(self, user_id):
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM warns WHERE user_id = $1", user_id)
+
+    async def load_mutes(self):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, user_id, role_id, until, reason FROM mutes")
+        return [dict(row) for row in rows]
+
+    async def save_mute(self, mute):
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                UPSERT_MUTE_SQL,
+                mute["guild_id"], mute["user_id"], mute.get("role_id"), mute["until"], mute.get("reason"),
+            )
+
+    async def delete_mute(self, guild_id, user_id):
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM mutes WHERE guild_id = $1 AND user_id = $2", guild_id, user_id)
+
+    async def load_game_roles(self):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT guild_id, user_id, role_id FROM game_role_grants")
+        return [(row["guild_id"], row["user_id"], row["role_id"]) for row in rows]
+
+    async def update_game_roles(self, granted, revoked):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if revoked:
+                    await conn.executemany(
+                        "DELETE FROM game_role_grants WHERE guild_id = $1 AND user_id = $2 AND role_id = $3",
+                        [tuple(row) for row in revoked],
+                    )
+                if granted:
+                    await conn.executemany(
+                        "INSERT INTO game_role_grants (guild_id, user_id, role_id) VALUES ($1, $2, $3) ON CONFLICT DO NOTHING",
+                        [tuple(row) for row in granted],
+                    )
+
+    async def load_voice_sessions(self, since_ts):
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM voice_sessions WHERE ended_at < $1", since_ts)
+            rows = await conn.fetch(
+                "SELECT guild_id, user_id, channel_id, started_at, ended_at FROM voice_sessions ORDER BY ended_at, id"
+            )
+        return [
+            {"guild_id": row["guild_id"], "user_id": row["user_id"], "channel_id": row["channel_id"],
+             "start": row["started_at"], "end": row["ended_at"]}
+            for row in rows
+        ]
+
+    async def append_voice_sessions(self, records):
+        rows = [(r["guild_id"], r["user_id"], r.get("channel_id"), r["start"], r["end"]) for r in records]
+        async with self.pool.acquire() as conn:
+            await conn.executemany(
+                "INSERT INTO voice_sessions (guild_id, user_id, channel_id, started_at, ended_at) VALUES ($1, $2, $3, $4, $5)",
+                rows,
+            )
+
+    async def load_voice_open(self):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT guild_id, user_id, channel_id, started_at, credited_at, counted FROM voice_open"
+            )
+        return [
+            {"guild_id": row["guild_id"], "user_id": row["user_id"], "channel_id": row["channel_id"],
+             "started": row["started_at"], "credited": row["credited_at"], "counted": row["counted"]}
+            for row in rows
+        ]
+
+    async def update_voice_open(self, sessions, removed):
+        rows = [
+            (s["guild_id"], s["user_id"], s["channel_id"], s["started"], s["credited"], s["counted"])
+            for s in sessions
+        ]
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if removed:
+                    await conn.executemany(
+                        "DELETE FROM voice_open WHERE guild_id = $1 AND user_id = $2",
+                        [tuple(key) for key in removed],
+                    )
+                if rows:
+                    stmt = await conn.prepare(UPSERT_VOICE_OPEN_SQL)
+                    await stmt.executemany(rows)
+
+
+def create_backend() -> StorageBackend:
+    if STORAGE_BACKEND == "postgres":
+        if not DATABASE_URL:
+            raise ValueError("STORAGE_BACKEND=postgres требует DATABASE_URL.")
+        return PostgresBackend(DATABASE_URL)
+    if STORAGE_BACKEND == "memory":
+        return MemoryBackend()
+    return JsonBackend()
@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import activity_report
+from activity_report import activity_order, iter_activity_rows
+from stats_store import StatsStore
+from storage import MemoryBackend
+
+
+def game_summary(info: dict) -> dict[str, int]:
+    return info["games"].totals(time.time())
+
+
+def make_store() -> StatsStore:
+    store = StatsStore(MemoryBackend())
+    now_ts = time.time()
+    for uid, messages, dota, cs in (("1", 5, 3600, 0), ("2", 9, 0, 600), ("3", 1, 7200, 60)):
+        store.add_messages(uid, messages)
+        if dota:
+            store.add_game_time(uid, "Dota 2", now_ts - dota, now_ts)
+        if cs:
+            store.add_game_time(uid, "Counter-Strike 2", now_ts - cs, now_ts)
+    return store
+
+
+def test_order_by_sort_and_game():
+    store = make_store()
+
+    async def main():
+        return (
+            await activity_order(store, game_summary, "messages"),
+            await activity_order(store, game_summary, "games"),
+            await activity_order(store, game_summary, "games", "Counter-Strike 2"),
+            await activity_order(store, game_summary, "messages", "Dota 2"),
+        )
+
+    assert asyncio.run(main()) == ([2, 1, 3], [3, 1, 2], [2, 3], [1, 3])
+    rows = list(iter_activity_rows(store, game_summary, [2, 3, 99], "Counter-Strike 2"))
+    assert [(uid, games["Counter-Strike 2"]) for uid, _, games in rows] == [(2, 600), (3, 60)]
+
+
+def test_order_yields_to_event_loop(monkeypatch):
+    monkeypatch.setattr(activity_report, "YIELD_EVERY", 1)
+    store = make_store()
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(1)
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        ticks.clear()
+        await activity_order(store, game_summary, "games")
+        task.cancel()
+
+    asyncio.run(main())
+    assert len(ticks) >= 2
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from cogs import admin
+from cogs.admin import AdminCog
+from launcher import RESTART_EXIT_CODE
+
+
+class Bot:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def close(self):
+        self.calls.append("bot.close")
+
+
+class Services:
+    def __init__(self, calls):
+        self.calls = calls
+        self.bot = Bot(calls)
+        self.exit_code = 0
+        self.respawn = False
+
+    async def close(self):
+        self.calls.append("services.close")
+
+
+def interaction():
+    async def send_message(*args, **kwargs):
+        pass
+
+    return SimpleNamespace(user="admin", guild=None, channel_id=5,
+                           response=SimpleNamespace(send_message=send_message))
+
+
+@pytest.fixture
+def cog(monkeypatch, tmp_path):
+    async def allowed(user, guild):
+        return True
+
+    monkeypatch.setattr(admin, "user_has_allowed_role", allowed)
+    monkeypatch.setattr(admin, "RESTART_FILE", tmp_path / "restart_info.json")
+    return AdminCog(Services([]))
+
+
+def test_stop_leaves_saving_to_run_bot(cog):
+    asyncio.run(AdminCog.stop.callback(cog, interaction()))
+    # Сервисы закрывает run_bot уже после отключения от шлюза
+    assert cog.services.calls == ["bot.close"]
+
+
+@pytest.mark.parametrize("supervised", [True, False])
+def test_restart(cog, monkeypatch, supervised):
+    monkeypatch.setattr(admin, "BOT_SUPERVISED", supervised)
+    asyncio.run(AdminCog.restart.callback(cog, interaction()))
+    assert cog.services.calls == ["bot.close"]
+    assert json.loads(admin.RESTART_FILE.read_text(encoding="utf-8"))["channel_id"] == 5
+    if supervised:
+        assert (cog.services.exit_code, cog.services.respawn) == (RESTART_EXIT_CODE, False)
+    else:
+        # Новый процесс запустит bot.main, когда данные уже сохранены
+        assert (cog.services.exit_code, cog.services.respawn) == (0, True)
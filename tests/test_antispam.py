@@ -0,0 +1,36 @@
+from antispam import SpamDetector, content_hash
+
+
+def test_flood_after_burst_and_refill():
+    detector = SpamDetector(rate=1, burst=3, duplicates=100)
+    assert [detector.check(1, f"msg {i}", now=0) for i in range(4)] == [None, None, None, "flood"]
+    assert detector.check(1, "later", now=1) is None
+    assert detector.check(1, "again", now=1) == "flood"
+    # Другой пользователь со своим ведром
+    assert detector.check(2, "hello", now=1) is None
+
+
+def test_duplicates_within_window():
+    detector = SpamDetector(rate=100, burst=100, duplicates=2, window=60)
+    assert detector.check(1, "Купи", now=0) is None
+    assert detector.check(1, "купи ", now=1) is None
+    assert detector.check(1, "К У П И", now=2) == "duplicate"
+    # Старые повторы выпадают из окна
+    assert detector.check(1, "купи", now=200) is None
+
+
+def test_content_hash_ignores_case_and_spaces():
+    assert content_hash("С п А м") == content_hash("спам")
+    assert content_hash("спам") != content_hash("спам!")
+
+
+def test_users_are_evicted():
+    detector = SpamDetector(rate=1, burst=2, window=10, max_users=3)
+    for user_id in range(5):
+        detector.check(user_id, "hi", now=0)
+    assert len(detector) == 3
+    # Простаивающие дольше окна снимаются по мере новых сообщений
+    detector.check(10, "hi", now=100)
+    detector.check(11, "hi", now=100)
+    assert len(detector) <= 3
+    assert 10 in detector._users and 11 in detector._users
@@ -0,0 +1,81 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import discord
+import pytest
+from discord import app_commands
+
+from command_sync import sync_tree, tree_hash
+
+GUILD = discord.Object(id=42)
+
+
+def make_tree():
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+    synced = []
+
+    async def sync(*, guild=None):
+        synced.append(guild.id if guild is not None else None)
+
+    tree.sync = sync
+
+    @tree.command(name="top", description="Топ по сообщениям")
+    async def top(interaction: discord.Interaction):
+        pass
+
+    return tree, synced
+
+
+def test_unchanged_tree_is_not_synced(tmp_path):
+    path = tmp_path / "hash.json"
+
+    async def main():
+        tree, synced = make_tree()
+        assert await sync_tree(tree, 1, [None, GUILD], path=path) == ["1:global", "1:42"]
+        assert await sync_tree(tree, 1, [None, GUILD], path=path) == []
+        assert synced == [None, 42]
+        # Команда только на сервере меняет хеш лишь его области
+        @tree.command(name="clear", description="Очистка", guild=GUILD)
+        async def clear(interaction: discord.Interaction):
+            pass
+
+        assert await sync_tree(tree, 1, [None, GUILD], path=path) == ["1:42"]
+        assert await sync_tree(tree, 1, [None, GUILD], force=True, path=path) == ["1:global", "1:42"]
+        # Другое приложение синхронизируется отдельно
+        assert await sync_tree(tree, 2, [None], path=path) == ["2:global"]
+
+    asyncio.run(main())
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert set(saved) == {"1:global", "1:42", "2:global"}
+
+
+def test_hash_depends_on_command_payload():
+    first, _ = make_tree()
+    second, _ = make_tree()
+    assert tree_hash(first) == tree_hash(second)
+    second.get_command("top").description = "Другое описание"
+    assert tree_hash(first) != tree_hash(second)
+    assert tree_hash(first, GUILD) != tree_hash(first)
+
+
+def test_failed_sync_keeps_earlier_scopes(tmp_path):
+    path = tmp_path / "hash.json"
+    tree, synced = make_tree()
+    sync = tree.sync
+
+    async def failing_sync(*, guild=None):
+        if guild is not None:
+            raise discord.HTTPException(SimpleNamespace(status=500, reason="Server Error"), "ошибка")
+        await sync(guild=guild)
+
+    async def main():
+        tree.sync = failing_sync
+        with pytest.raises(discord.HTTPException):
+            await sync_tree(tree, 1, [None, GUILD], path=path)
+        # Успешно синхронизированная глобальная область не повторяется
+        tree.sync = sync
+        assert await sync_tree(tree, 1, [None, GUILD], path=path) == ["1:42"]
+        assert synced == [None, 42]
+
+    asyncio.run(main())
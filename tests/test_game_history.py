@@ -0,0 +1,37 @@
+from game_history import DAY_SECONDS, HISTORY_DAYS, GameBuckets, games_to_json
+
+DAY = 20000
+
+
+def at(day: int, hour: float = 0) -> float:
+    return day * DAY_SECONDS + hour * 3600
+
+
+def test_session_split_across_midnight():
+    games = GameBuckets()
+    games.add("Dota 2", at(DAY, 23), at(DAY + 1, 2))
+    assert games.day == DAY + 1
+    assert games.totals(at(DAY + 1, 3)) == {"Dota 2": 3 * 3600}
+    # Через HISTORY_DAYS - 1 суток первый час уже выпал из окна
+    assert games.totals(at(DAY + HISTORY_DAYS, 1)) == {"Dota 2": 2 * 3600}
+
+
+def test_old_days_are_cleared_on_advance():
+    games = GameBuckets()
+    games.add("Dota 2", at(DAY, 10), at(DAY, 11))
+    games.add("Counter-Strike 2", at(DAY + HISTORY_DAYS, 10), at(DAY + HISTORY_DAYS, 12))
+    assert games.totals(at(DAY + HISTORY_DAYS, 13)) == {"Counter-Strike 2": 7200}
+    assert list(games.games) == ["Counter-Strike 2"]
+    # Событие старше окна не учитывается
+    games.add("Dota 2", at(DAY, 10), at(DAY, 11))
+    assert "Dota 2" not in games.totals(at(DAY + HISTORY_DAYS, 13))
+
+
+def test_json_round_trip_and_legacy_format():
+    games = GameBuckets()
+    games.add("Dota 2", at(DAY, 10), at(DAY, 12))
+    restored = GameBuckets.from_json(games.to_json())
+    assert restored.totals(at(DAY, 13)) == {"Dota 2": 7200}
+    assert games_to_json(games.to_json()) == games.to_json()
+    assert not GameBuckets.from_json([["Dota 2", at(DAY)]])
+    assert games_to_json(None) == {"day": None, "games": {}}
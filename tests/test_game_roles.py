@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from game_history import GameBuckets
+from game_roles import GameRoleEngine
+from storage import MemoryBackend
+
+GUILD_ID = 1
+DOTA_ROLE = 10
+
+
+class Role:
+    def __init__(self, role_id: int):
+        self.id = role_id
+
+    def __eq__(self, other):
+        return self.id == other.id
+
+    def __hash__(self):
+        return self.id
+
+
+class Member:
+    bot = False
+
+    def __init__(self, user_id: int, *role_ids: int):
+        self.id = user_id
+        self.roles = [Role(role_id) for role_id in role_ids]
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles += roles
+
+    async def remove_roles(self, *roles, reason=None):
+        self.roles = [role for role in self.roles if role not in roles]
+
+
+class Guild:
+    id = GUILD_ID
+
+    def __init__(self, *members: Member):
+        self.members = {member.id: member for member in members}
+        self.roles = {DOTA_ROLE: Role(DOTA_ROLE)}
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+
+class Store:
+    def __init__(self, data):
+        self.data = data
+
+    def items(self):
+        return self.data.items()
+
+
+class Presence:
+    def __init__(self):
+        self.open = {}
+
+    def open_seconds(self, now_ts):
+        return self.open
+
+
+def played(hours: float) -> dict:
+    games = GameBuckets()
+    now_ts = time.time()
+    games.add("Dota 2", now_ts - hours * 3600, now_ts)
+    return {"games": games}
+
+
+async def apply_plan(engine: GameRoleEngine, guild: Guild):
+    for user_id, (to_add, to_remove) in engine.plan(guild).items():
+        await engine._apply(guild, user_id, to_add, to_remove)
+
+
+def make_engine(store, presence, backend) -> GameRoleEngine:
+    return GameRoleEngine(None, store, presence, backend, {"Dota 2": DOTA_ROLE}, GUILD_ID, min_hours=1, request_delay=0)
+
+
+def test_only_bot_granted_roles_are_revoked():
+    manual, player = Member(1, DOTA_ROLE), Member(2)
+    guild = Guild(manual, player)
+    store = Store({"1": {"games": GameBuckets()}, "2": played(2)})
+    backend = MemoryBackend()
+
+    async def main():
+        engine = make_engine(store, Presence(), backend)
+        await engine.load()
+        # Выданная вручную роль без наигранного времени остаётся
+        await apply_plan(engine, guild)
+        assert DOTA_ROLE in [role.id for role in manual.roles]
+        assert DOTA_ROLE in [role.id for role in player.roles]
+        assert backend.game_roles == {(GUILD_ID, 2, DOTA_ROLE)}
+        # После перезапуска выданные ботом роли известны из хранилища
+        engine = make_engine(store, Presence(), backend)
+        await engine.load()
+        store.data["2"] = {"games": GameBuckets()}
+        await apply_plan(engine, guild)
+        assert player.roles == []
+        assert DOTA_ROLE in [role.id for role in manual.roles]
+        assert backend.game_roles == set()
+
+    asyncio.run(main())
+
+
+def test_open_sessions_count_towards_roles():
+    player, newcomer = Member(2), Member(3)
+    guild = Guild(player, newcomer)
+    presence = Presence()
+    store = Store({"2": played(0.5)})
+    presence.open = {(2, "Dota 2"): 1800, (3, "Dota 2"): 3600}
+
+    async def main():
+        engine = make_engine(store, presence, MemoryBackend())
+        assert engine.desired_roles(time.time()) == {2: {DOTA_ROLE}, 3: {DOTA_ROLE}}
+        presence.open = {(2, "Dota 2"): 600}
+        assert engine.desired_roles(time.time()) == {}
+
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+import random
+
+from leaderboard import RankIndex
+
+
+def expected_order(values: dict[int, int]) -> list[tuple[int, int]]:
+    return sorted(values.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_top_and_rank_match_sorted_order():
+    rng = random.Random(1)
+    index = RankIndex(load=4)
+    values = {uid: rng.randrange(100) for uid in range(50)}
+    index.rebuild(values.items())
+    for _ in range(500):
+        uid = rng.randrange(60)
+        if rng.random() < 0.2:
+            index.discard(uid)
+            values.pop(uid, None)
+        else:
+            values[uid] = rng.randrange(100)
+            index.update(uid, values[uid])
+        order = expected_order(values)
+        assert index.top(10) == order[:10]
+        probe = rng.randrange(60)
+        rank = next((i for i, (uid, _) in enumerate(order, 1) if uid == probe), None)
+        assert index.rank(probe) == rank
+    assert len(index) == len(values)
+    assert index.top(len(values) + 5) == expected_order(values)
+
+
+def test_ties_ordered_by_uid():
+    index = RankIndex()
+    for uid in (30, 10, 20):
+        index.update(uid, 5)
+    index.update(40, 7)
+    assert index.top(4) == [(40, 7), (10, 5), (20, 5), (30, 5)]
+    assert index.rank(20) == 3
+    assert index.rank(99) is None
+    assert index.get(99) == 0 and 99 not in index
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import metrics
+from metrics import BUCKETS, Histogram
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
+    monkeypatch.setattr(metrics, "_startup", {})
+
+
+def test_histogram_buckets_and_quantiles():
+    hist = Histogram()
+    assert hist.quantile(0.5) == 0.0
+    for value in (0.001, 0.002, 0.003, 0.2, 40.0):
+        hist.observe(value)
+    assert hist.counts[0] == 1
+    assert hist.counts[BUCKETS.index(0.0025)] == 1
+    assert hist.counts[BUCKETS.index(0.005)] == 1
+    assert hist.counts[-1] == 1
+    assert (hist.count, hist.max) == (5, 40.0)
+    assert hist.sum == pytest.approx(40.206)
+    assert hist.quantile(0.5) == 0.005
+    # Выше последней корзины оценкой служит максимум
+    assert hist.quantile(1.0) == 40.0
+
+
+def test_quantile_capped_at_max():
+    hist = Histogram()
+    hist.observe(0.3)
+    assert hist.quantile(0.95) == 0.3
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    metrics.inc("command_errors", "top")
+    metrics.observe("event", "on_message", 0.1)
+    with metrics.timer("storage", "flush"):
+        pass
+    assert metrics._counters == {} and metrics._histograms == {}
+
+
+def test_timer_and_timed():
+    with metrics.timer("storage", "flush"):
+        pass
+
+    @metrics.timed("event")
+    async def on_message():
+        return 42
+
+    assert asyncio.run(on_message()) == 42
+    assert metrics.histogram("storage", "flush").count == 1
+    assert metrics.histogram("event", "on_message").count == 1
+
+
+def test_render_prometheus():
+    metrics.inc("command_errors", "top")
+    metrics.inc("command_errors", "top", 2)
+    metrics.observe("event", 'on_"message"', 0.003)
+    metrics.observe("event", 'on_"message"', 60.0)
+    metrics.register_gauge("guilds", lambda: 3)
+    metrics.register_gauge("broken", lambda: 1 / 0)
+    metrics.mark_startup("login", 1.5)
+    lines = metrics.render_prometheus().splitlines()
+
+    assert "# TYPE bot_uptime_seconds gauge" in lines
+    assert "bot_guilds 3.0" in lines
+    # Упавший датчик пропускается, а не ломает весь ответ
+    assert not any(line.startswith("bot_broken") for line in lines)
+    assert 'bot_startup_seconds{stage="login"} 1.5' in lines
+    assert "# TYPE bot_command_errors_total counter" in lines
+    assert 'bot_command_errors_total{name="top"} 3' in lines
+    assert "# TYPE bot_event_seconds histogram" in lines
+    label = 'name="on_\\"message\\""'
+    # Корзины накопительные, +Inf равна общему числу наблюдений
+    assert f'bot_event_seconds_bucket{{{label},le="0.0025"}} 0' in lines
+    assert f'bot_event_seconds_bucket{{{label},le="0.005"}} 1' in lines
+    assert f'bot_event_seconds_bucket{{{label},le="30.0"}} 1' in lines
+    assert f'bot_event_seconds_bucket{{{label},le="+Inf"}} 2' in lines
+    assert f"bot_event_seconds_sum{{{label}}} 60.003" in lines
+    assert f"bot_event_seconds_count{{{label}}} 2" in lines
+
+
+def test_summary_text():
+    metrics.mark_startup("login", 1.5)
+    for _ in range(3):
+        metrics.observe("command", "top", 0.01)
+    metrics.inc("antispam", "flood", 4)
+    text = metrics.summary_text()
+    assert "Запуск: login 1.50 с" in text
+    assert "  top: 3 " in text
+    assert "Антиспам: 4 (чаще всего flood: 4)" in text
@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import migration
+from migration import MigrationJob
+from stats_store import StatsStore
+from storage import MemoryBackend
+
+
+def write(path, payload):
+    path.write_text(json.dumps(payload), encoding="utf-8")
+
+
+def test_import_is_idempotent_and_resumable(tmp_path, monkeypatch):
+    monkeypatch.setattr(migration, "MIGRATE_BATCH", 2)
+    write(tmp_path / "userstats_1.json", {"messages": 10, "voice_seconds": 60})
+    write(tmp_path / "userstats_2.json", {"messages": 3})
+    write(tmp_path / "gamehistory_1.json", [["Dota 2", 0]])
+    (tmp_path / "userstats_bad.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "userstats_3.json").write_text("{не json", encoding="utf-8")
+    state_path = tmp_path / "migrate_state.json"
+    reports = []
+
+    async def report(text):
+        reports.append(text)
+
+    async def main():
+        backend = MemoryBackend()
+        store = StatsStore(backend)
+        await store.load()
+        store.add_messages("1", 15)
+        job = MigrationJob(store, tmp_path, state_path)
+        await job.start(report)
+        # Счётчики объединяются по максимуму и уже сброшены в хранилище
+        assert (backend.users["1"]["messages"], backend.users["1"]["voice_seconds"]) == (15, 60)
+        assert backend.users["2"]["messages"] == 3
+        assert (job.done, job.legacy_games, len(job.errors)) == (3, 1, 2)
+        assert reports[-1].startswith("Миграция завершена!")
+
+        job = MigrationJob(store, tmp_path, state_path)
+        await job.start(report)
+        assert (job.done, job.skipped) == (0, 3)
+        assert backend.users["1"]["messages"] == 15
+
+    asyncio.run(main())
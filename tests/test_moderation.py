@@ -0,0 +1,102 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import moderation
+from moderation import ModerationExecutor
+
+ALLOWED = 99
+
+
+class Channel:
+    def __init__(self, channel_id: int, send_messages=None, fail: bool = False):
+        self.id = channel_id
+        self.name = f"c{channel_id}"
+        self.fail = fail
+        self.overwrite = discord.PermissionOverwrite(send_messages=send_messages)
+        self.calls = 0
+
+    def overwrites_for(self, role):
+        return discord.PermissionOverwrite(**dict(self.overwrite))
+
+    async def set_permissions(self, role, overwrite, reason=None):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise discord.HTTPException(SimpleNamespace(status=500, reason="Server Error"), "ошибка")
+        self.overwrite = overwrite
+
+
+@pytest.fixture(autouse=True)
+def allowed_channels(monkeypatch):
+    monkeypatch.setattr(moderation, "MUTE_ALLOWED_CHANNELS", {ALLOWED})
+
+
+def test_mute_role_setup_touches_only_pending_channels():
+    ready, muted, appeal = Channel(1, send_messages=False), Channel(2), Channel(ALLOWED)
+    flaky = Channel(3, fail=True)
+    guild = SimpleNamespace(id=7, text_channels=[ready, muted, appeal, flaky])
+    role = SimpleNamespace(id=5)
+
+    async def main():
+        executor = ModerationExecutor(concurrency=2)
+        job = executor.setup_mute_role(guild, role, requested_by=1)
+        # Повторный запрос во время настройки возвращает ту же задачу
+        assert executor.setup_mute_role(guild, role, requested_by=2) is job
+        await job.task
+        assert (job.status, job.total, job.done, job.failed) == ("done", 3, 2, 1)
+        assert ready.calls == 0
+        assert (muted.overwrite.send_messages, appeal.overwrite.send_messages) == (False, True)
+        # Канал с ошибкой повторяется при следующем муте, остальные уже настроены
+        flaky.fail = False
+        job = executor.setup_mute_role(guild, role, requested_by=1)
+        await job.task
+        assert (job.total, muted.calls, flaky.calls) == (1, 1, 2)
+        assert executor.setup_mute_role(guild, role, requested_by=1) is None
+
+    asyncio.run(main())
+
+
+def test_clear_batches_recent_messages():
+    now = discord.utils.utcnow()
+
+    class Message:
+        def __init__(self, message_id: int, age: timedelta):
+            self.id = message_id
+            self.created_at = now - age
+
+        async def delete(self):
+            deleted.append([self.id])
+
+    deleted = []
+    history = [Message(i, timedelta(minutes=i)) for i in range(150)] + [Message(200, timedelta(days=20))]
+
+    class TextChannel:
+        id = 3
+        name = "general"
+        guild = SimpleNamespace(id=7)
+
+        async def history(self, limit):
+            for message in history[:limit]:
+                yield message
+
+        async def delete_messages(self, messages):
+            deleted.append([message.id for message in messages])
+
+    async def main():
+        reports = []
+
+        async def report(job):
+            reports.append(job.progress_text())
+
+        job = ModerationExecutor().clear(TextChannel(), 500, requested_by=1, report=report)
+        await job.task
+        assert [len(batch) for batch in deleted] == [100, 50, 1]
+        assert deleted[-1] == [200]
+        assert (job.total, job.done, job.status) == (151, 151, "done")
+        assert reports[-1].endswith("завершено")
+
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+import asyncio
+
+import mute_scheduler
+from mute_scheduler import MuteScheduler
+from storage import MemoryBackend
+
+
+def test_failed_expiry_is_retried(monkeypatch):
+    monkeypatch.setattr(mute_scheduler, "MUTE_RETRY_BASE_SECONDS", 0.01)
+    attempts = []
+
+    async def on_expire(mute):
+        attempts.append(mute["user_id"])
+        if len(attempts) < 3:
+            raise RuntimeError("Discord недоступен")
+
+    async def main():
+        backend = MemoryBackend()
+        scheduler = MuteScheduler(backend, on_expire)
+        scheduler.start()
+        await scheduler.schedule(1, 2, 3, 0)
+        for _ in range(100):
+            if len(attempts) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0)
+        scheduler.close()
+        # Запись удаляется только после успешного снятия
+        assert attempts == [2, 2, 2]
+        assert scheduler.get(1, 2) is None
+        assert await backend.load_mutes() == []
+
+    asyncio.run(main())
+
+
+def test_other_worker_keeps_record():
+    async def on_expire(mute):
+        return False
+
+    async def main():
+        backend = MemoryBackend()
+        scheduler = MuteScheduler(backend, on_expire)
+        await scheduler.schedule(1, 2, 3, 0)
+        await scheduler._run_due()
+        assert len(await backend.load_mutes()) == 1
+
+    asyncio.run(main())
+
+
+def test_remute_during_expiry_keeps_new_mute():
+    async def main():
+        backend = MemoryBackend()
+
+        async def on_expire(mute):
+            # Модератор выдаёт новый мут, пока снимается старый
+            await scheduler.schedule(1, 2, 3, 3600, "новый")
+
+        scheduler = MuteScheduler(backend, on_expire)
+        await scheduler.schedule(1, 2, 3, 0, "старый")
+        await scheduler._run_due()
+        assert scheduler.get(1, 2)["reason"] == "новый"
+        assert [m["reason"] for m in await backend.load_mutes()] == ["новый"]
+
+    asyncio.run(main())
+
+
+def test_failed_expiry_does_not_override_new_mute():
+    async def main():
+        backend = MemoryBackend()
+
+        async def on_expire(mute):
+            await scheduler.schedule(1, 2, 3, 3600, "новый")
+            raise RuntimeError("Discord недоступен")
+
+        scheduler = MuteScheduler(backend, on_expire)
+        await scheduler.schedule(1, 2, 3, 0, "старый")
+        await scheduler._run_due()
+        new = scheduler.get(1, 2)
+        assert new["reason"] == "новый"
+        # Повтор старого мута не попал в кучу поверх нового
+        assert [until for until, _, _ in scheduler._heap] == [new["until"]]
+
+    asyncio.run(main())
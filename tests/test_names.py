@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+import names
+from names import NameCache
+
+
+class FakeGuild:
+    def __init__(self, cached=(), remote=()):
+        self.cached = {m.id: m for m in cached}
+        self.remote = {m.id: m for m in remote}
+        self.queries = []
+
+    def get_member(self, user_id):
+        return self.cached.get(user_id)
+
+    async def query_members(self, user_ids, cache):
+        self.queries.append(list(user_ids))
+        return [self.remote[user_id] for user_id in user_ids if user_id in self.remote]
+
+
+def member(user_id, name):
+    return SimpleNamespace(id=user_id, display_name=name)
+
+
+def test_misses_are_fetched_in_chunks_once(monkeypatch):
+    monkeypatch.setattr(names, "QUERY_CHUNK", 2)
+    guild = FakeGuild(cached=[member(1, "Кэш")], remote=[member(2, "Два"), member(3, "Три")])
+    cache = NameCache()
+
+    async def main():
+        first = await cache.resolve(guild, [1, 2, 3, 4])
+        second = await cache.resolve(guild, [2, 3, 4])
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == {1: "Кэш", 2: "Два", 3: "Три", 4: "ID 4"}
+    assert second == {2: "Два", 3: "Три", 4: "ID 4"}
+    # Второй вызов целиком из кэша, включая известного отсутствующего
+    assert guild.queries == [[2, 3], [4]]
+
+
+def test_lru_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(names.time, "monotonic", lambda: now[0])
+    cache = NameCache(maxsize=2, ttl=10)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.lookup(1) == (True, "a")
+    cache.put(3, "c")
+    # Вытеснен давно не читанный 2
+    assert cache.lookup(2) == (False, None)
+    now[0] += 11
+    assert cache.lookup(1) == (False, None)
+    cache.put(4, None, ttl=60)
+    assert cache.lookup(4) == (True, None)
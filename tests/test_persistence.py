@@ -0,0 +1,71 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+import persistence
+
+
+def test_overlapping_writes_coalesce_and_last_wins(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    written = []
+    started = threading.Event()
+    release = threading.Event()
+    original = persistence._write_json_sync
+
+    def blocking(path, data, dumps_kwargs):
+        written.append(data)
+        started.set()
+        release.wait(5)
+        original(path, data, dumps_kwargs)
+
+    monkeypatch.setattr(persistence, "_write_json_sync", blocking)
+
+    async def main():
+        first = asyncio.create_task(persistence.write_json(path, {"n": 0}))
+        await asyncio.to_thread(started.wait, 5)
+        # Пока первая запись в полёте, остальные сливаются в одну с последними данными
+        rest = [asyncio.create_task(persistence.write_json(path, {"n": n})) for n in range(1, 10)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *rest)
+
+    asyncio.run(main())
+    assert written == [{"n": 0}, {"n": 9}]
+    assert json.loads(path.read_text(encoding="utf-8")) == {"n": 9}
+
+
+def test_queued_writes_merge_into_one(tmp_path):
+    path = tmp_path / "data.json"
+
+    async def main():
+        await asyncio.gather(*(persistence.write_json(path, {"n": n}) for n in range(10)))
+
+    asyncio.run(main())
+    assert json.loads(path.read_text(encoding="utf-8")) == {"n": 9}
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = tmp_path / "data.json"
+
+    async def main():
+        await persistence.write_json(path, {"ok": True})
+        with pytest.raises(TypeError):
+            await persistence.write_json(path, {"bad": object()})
+
+    asyncio.run(main())
+    assert json.loads(path.read_text(encoding="utf-8")) == {"ok": True}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_write_json_object_joins_fragments(tmp_path):
+    path = tmp_path / "users.json"
+    fragments = [persistence.encode_member("1", {"messages": 2}), persistence.encode_member("ключ", [1, 2])]
+
+    async def main():
+        await persistence.write_json_object(path, fragments)
+        await persistence.write_json_object(tmp_path / "empty.json", [])
+        return await persistence.read_json(path), await persistence.read_json(tmp_path / "empty.json")
+
+    assert asyncio.run(main()) == ({"1": {"messages": 2}, "ключ": [1, 2]}, {})
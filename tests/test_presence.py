@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import presence
+from presence import PresencePipeline
+
+GAMES = {"Dota 2", "Counter-Strike 2"}
+
+
+class Clock:
+    def __init__(self, ts: float):
+        self.ts = ts
+
+    def now(self, tz=None):
+        return SimpleNamespace(timestamp=lambda: self.ts)
+
+
+class Store:
+    def __init__(self):
+        self.credited = []
+
+    def add_game_time(self, uid, game, start_ts, end_ts):
+        self.credited.append((uid, game, start_ts, end_ts))
+
+
+def member(user_id: int, *games: str, bot: bool = False):
+    activities = [SimpleNamespace(type=discord.ActivityType.playing, name=game) for game in games]
+    return SimpleNamespace(id=user_id, bot=bot, guild=object(), activities=activities)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(presence, "datetime", clock)
+    return clock
+
+
+@pytest.fixture
+def store():
+    return Store()
+
+
+@pytest.fixture
+def pipeline(store):
+    return PresencePipeline(store, GAMES, debounce=60)
+
+
+def test_stop_is_credited_after_debounce(clock, store, pipeline):
+    pipeline.handle(member(1), member(1, "Dota 2", "Spotify"))
+    clock.ts = 1600
+    pipeline.handle(member(1, "Dota 2"), member(1))
+    clock.ts = 1630
+    pipeline.flush()
+    assert store.credited == []
+    clock.ts = 1661
+    pipeline.flush()
+    assert store.credited == [("1", "Dota 2", 1000.0, 1600)]
+
+
+def test_restart_within_debounce_keeps_session(clock, store, pipeline):
+    pipeline.handle(member(1), member(1, "Dota 2"))
+    clock.ts = 1100
+    pipeline.handle(member(1, "Dota 2"), member(1))
+    clock.ts = 1120
+    pipeline.handle(member(1), member(1, "Dota 2"))
+    clock.ts = 2000
+    pipeline.flush()
+    assert store.credited == []
+    pipeline.close()
+    assert store.credited == [("1", "Dota 2", 1000.0, 2000)]
+
+
+def test_unchanged_games_are_ignored(clock, pipeline):
+    pipeline.handle(member(1, "Dota 2"), member(1, "Dota 2", "Spotify"))
+    pipeline.handle(member(2), member(2, bot=True))
+    assert pipeline.open_seconds(clock.ts) == {}
+
+
+def test_accrue_credits_running_sessions_once(clock, store, pipeline):
+    pipeline.handle(member(1), member(1, "Dota 2"))
+    pipeline.handle(member(2), member(2, "Counter-Strike 2"))
+    clock.ts = 1060
+    pipeline.handle(member(2, "Counter-Strike 2"), member(2))
+    pipeline.accrue()
+    # Ожидающая остановки сессия зачисляется при остановке, а не при начислении
+    assert store.credited == [("1", "Dota 2", 1000.0, 1060)]
+    clock.ts = 1200
+    pipeline.accrue()
+    pipeline.flush()
+    assert store.credited == [
+        ("1", "Dota 2", 1000.0, 1060),
+        ("1", "Dota 2", 1060, 1200),
+        ("2", "Counter-Strike 2", 1000.0, 1060),
+    ]
+    assert pipeline.open_seconds(1250) == {(1, "Dota 2"): 50}
+
+
+def test_seed_closes_sessions_of_members_who_stopped(clock, store, pipeline):
+    pipeline.seed([member(1, "Dota 2"), member(2, "Dota 2"), member(3, "Dota 2", bot=True)])
+    assert set(pipeline.open_seconds(clock.ts)) == {(1, "Dota 2"), (2, "Dota 2")}
+    # Переподключение: первый перестал играть, пока бот был офлайн
+    clock.ts = 1300
+    pipeline.seed([member(1), member(2, "Dota 2")])
+    clock.ts = 1400
+    pipeline.flush()
+    pipeline.accrue()
+    assert ("1", "Dota 2", 1000.0, 1300) in store.credited
+    assert set(pipeline.open_seconds(clock.ts)) == {(2, "Dota 2")}
+    assert all(uid != "1" or end <= 1300 for uid, _, _, end in store.credited)
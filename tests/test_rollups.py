@@ -0,0 +1,56 @@
+from game_history import DAY_SECONDS
+from rollups import ROLLUP_DAYS, Rollups
+
+DAY = 20000
+
+
+def at(day: int, hour: int = 12) -> float:
+    return day * DAY_SECONDS + hour * 3600
+
+
+def test_periods_drop_expired_days():
+    rollups = Rollups()
+    rollups.add("1", 3, 60, at(DAY))
+    rollups.add("2", 1, 0, at(DAY))
+    rollups.add("1", 2, 0, at(DAY + 1))
+    assert rollups.index("messages", "day", at(DAY + 1)).top(5) == [(1, 2)]
+    assert rollups.index("messages", "week", at(DAY + 1)).top(5) == [(1, 5), (2, 1)]
+    assert rollups.index("voice", "week", at(DAY + 1)).top(5) == [(1, 60)]
+    # Через 7 суток первый день выпадает из недели, но остаётся в месяце
+    assert rollups.index("messages", "week", at(DAY + 7)).top(5) == [(1, 2)]
+    assert rollups.index("messages", "month", at(DAY + 7)).top(5) == [(1, 5), (2, 1)]
+    assert rollups.index("messages", "day", at(DAY + 7)).top(5) == []
+    assert rollups.index("messages", "month", at(DAY + 30)).top(5) == [(1, 2)]
+    assert rollups.days == {"1": {DAY + 1: [2, 0]}}
+
+
+def test_long_gap_resets():
+    rollups = Rollups()
+    rollups.add("1", 4, 0, at(DAY))
+    assert rollups.index("messages", "month", at(DAY + ROLLUP_DAYS)).top(5) == []
+    assert rollups.days == {}
+
+
+def test_load_matches_live_adds():
+    rows = [("1", DAY - 10, 4, 0), ("1", DAY, 1, 30), ("2", DAY - 3, 2, 0), ("3", DAY - ROLLUP_DAYS, 9, 0)]
+    rollups = Rollups()
+    rollups.load(rows, at(DAY))
+    assert rollups.index("messages", "day", at(DAY)).top(5) == [(1, 1)]
+    assert rollups.index("messages", "week", at(DAY)).top(5) == [(2, 2), (1, 1)]
+    assert rollups.index("messages", "month", at(DAY)).top(5) == [(1, 5), (2, 2)]
+    assert "3" not in rollups.days
+    rollups.add("2", 1, 0, at(DAY + 1))
+    assert rollups.index("messages", "week", at(DAY + 1)).top(5) == [(2, 3), (1, 1)]
+    assert rollups.index("messages", "day", at(DAY + 1)).top(5) == [(2, 1)]
+
+
+def test_deltas_taken_and_restored():
+    rollups = Rollups()
+    rollups.add("1", 1, 0, at(DAY))
+    rollups.add("1", 2, 5, at(DAY))
+    deltas = rollups.take_deltas()
+    assert deltas == {("1", DAY): [3, 5]}
+    assert rollups.take_deltas() == {}
+    rollups.add("1", 1, 0, at(DAY))
+    rollups.restore_deltas(deltas)
+    assert rollups.take_deltas() == {("1", DAY): [4, 5]}
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+import shared_state
+from launcher import shard_groups
+from shared_state import LocalSharedState, create_shared_state
+from stats_store import StatsStore
+from storage import MemoryBackend
+
+
+@pytest.mark.parametrize("shard_count, workers, expected", [
+    (4, 2, [[0, 1], [2, 3]]),
+    (5, 2, [[0, 1, 2], [3, 4]]),
+    (2, 4, [[0], [1]]),
+    (1, 1, [[0]]),
+])
+def test_shard_groups(shard_count, workers, expected):
+    assert shard_groups(shard_count, workers) == expected
+
+
+def test_shard_groups_cover_every_shard_once():
+    for shard_count in range(1, 20):
+        for workers in range(1, 8):
+            groups = shard_groups(shard_count, workers)
+            assert sorted(shard for group in groups for shard in group) == list(range(shard_count))
+            assert all(groups)
+
+
+def test_local_cooldown(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    state = LocalSharedState(StatsStore(MemoryBackend()))
+
+    async def main():
+        assert await state.try_cooldown("top", 1, 30)
+        assert not await state.try_cooldown("top", 1, 30)
+        # Разные команды и пользователи не мешают друг другу
+        assert await state.try_cooldown("voice_top", 1, 30)
+        assert await state.try_cooldown("top", 2, 30)
+        now[0] += 31
+        assert await state.try_cooldown("top", 1, 30)
+
+    asyncio.run(main())
+
+
+def test_local_top_and_windowed_rank():
+    store = StatsStore(MemoryBackend())
+    store.raise_counters("1", 50, 0)
+    store.add_messages("2", 5)
+    store.add_messages("3", 8)
+    store.add_voice_seconds("3", 120)
+    state = create_shared_state(MemoryBackend(), store)
+
+    async def main():
+        assert await state.top("messages", 2) == [(1, 50), (3, 8)]
+        # Импортированные счётчики не относятся ни к какому дню
+        assert await state.top("messages", 5, "week") == [(3, 8), (2, 5)]
+        assert await state.rank("messages", 2, "day") == (2, 5)
+        assert await state.rank("messages", 1, "day") == (None, 0)
+        assert await state.rank("voice", 3, "month") == (1, 120)
+        assert await state.counters(3, "week") == (8, 120)
+        assert await state.counters(1) == (50, 0)
+
+    asyncio.run(main())
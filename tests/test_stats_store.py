@@ -0,0 +1,85 @@
+import asyncio
+
+from stats_store import StatsStore
+from storage import JsonBackend, MemoryBackend
+
+
+class FailingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.fail = True
+
+    async def save_users(self, data, deltas, touched):
+        if self.fail:
+            raise OSError("диск недоступен")
+        await super().save_users(data, deltas, touched)
+
+
+def test_events_are_written_only_on_flush():
+    async def main():
+        backend = MemoryBackend()
+        store = StatsStore(backend, flush_interval=3600, flush_changes=1000)
+        await store.load()
+        store.add_messages("1", 2)
+        store.add_voice_seconds("1", 30)
+        assert backend.users == {}
+        await store.flush()
+        assert (backend.users["1"]["messages"], backend.users["1"]["voice_seconds"]) == (2, 30)
+        # Повторный сброс без изменений ничего не пишет
+        store.add_messages("1")
+        await store.flush()
+        await store.flush()
+        assert backend.users["1"]["messages"] == 3
+
+    asyncio.run(main())
+
+
+def test_flush_after_enough_changes():
+    async def main():
+        backend = MemoryBackend()
+        store = StatsStore(backend, flush_interval=3600, flush_changes=3)
+        await store.load()
+        store.start()
+        for _ in range(3):
+            store.add_messages("1")
+        for _ in range(100):
+            if "1" in backend.users:
+                break
+            await asyncio.sleep(0.01)
+        assert backend.users["1"]["messages"] == 3
+        await store.close()
+
+    asyncio.run(main())
+
+
+def test_failed_flush_keeps_deltas():
+    async def main():
+        backend = FailingBackend()
+        store = StatsStore(backend, flush_interval=3600)
+        await store.load()
+        store.add_messages("1", 5)
+        await store.flush()
+        assert backend.users == {}
+        backend.fail = False
+        store.add_messages("1")
+        await store.flush()
+        assert backend.users["1"]["messages"] == 6
+
+    asyncio.run(main())
+
+
+def test_close_flushes_to_json(tmp_path):
+    async def main():
+        store = StatsStore(JsonBackend(tmp_path), flush_interval=3600)
+        await store.load()
+        store.start()
+        store.add_messages("42", 7)
+        await store.close()
+        await store.backend.close()
+        reloaded = StatsStore(JsonBackend(tmp_path))
+        await reloaded.load()
+        assert reloaded.get("42")["messages"] == 7
+        assert reloaded.messages_index.rank(42) == 1
+        assert not list(tmp_path.glob("*.tmp"))
+
+    asyncio.run(main())
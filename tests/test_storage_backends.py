@@ -0,0 +1,184 @@
+"""Общий контракт хранилищ: то, что записано, читается после переподключения.
+
+Postgres проверяется только при заданном DATABASE_URL; идентификаторы
+случайные, чтобы не пересекаться с данными в базе.
+"""
+import asyncio
+import random
+import time
+
+import pytest
+
+from game_history import GameBuckets, day_of
+from stats_store import new_user_record
+from storage import DATABASE_URL, JsonBackend, MemoryBackend, PostgresBackend
+
+BACKENDS = [
+    "memory",
+    "json",
+    pytest.param("postgres", marks=pytest.mark.skipif(not DATABASE_URL, reason="нужен DATABASE_URL")),
+]
+
+
+class Storage:
+    """Открывает новые подключения к одному и тому же хранилищу."""
+
+    def __init__(self, kind: str, root):
+        self.kind = kind
+        self.root = root
+        self.memory = MemoryBackend()
+        self.backend = None
+
+    async def reopen(self):
+        await self.close()
+        if self.kind == "memory":
+            self.backend = self.memory
+        elif self.kind == "json":
+            self.backend = JsonBackend(self.root)
+        else:
+            self.backend = PostgresBackend(DATABASE_URL)
+        await self.backend.connect()
+        return self.backend
+
+    async def close(self):
+        if self.backend is not None:
+            await self.backend.close()
+            self.backend = None
+
+
+@pytest.fixture(params=BACKENDS)
+def storage(request, tmp_path):
+    return Storage(request.param, tmp_path)
+
+
+@pytest.fixture
+def ids():
+    base = random.randrange(10 ** 15, 10 ** 16)
+    return [base + i for i in range(3)]
+
+
+def run(storage: Storage, scenario):
+    async def main():
+        try:
+            await scenario(await storage.reopen())
+        finally:
+            await storage.close()
+    asyncio.run(main())
+
+
+def test_counter_deltas_accumulate(storage, ids):
+    uid = str(ids[0])
+
+    async def scenario(backend):
+        record = new_user_record()
+        data = {uid: record}
+        record["messages"], record["voice_seconds"] = 3, 10
+        await backend.save_users(data, {uid: [3, 10]}, set())
+        record["messages"] += 2
+        await backend.save_users(data, {uid: [2, 0]}, set())
+        loaded = await (await storage.reopen()).load_users()
+        assert (loaded[uid]["messages"], loaded[uid]["voice_seconds"]) == (5, 10)
+
+    run(storage, scenario)
+
+
+def test_touched_games_round_trip(storage, ids):
+    uid = str(ids[0])
+    now_ts = time.time()
+
+    async def scenario(backend):
+        record = new_user_record()
+        record["games"] = GameBuckets()
+        record["games"].add("Dota 2", now_ts - 7200, now_ts)
+        record["_voice_join_time"] = int(now_ts)
+        await backend.save_users({uid: record}, {}, {uid})
+        loaded = await (await storage.reopen()).load_users()
+        assert GameBuckets.from_json(loaded[uid]["games"]).totals(now_ts) == {"Dota 2": 7200}
+        assert loaded[uid]["_voice_join_time"] == int(now_ts)
+
+    run(storage, scenario)
+
+
+def test_daily_deltas(storage, ids):
+    uid = str(ids[0])
+    today = day_of(time.time())
+
+    async def scenario(backend):
+        days = {uid: {today - 1: [1, 0], today: [2, 30]}}
+        await backend.save_daily(days, {(uid, today - 1): [1, 0], (uid, today): [2, 30]})
+        days[uid][today][0] += 1
+        await backend.save_daily(days, {(uid, today): [1, 0]})
+        backend = await storage.reopen()
+        rows = sorted(row for row in await backend.load_daily(today - 5) if row[0] == uid)
+        assert rows == [(uid, today - 1, 1, 0), (uid, today, 3, 30)]
+        rows = [row for row in await backend.load_daily(today) if row[0] == uid]
+        assert rows == [(uid, today, 3, 30)]
+
+    run(storage, scenario)
+
+
+def test_warns_append_and_clear(storage, ids):
+    first, second, moderator = ids
+    now_ts = time.time()
+
+    async def scenario(backend):
+        await backend.append_warn({"user_id": first, "by": moderator, "reason": "флуд", "ts": now_ts - 10})
+        await backend.append_warn({"user_id": second, "by": moderator, "reason": "спам", "ts": now_ts - 5})
+        await backend.append_warn({"user_id": first, "by": moderator, "reason": "повтор", "ts": now_ts})
+        await backend.clear_warns(first)
+        await backend.append_warn({"user_id": first, "by": moderator, "reason": "снова", "ts": now_ts + 1})
+        backend = await storage.reopen()
+        warns = [(w["user_id"], w["reason"]) for w in await backend.load_warns(now_ts - 60) if w["user_id"] in ids]
+        assert warns == [(second, "спам"), (first, "снова")]
+        warns = [w["reason"] for w in await backend.load_warns(now_ts) if w["user_id"] in ids]
+        assert warns == ["снова"]
+        # Отсечка по сроку только фильтрует: более старые варны остаются в хранилище
+        backend = await storage.reopen()
+        warns = [w["reason"] for w in await backend.load_warns(now_ts - 60) if w["user_id"] in ids]
+        assert warns == ["спам", "снова"]
+
+    run(storage, scenario)
+
+
+def test_mutes(storage, ids):
+    guild_id, first, second = ids
+
+    async def scenario(backend):
+        mute = {"guild_id": guild_id, "user_id": first, "role_id": 7, "until": 100.0, "reason": "спам"}
+        await backend.save_mute(mute)
+        await backend.save_mute({"guild_id": guild_id, "user_id": second, "role_id": 7, "until": 200.0, "reason": ""})
+        await backend.save_mute(dict(mute, until=300.0))
+        await backend.delete_mute(guild_id, second)
+        mutes = [m for m in await (await storage.reopen()).load_mutes() if m["guild_id"] == guild_id]
+        assert mutes == [dict(mute, until=300.0)]
+
+    run(storage, scenario)
+
+
+def test_voice_open_round_trip(storage, ids):
+    guild_id, first, second = ids
+
+    def session(user_id, credited):
+        return {"guild_id": guild_id, "user_id": user_id, "channel_id": 5, "started": 1000.0,
+                "credited": credited, "counted": True}
+
+    async def scenario(backend):
+        await backend.update_voice_open([session(first, 1000.0), session(second, 1000.0)], [])
+        await backend.update_voice_open([session(first, 1600.0)], [(guild_id, second)])
+        sessions = [s for s in await (await storage.reopen()).load_voice_open() if s["guild_id"] == guild_id]
+        assert sessions == [session(first, 1600.0)]
+
+    run(storage, scenario)
+
+
+def test_game_roles(storage, ids):
+    guild_id, user_id, role_id = ids
+
+    async def scenario(backend):
+        await backend.update_game_roles([(guild_id, user_id, role_id), (guild_id, user_id, role_id + 1)], [])
+        await backend.update_game_roles([], [(guild_id, user_id, role_id)])
+        grants = [tuple(row) for row in await (await storage.reopen()).load_game_roles() if row[0] == guild_id]
+        assert grants == [(guild_id, user_id, role_id + 1)]
+        await storage.backend.update_game_roles([], grants)
+
+    run(storage, scenario)
@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import voice_tracker
+from stats_store import StatsStore
+from storage import MemoryBackend
+from voice_tracker import VoiceTracker
+
+GUILD_ID = 1
+GENERAL, AFK = 10, 11
+
+
+class Clock:
+    def __init__(self, ts: float):
+        self.ts = ts
+
+    def now(self, tz=None):
+        return SimpleNamespace(timestamp=lambda: self.ts)
+
+
+def guild(members: dict[int, int]):
+    """Сервер, где members — {user_id: id канала}."""
+    channels = {GENERAL: SimpleNamespace(id=GENERAL, members=[]), AFK: SimpleNamespace(id=AFK, members=[])}
+    for user_id, channel_id in members.items():
+        channel = channels[channel_id]
+        state = SimpleNamespace(channel=channel, afk=False, self_deaf=False, deaf=False)
+        channel.members.append(SimpleNamespace(id=user_id, bot=False, voice=state))
+    return SimpleNamespace(id=GUILD_ID, voice_channels=list(channels.values()), stage_channels=[],
+                           afk_channel=channels[AFK])
+
+
+def saved(user_id: int, credited: float, channel_id: int = GENERAL) -> dict:
+    return {"guild_id": GUILD_ID, "user_id": user_id, "channel_id": channel_id, "started": 100.0,
+            "credited": credited, "counted": True}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(1000.0)
+    monkeypatch.setattr(voice_tracker, "datetime", clock)
+    return clock
+
+
+def make_tracker(*sessions):
+    backend = MemoryBackend()
+    for session in sessions:
+        backend.voice_open[(session["guild_id"], session["user_id"])] = session
+    store = StatsStore(MemoryBackend())
+    tracker = VoiceTracker(store, backend, resume_grace=300)
+    asyncio.run(tracker.load())
+    return tracker, store, backend
+
+
+def test_short_restart_resumes_session(clock):
+    tracker, store, backend = make_tracker(saved(1, credited=900.0))
+    tracker.rebuild(guild({1: GENERAL}))
+    session = tracker._open[(GUILD_ID, 1)]
+    assert (session.started, session.credited) == (100.0, 900.0)
+    # Простой за время перезапуска засчитывается при следующем начислении
+    tracker.accrue()
+    assert store.get("1")["voice_seconds"] == 100
+    assert tracker._pending_records == []
+
+
+def test_long_restart_closes_saved_session(clock):
+    tracker, store, backend = make_tracker(saved(1, credited=600.0))
+    tracker.rebuild(guild({1: GENERAL}))
+    session = tracker._open[(GUILD_ID, 1)]
+    assert (session.started, session.credited) == (1000.0, 1000.0)
+    # Отрезок до перезапуска закрыт по последнему зачислению, время простоя не засчитано
+    assert [(r["start"], r["end"]) for r in tracker._pending_records] == [(100.0, 600.0)]
+    tracker.accrue()
+    assert store.get("1") is None
+
+
+def test_changed_state_is_not_resumed(clock):
+    tracker, store, backend = make_tracker(saved(1, credited=950.0))
+    tracker.rebuild(guild({1: AFK}))
+    session = tracker._open[(GUILD_ID, 1)]
+    assert (session.channel_id, session.counted, session.started) == (AFK, False, 1000.0)
+    assert [(r["start"], r["end"]) for r in tracker._pending_records] == [(100.0, 950.0)]
+
+
+def test_left_while_offline(clock):
+    tracker, store, backend = make_tracker(saved(1, credited=950.0), saved(2, credited=980.0))
+    tracker.rebuild(guild({2: GENERAL}))
+    assert list(tracker._open) == [(GUILD_ID, 2)]
+    assert [(r["user_id"], r["end"]) for r in tracker._pending_records] == [(1, 950.0)]
+    asyncio.run(tracker.flush())
+    assert list(backend.voice_open) == [(GUILD_ID, 2)]
+    assert [r["user_id"] for r in backend.voice_sessions] == [1]
+
+
+def test_repeated_rebuild_keeps_open_sessions(clock):
+    tracker, store, backend = make_tracker()
+    tracker.rebuild(guild({1: GENERAL}))
+    clock.ts += 60
+    tracker.rebuild(guild({1: GENERAL}))
+    assert tracker._open[(GUILD_ID, 1)].started == 1000.0
+    # После переподключения ушедший закрывается по последнему зачислению
+    tracker.accrue()
+    clock.ts += 120
+    tracker.rebuild(guild({}))
+    assert tracker._open == {}
+    assert store.get("1")["voice_seconds"] == 60
+    assert [(r["start"], r["end"]) for r in tracker._pending_records] == [(1000.0, 1060.0)]
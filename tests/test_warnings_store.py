@@ -0,0 +1,43 @@
+import asyncio
+import json
+import os
+import time
+
+from storage import JsonBackend, MemoryBackend
+from warnings_store import WarningsStore
+
+
+def test_legacy_files_are_imported_and_kept(tmp_path):
+    legacy = tmp_path / "warns_42.json"
+    legacy.write_text(json.dumps([{"by": 1, "reason": "старый"}]), encoding="utf-8")
+    year_ago = time.time() - 365 * 86400
+    os.utime(legacy, (year_ago, year_ago))
+
+    async def main():
+        store = WarningsStore(JsonBackend(tmp_path), expiry_days=0)
+        await store.load()
+        assert [w["reason"] for w in store.active(42)] == ["старый"]
+        # Со сроком действия старый варн не считается, но из журнала не пропадает
+        store = WarningsStore(JsonBackend(tmp_path), expiry_days=30)
+        await store.load()
+        assert store.count(42) == 0
+        store = WarningsStore(JsonBackend(tmp_path), expiry_days=0)
+        await store.load()
+        assert store.count(42) == 1
+
+    asyncio.run(main())
+
+
+def test_expired_warns_drop_out_of_count():
+    async def main():
+        backend = MemoryBackend()
+        now_ts = time.time()
+        await backend.append_warn({"user_id": 1, "by": 2, "reason": "давно", "ts": now_ts - 40 * 86400})
+        store = WarningsStore(backend, expiry_days=30)
+        await store.load()
+        assert store.count(1) == 0
+        assert await store.add(1, 2, "сейчас") == 1
+        assert await store.clear(1)
+        assert store.count(1) == 0
+
+    asyncio.run(main())
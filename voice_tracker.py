@@ -0,0 +1,225 @@
+import asyncio
+import os
+from datetime import datetime, UTC
+
+import discord
+
+# === Настройки голосовых сессий ===
+VOICE_ACCRUE_INTERVAL = float(os.environ.get("VOICE_ACCRUE_INTERVAL", 60))
+VOICE_SESSION_DAYS = int(os.environ.get("VOICE_SESSION_DAYS", 35))
+VOICE_RESUME_GRACE = float(os.environ.get("VOICE_RESUME_GRACE", 300))
+VOICE_COUNT_DEAFENED = os.environ.get("VOICE_COUNT_DEAFENED", "0") == "1"
+
+
+def counts_time(state: discord.VoiceState, guild: discord.Guild) -> bool:
+    """Засчитывается ли время в этом состоянии: не AFK-канал и (по умолчанию) без заглушения звука."""
+    channel = state.channel
+    if channel is None or state.afk:
+        return False
+    if guild.afk_channel is not None and channel.id == guild.afk_channel.id:
+        return False
+    if not VOICE_COUNT_DEAFENED and (state.self_deaf or state.deaf):
+        return False
+    return True
+
+
+class VoiceSession:
+    """Открытый отрезок пребывания в одном канале с одним режимом учёта."""
+
+    __slots__ = ("guild_id", "user_id", "channel_id", "started", "credited", "counted")
+
+    def __init__(self, guild_id: int, user_id: int, channel_id: int, started: float, counted: bool,
+                 credited: float | None = None):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.started = started
+        self.credited = started if credited is None else credited
+        self.counted = counted
+
+    def to_json(self) -> dict:
+        return {
+            "guild_id": self.guild_id,
+            "user_id": self.user_id,
+            "channel_id": self.channel_id,
+            "started": self.started,
+            "credited": self.credited,
+            "counted": self.counted,
+        }
+
+
+class VoiceTracker:
+    """Голосовые сессии, переживающие перезапуск, переходы между каналами и AFK.
+
+    Каждая смена канала или режима учёта (AFK-канал, заглушение) закрывает
+    текущий отрезок и открывает новый. Засчитанное время открытых сессий
+    раз в ``interval`` секунд зачисляется в статистику, поэтому топ по голосу
+    видит идущие сессии, а закрытые отрезки пишутся журналом. Открытые сессии
+    сохраняются и после перезапуска продолжаются по текущим голосовым
+    состояниям сервера.
+    """
+
+    def __init__(self, stats_store, backend, interval: float = VOICE_ACCRUE_INTERVAL,
+                 retention_days: int = VOICE_SESSION_DAYS, resume_grace: float = VOICE_RESUME_GRACE):
+        self.stats_store = stats_store
+        self.backend = backend
+        self.interval = interval
+        self.retention = retention_days * 86400
+        self.resume_grace = resume_grace
+        self._open: dict[tuple[int, int], VoiceSession] = {}
+        self._restored: dict[tuple[int, int], dict] = {}
+        self._pending_records: list[dict] = []
+        self._dirty: set[tuple[int, int]] = set()
+        self._removed: set[tuple[int, int]] = set()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._open)
+
+    async def load(self):
+        # Сами отрезки в памяти не нужны: загрузка вычищает из журнала отрезки старше срока хранения
+        now_ts = datetime.now(UTC).timestamp()
+        await self.backend.load_voice_sessions(now_ts - self.retention)
+        self._restored = {(s["guild_id"], s["user_id"]): s for s in await self.backend.load_voice_open()}
+
+    # === Восстановление после запуска ===
+    def rebuild(self, guild: discord.Guild):
+        """Сверяет открытые сессии сервера с его голосовыми состояниями (вызывается из on_ready)."""
+        now_ts = datetime.now(UTC).timestamp()
+        present = set()
+        for channel in [*guild.voice_channels, *guild.stage_channels]:
+            for member in channel.members:
+                if member.bot or member.voice is None:
+                    continue
+                key = (guild.id, member.id)
+                present.add(key)
+                if key in self._open:
+                    # Повторный on_ready после переподключения: состояние могло измениться
+                    self._apply(key, guild, member.id, member.voice, now_ts)
+                else:
+                    self._resume(key, guild, member, now_ts)
+        # Ушедшие, пока бот был отключён: время после последнего зачисления неизвестно
+        for key in [k for k in self._open if k[0] == guild.id and k not in present]:
+            self._close(key, self._open[key].credited)
+        for key in [k for k in self._restored if k[0] == guild.id and k not in present]:
+            saved = self._restored.pop(key)
+            if saved["counted"]:
+                self._record(VoiceSession(*key, saved["channel_id"], saved["started"], True), saved["credited"])
+            self._removed.add(key)
+
+    def _resume(self, key: tuple[int, int], guild: discord.Guild, member: discord.Member, now_ts: float):
+        state = member.voice
+        counted = counts_time(state, guild)
+        session = VoiceSession(guild.id, member.id, state.channel.id, now_ts, counted)
+        saved = self._restored.pop(key, None)
+        record = self.stats_store.get(str(member.id))
+        legacy_join = record.pop("_voice_join_time", None) if record else None
+        if legacy_join:
+            self.stats_store.mark_dirty(str(member.id))
+        if saved is not None:
+            same_state = saved["channel_id"] == session.channel_id and saved["counted"] == counted
+            if same_state and now_ts - saved["credited"] <= self.resume_grace:
+                # Короткий перезапуск: продолжаем сессию, простой зачтётся при следующем начислении
+                session.started = saved["started"]
+                session.credited = saved["credited"]
+            elif saved["counted"]:
+                self._record(VoiceSession(*key, saved["channel_id"], saved["started"], True), saved["credited"])
+        elif legacy_join and counted:
+            # Вход, сохранённый старой версией бота в _voice_join_time
+            session.started = session.credited = float(legacy_join)
+        self._open[key] = session
+        self._dirty.add(key)
+
+    # === Горячий путь ===
+    def handle(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+        if member.bot or member.guild is None:
+            return
+        key = (member.guild.id, member.id)
+        self._apply(key, member.guild, member.id, after, datetime.now(UTC).timestamp())
+
+    def _apply(self, key: tuple[int, int], guild: discord.Guild, user_id: int, state: discord.VoiceState,
+               now_ts: float):
+        channel = state.channel
+        counted = counts_time(state, guild)
+        session = self._open.get(key)
+        if session is not None:
+            if channel is not None and channel.id == session.channel_id and counted == session.counted:
+                return
+            self._close(key, now_ts)
+        if channel is not None:
+            self._open[key] = VoiceSession(guild.id, user_id, channel.id, now_ts, counted)
+            self._dirty.add(key)
+            self._removed.discard(key)
+
+    def _close(self, key: tuple[int, int], end_ts: float):
+        session = self._open.pop(key)
+        self._accrue(session, end_ts)
+        if session.counted:
+            self._record(session, end_ts)
+        self._dirty.discard(key)
+        self._removed.add(key)
+
+    def _record(self, session: VoiceSession, end_ts: float):
+        if end_ts <= session.started:
+            return
+        self._pending_records.append({
+            "guild_id": session.guild_id,
+            "user_id": session.user_id,
+            "channel_id": session.channel_id,
+            "start": session.started,
+            "end": end_ts,
+        })
+
+    # === Зачисление времени ===
+    def _accrue(self, session: VoiceSession, now_ts: float):
+        if not session.counted:
+            return
+        seconds = int(now_ts - session.credited)
+        if seconds > 0:
+            self.stats_store.add_voice_seconds(str(session.user_id), seconds)
+            session.credited += seconds
+
+    def accrue(self):
+        """Зачисляет в статистику время всех идущих сессий; O(число людей в голосе)."""
+        now_ts = datetime.now(UTC).timestamp()
+        for key, session in self._open.items():
+            if session.counted:
+                self._accrue(session, now_ts)
+                self._dirty.add(key)
+
+    # === Сохранение ===
+    async def flush(self):
+        self.accrue()
+        records, self._pending_records = self._pending_records, []
+        dirty = [self._open[key].to_json() for key in self._dirty if key in self._open]
+        removed = list(self._removed)
+        self._dirty, self._removed = set(), set()
+        try:
+            if records:
+                await self.backend.append_voice_sessions(records)
+        except Exception as e:
+            print(f"[voice] Ошибка записи голосовых сессий: {e}")
+            self._pending_records = records + self._pending_records
+        try:
+            if dirty or removed:
+                await self.backend.update_voice_open(dirty, removed)
+        except Exception as e:
+            print(f"[voice] Ошибка сохранения открытых сессий: {e}")
+            self._dirty |= {(s["guild_id"], s["user_id"]) for s in dirty}
+            self._removed |= set(removed) - set(self._open)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Зачисляет время и сохраняет открытые сессии, чтобы продолжить их после перезапуска."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
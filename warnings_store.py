@@ -0,0 +1,89 @@
+import os
+from collections import deque
+from datetime import datetime, UTC
+
+# === Настройки предупреждений ===
+# 0 — варны бессрочные, как раньше; срок включается явно
+WARN_EXPIRY_DAYS = float(os.environ.get("WARN_EXPIRY_DAYS", 0))
+WARN_MUTE_THRESHOLD = int(os.environ.get("WARN_MUTE_THRESHOLD", 3))
+
+
+class WarningsStore:
+    """Все предупреждения сервера: журнал в бэкенде и индекс по пользователям в памяти.
+
+    У каждого пользователя очередь варнов по времени выдачи; истёкшие
+    (старше ``WARN_EXPIRY_DAYS``, 0 — бессрочно) снимаются с её начала при
+    обращении, поэтому число действующих варнов считается за амортизированное O(1).
+    """
+
+    def __init__(self, backend, expiry_days: float = WARN_EXPIRY_DAYS):
+        self.backend = backend
+        self.expiry_seconds = expiry_days * 86400
+        self._by_user: dict[int, deque[dict]] = {}
+
+    def _cutoff(self, now_ts: float | None = None) -> float:
+        if not self.expiry_seconds:
+            return 0
+        return (now_ts if now_ts is not None else datetime.now(UTC).timestamp()) - self.expiry_seconds
+
+    async def load(self):
+        self._by_user = {}
+        for warn in await self.backend.load_warns(self._cutoff()):
+            self._by_user.setdefault(warn["user_id"], deque()).append(warn)
+
+    def _prune(self, user_id: int, cutoff: float) -> deque | None:
+        warns = self._by_user.get(user_id)
+        if warns is None:
+            return None
+        while warns and warns[0]["ts"] < cutoff:
+            warns.popleft()
+        if not warns:
+            del self._by_user[user_id]
+            return None
+        return warns
+
+    def active(self, user_id: int) -> list[dict]:
+        return list(self._prune(user_id, self._cutoff()) or ())
+
+    def count(self, user_id: int) -> int:
+        return len(self._prune(user_id, self._cutoff()) or ())
+
+    async def add(self, user_id: int, by: int, reason: str) -> int:
+        warn = {"user_id": user_id, "by": by, "reason": reason, "ts": datetime.now(UTC).timestamp()}
+        self._by_user.setdefault(user_id, deque()).append(warn)
+        await self.backend.append_warn(warn)
+        return self.count(user_id)
+
+    async def clear(self, user_id: int) -> bool:
+        had_warns = self.count(user_id) > 0
+        self._by_user.pop(user_id, None)
+        if had_warns:
+            await self.backend.clear_warns(user_id)
+        return had_warns
+
+    def counts(self) -> list[tuple[int, int]]:
+        cutoff = self._cutoff()
+        result = []
+        for user_id in list(self._by_user):
+            warns = self._prune(user_id, cutoff)
+            if warns:
+                result.append((user_id, len(warns)))
+        result.sort(key=lambda item: (-item[1], item[0]))
+        return result
+
+    def stats(self) -> dict:
+        now_ts = datetime.now(UTC).timestamp()
+        counts = self.counts()
+        recent_day = recent_week = 0
+        for warns in self._by_user.values():
+            for warn in warns:
+                age = now_ts - warn["ts"]
+                recent_day += age <= 86400
+                recent_week += age <= 7 * 86400
+        return {
+            "total": sum(count for _, count in counts),
+            "users": len(counts),
+            "at_threshold": sum(1 for _, count in counts if count >= WARN_MUTE_THRESHOLD),
+            "last_day": recent_day,
+            "last_week": recent_week,
+        }